@@ -0,0 +1,94 @@
+"""
+API diff of two synthetic runs of CommentedFunctionBlocks: the external-sort merge join of src.api_diff, with several
+run sizes, against loading both runs into dicts keyed by member. Prints members per second and the peak traced
+memory of each, which only grows with the run size for the merge join.
+
+    python -m benchmarks.bench_api_diff --members 200000 --run-sizes 10000 100000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from src.api_diff import DiffReport, diff_files, record_key
+
+
+def write_runs(directory: str, members: int, seed: int = 0):
+    """
+    Writes old.jsonl and new.jsonl: new drops and adds 2% of the members, deprecates 1% and changes the signature
+    of 3%, in shuffled order.
+    """
+    rng = random.Random(seed)
+    old_path, new_path = os.path.join(directory, "old.jsonl"), os.path.join(directory, "new.jsonl")
+    old_records, new_records = [], []
+    for i in range(members + members // 50):
+        package, type_name = f"pkg{i % 97}", f"Type{i % 1013}"
+        record = {'package_name': package, 'file_name': f"{package}.{type_name}", 'short_description': 'A type',
+                  'kind': 'trait', 'case_class_link': None, 'class_link': None, 'object_link': None,
+                  'trait_link': f"{package}/{type_name}.html",
+                  'function_block': {'label': f"member{i}", 'tail': f"(a: A{i % 7}): F[A]", 'member': f"{type_name}",
+                                     'link': f"{package}/{type_name}.html#member{i}(a:A):F[A]", 'kind': 'def'},
+                  'short_comment': f"Does {i}.", 'full_comment': f"Does {i}, at length.", 'is_deprecated': False,
+                  'deprecated_comment': None}
+        roll = rng.random()
+        if i < members:
+            old_records.append(json.dumps(record))
+        if i < members // 50 and roll < 0.5:
+            continue
+        if roll < 0.01:
+            record = dict(record, is_deprecated=True, deprecated_comment="Use member0 instead.")
+        elif roll < 0.04:
+            record = dict(record, function_block=dict(record['function_block'], tail="(a: B): G[B]"))
+        new_records.append(json.dumps(record))
+    rng.shuffle(old_records)
+    rng.shuffle(new_records)
+    for path, records in ((old_path, old_records), (new_path, new_records)):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(records))
+            f.write("\n")
+    return old_path, new_path
+
+
+def in_memory_diff(old_path: str, new_path: str) -> int:
+    def load(path):
+        with open(path, encoding="utf-8") as f:
+            return {record_key(record): record for record in map(json.loads, f)}
+    old, new = load(old_path), load(new_path)
+    return sum(1 for key in old.keys() | new.keys() if old.get(key) != new.get(key))
+
+
+def measure(fn):
+    # Timed without tracemalloc, which slows allocation-heavy code down several times.
+    start = time.perf_counter()
+    changes = fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return changes, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=200000)
+    parser.add_argument("--run-sizes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        old_path, new_path = write_runs(directory, args.members)
+        print(f"{'mode':>18} {'changes':>8} {'members/s':>10} {'peak MiB':>9}")
+        modes = [("in-memory dicts", lambda: in_memory_diff(old_path, new_path))]
+        for run_size in args.run_sizes:
+            modes.append((f"merge run={run_size}", lambda run_size=run_size: sum(
+                1 for _ in diff_files(old_path, new_path, run_size, DiffReport(), directory))))
+        for mode, fn in modes:
+            changes, elapsed, peak = measure(fn)
+            print(f"{mode:>18} {changes:>8} {args.members / elapsed:>10.0f} {peak / (1 << 20):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Microbenchmark of the EnrichedFunctionBlock JSONL encoders: the asdict based encode_enriched_function_block against
+encode_enriched_function_block_fast with every installed json library.
+
+    python -m benchmarks.bench_encoders --records 100000
+"""
+import argparse
+import io
+import os
+import time
+
+from src.transformer import (encode_enriched_function_block, encode_enriched_function_block_fast, get_json_dumps,
+                             index_js_to_enriched_function_blocks, write_enriched_function_blocks)
+
+TEST_INDEX_JS = os.path.join(os.path.dirname(__file__), "..", "tests", "resources", "test_index.js")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=100000)
+    args = parser.parse_args()
+
+    with open(TEST_INDEX_JS) as f:
+        sample = index_js_to_enriched_function_blocks(f.read())
+    blocks = (sample * (args.records // len(sample) + 1))[:args.records]
+
+    start = time.perf_counter()
+    expected = [encode_enriched_function_block(block) for block in blocks]
+    baseline = time.perf_counter() - start
+    print(f"{'encoder':>24} {'records/s':>11} {'speedup':>8}")
+    print(f"{'asdict + json.dumps':>24} {len(blocks) / baseline:>11.0f} {1:>7.2f}x")
+
+    for library in ("json", "orjson", "msgspec"):
+        try:
+            dumps = get_json_dumps(library)
+        except ImportError:
+            print(f"{library:>24} {'not installed':>20}")
+            continue
+        start = time.perf_counter()
+        actual = [encode_enriched_function_block_fast(block, dumps) for block in blocks]
+        elapsed = time.perf_counter() - start
+        assert actual == expected, f"{library} output differs"
+        print(f"{'fast ' + library:>24} {len(blocks) / elapsed:>11.0f} {baseline / elapsed:>7.2f}x")
+
+        start = time.perf_counter()
+        write_enriched_function_blocks(blocks, io.StringIO(), dumps=dumps)
+        elapsed = time.perf_counter() - start
+        print(f"{'batched write ' + library:>24} {len(blocks) / elapsed:>11.0f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Measures single-process extract_list_nodes throughput, in pages per second, for every installed html backend.
+
+    python -m benchmarks.bench_html_backends --repeat 50
+"""
+import argparse
+import os
+import time
+
+from src.html_backends import HTML_BACKENDS, get_list_node_extractor
+
+SAMPLE_PAGE = os.path.join(os.path.dirname(__file__), "..", "tests", "resources", "html_parser_test_data",
+                           "test_bifunctor.html")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=50, help="number of times the sample page is parsed")
+    parser.add_argument("--page", default=SAMPLE_PAGE)
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'backend':>11} {'pages/s':>9} {'speedup':>8}")
+    for backend in HTML_BACKENDS:
+        try:
+            extractor = get_list_node_extractor(backend)
+        except ImportError:
+            print(f"{backend:>11} {'not installed':>18}")
+            continue
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            extractor(args.page)
+        rate = args.repeat / (time.perf_counter() - start)
+        baseline = baseline or rate
+        print(f"{backend:>11} {rate:>9.1f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compares decoding a synthetic index.js by reading it into a str, trim_index_js and json.loads against the memory-mapped
+load_index_js, with and without orjson: wall time and peak traced allocation. load_index_js decodes the index.js
+misses of `extract --cache`; uncached runs stream index.js instead and do not use it.
+
+    python -m benchmarks.bench_index_js_loading --packages 200
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from testing.corpus import generate_index, render_index_js
+from src import transformer
+from src.transformer import load_index_js, trim_index_js
+
+
+def read_and_trim(path: str):
+    with open(path, encoding="utf-8") as f:
+        return json.loads(trim_index_js(f.read()))
+
+
+def measure(load, path: str, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        load(path)
+    elapsed = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    result = load(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packages", type=int, default=200)
+    parser.add_argument("--types", type=int, default=10, help="Scala types per package")
+    parser.add_argument("--members", type=int, default=30, help="members per Scala type")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "index.js")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(render_index_js(generate_index(args.packages, args.types, args.members)))
+        size = os.path.getsize(path)
+
+        modes = [("read + trim + json", read_and_trim, transformer.orjson), ("mmap + json", load_index_js, None)]
+        if transformer.orjson is not None:
+            modes.append(("mmap + orjson", load_index_js, transformer.orjson))
+        installed = transformer.orjson
+        print(f"index.js {size / 2 ** 20:.1f} MiB")
+        print(f"{'mode':>20} {'MiB/s':>8} {'peak MiB':>9}")
+        expected = None
+        try:
+            for name, load, json_library in modes:
+                transformer.orjson = json_library
+                elapsed, peak, result = measure(load, path, args.repeat)
+                expected = expected or result
+                assert result == expected, f"{name} output differs"
+                print(f"{name:>20} {size / 2 ** 20 / elapsed:>8.1f} {peak / 2 ** 20:>9.1f}")
+        finally:
+            transformer.orjson = installed
+
+
+if __name__ == "__main__":
+    main()
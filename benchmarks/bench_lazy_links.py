@@ -0,0 +1,56 @@
+"""
+Link-only workloads: extract_list_nodes against extract_list_links, which only scans for the member links, and the
+cost of loading the comments of every lazy record afterwards. Runs over the sample page and a synthetic corpus.
+
+    python -m benchmarks.bench_lazy_links --repeat 5 --packages 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from testing.corpus import write_corpus
+from src.html_parser import collect_html_file_paths, extract_list_links, extract_list_nodes
+
+SAMPLE_PAGE = os.path.join(os.path.dirname(__file__), "..", "tests", "resources", "html_parser_test_data",
+                           "test_bifunctor.html")
+
+
+def measure(fn, pages, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            fn(page)
+        best = min(best, time.perf_counter() - start)
+    return best / len(pages)
+
+
+def load_all(page: str):
+    return [block.load() for block in extract_list_links(page)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--packages", type=int, default=4)
+    parser.add_argument("--types", type=int, default=10, help="Scala types per package")
+    parser.add_argument("--members", type=int, default=30, help="members per Scala type")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_corpus(directory, args.packages, args.types, args.members)
+        corpora = {"sample": [SAMPLE_PAGE], "synthetic": sorted(collect_html_file_paths(directory, []))}
+        print(f"{'corpus':>10} {'mode':>14} {'ms/file':>9} {'speedup':>8}")
+        for name, pages in corpora.items():
+            for page in pages:
+                assert [block.link for block in extract_list_links(page)] == \
+                       [block.link for block in extract_list_nodes(page)], page
+            eager = measure(extract_list_nodes, pages, args.repeat)
+            for mode, fn in (("eager", extract_list_nodes), ("links", extract_list_links), ("links+load", load_all)):
+                elapsed = eager if fn is extract_list_nodes else measure(fn, pages, args.repeat)
+                print(f"{name:>10} {mode:>14} {elapsed * 1000:>9.2f} {eager / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
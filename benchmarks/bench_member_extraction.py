@@ -0,0 +1,45 @@
+"""
+Microbenchmark of the per-<li> member extraction of the bs4 backend: the single-pass
+node_to_flattened_function_comment_block against the previous implementation, which ran three find calls, tag.text and
+select_link's find and find_all over every member. Member pages are parsed once up front, so only the extraction is
+timed.
+
+    python -m benchmarks.bench_member_extraction --repeat 5
+"""
+import argparse
+import logging
+import os
+import time
+
+from src.html_parser import node_to_flattened_function_comment_block
+from testing.member_extraction_reference import load_list_items, node_to_flattened_function_comment_block_multipass
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), "..", "tests", "resources", "html_parser_test_data")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=TEST_DATA, help="directory of member pages (e.g. from testing.corpus)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    items = load_list_items(args.corpus)
+    results = {}
+    for name, extract in (("multi-pass", node_to_flattened_function_comment_block_multipass),
+                          ("single-pass", node_to_flattened_function_comment_block)):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            blocks = [extract(li) for li in items]
+        results[name] = (time.perf_counter() - start) / args.repeat, blocks
+    assert results["multi-pass"][1] == results["single-pass"][1], "outputs differ"
+
+    baseline = results["multi-pass"][0]
+    print(f"{len(items)} members")
+    print(f"{'extraction':>12} {'members/s':>11} {'speedup':>8}")
+    for name, (seconds, _) in results.items():
+        print(f"{name:>12} {len(items) / seconds:>11.0f} {baseline / seconds:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
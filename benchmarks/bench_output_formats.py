@@ -0,0 +1,91 @@
+"""
+Size and speed of the function record output formats on a synthetic index: JSONL (plain and gzip), colfile
+(uncompressed and zlib) and Parquet when pyarrow is installed. Reading measures what a downstream consumer pays to get
+the columns back: json.loads per JSONL line against reading the row groups.
+
+    python -m benchmarks.bench_output_formats --packages 100
+"""
+import argparse
+import gzip
+import json
+import os
+import tempfile
+import time
+
+from testing.corpus import generate_index
+from src.columnar import ColfileWriter, iter_row_groups, open_columnar_writer
+from src.transformer import extract_enriched_function_blocks, write_enriched_function_blocks
+
+
+def write_jsonl(blocks, path):
+    with open(path, "w", encoding="utf-8") as out:
+        write_enriched_function_blocks(blocks, out)
+
+
+def write_jsonl_gzip(blocks, path):
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=1) as out:
+        write_enriched_function_blocks(blocks, out)
+
+
+def read_jsonl(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return sum(1 for line in f if json.loads(line))
+
+
+def colfile_writer(compression):
+    def write(blocks, path):
+        with open(path, "wb") as f, ColfileWriter(f, compression=compression) as writer:
+            writer.write_enriched_function_blocks(blocks)
+    return write
+
+
+def write_parquet(blocks, path):
+    with open(path, "wb") as f, open_columnar_writer(f, "parquet") as writer:
+        writer.write_enriched_function_blocks(blocks)
+
+
+def read_columnar(path):
+    return sum(len(columns["package_name"]) for columns in iter_row_groups(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packages", type=int, default=100)
+    parser.add_argument("--types", type=int, default=10, help="Scala types per package")
+    parser.add_argument("--members", type=int, default=30, help="members per Scala type")
+    args = parser.parse_args()
+
+    index = generate_index(args.packages, args.types, args.members)
+    blocks = [block for package, scala_types in index.items() for scala_type in scala_types
+              for block in extract_enriched_function_blocks(package, scala_type)]
+    formats = [("jsonl", "functions.jsonl", write_jsonl, read_jsonl),
+               ("jsonl gzip", "functions.jsonl.gz", write_jsonl_gzip, read_jsonl),
+               ("colfile", "functions.colfile", colfile_writer(None), read_columnar),
+               ("colfile zlib", "functions.zlib.colfile", colfile_writer("zlib"), read_columnar)]
+    try:
+        import pyarrow.parquet  # noqa: F401
+        formats.append(("parquet", "functions.parquet", write_parquet, read_columnar))
+    except ImportError:
+        print("pyarrow not installed, parquet skipped")
+
+    print(f"{len(blocks)} records")
+    print(f"{'format':>14} {'MiB':>8} {'vs jsonl':>9} {'write rec/s':>12} {'read rec/s':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        jsonl_size = None
+        for name, file_name, write, read in formats:
+            path = os.path.join(directory, file_name)
+            start = time.perf_counter()
+            write(blocks, path)
+            write_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            assert read(path) == len(blocks), f"{name} lost records"
+            read_seconds = time.perf_counter() - start
+            size = os.path.getsize(path)
+            jsonl_size = jsonl_size or size
+            print(f"{name:>14} {size / 2 ** 20:>8.2f} {size / jsonl_size:>8.0%} {len(blocks) / write_seconds:>12.0f} "
+                  f"{len(blocks) / read_seconds:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Measures extract_list_nodes_parallel throughput as the number of worker processes grows.
+
+    python -m benchmarks.bench_parallel_extract --files 400
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from src.html_parser import extract_list_nodes_parallel
+
+SAMPLE_PAGE = os.path.join(os.path.dirname(__file__), "..", "tests", "resources", "html_parser_test_data",
+                           "test_bifunctor.html")
+
+
+def build_corpus(directory: str, files: int):
+    for i in range(files):
+        shutil.copyfile(SAMPLE_PAGE, os.path.join(directory, f"page_{i:06d}.html"))
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--chunk-size", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="*",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = build_corpus(directory, args.files)
+        baseline = None
+        print(f"{'workers':>8} {'seconds':>9} {'pages/s':>9} {'speedup':>8}")
+        for workers in args.workers:
+            start = time.perf_counter()
+            extract_list_nodes_parallel(paths, max_workers=workers, chunk_size=args.chunk_size)
+            elapsed = time.perf_counter() - start
+            rate = len(paths) / elapsed
+            baseline = baseline or rate
+            print(f"{workers:>8} {elapsed:>9.2f} {rate:>9.1f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
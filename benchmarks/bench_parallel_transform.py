@@ -0,0 +1,42 @@
+"""
+Serial against process pool transform of a synthetic index: the Scala types are decoded once, then
+transform_scala_types runs with every worker count given.
+
+    python -m benchmarks.bench_parallel_transform --packages 200 --workers 1 2 4
+"""
+import argparse
+import os
+import time
+
+from testing.corpus import generate_index
+from src.transformer import TRANSFORM_CHUNK_SIZE, transform_scala_types
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packages", type=int, default=200)
+    parser.add_argument("--types", type=int, default=20, help="Scala types per package")
+    parser.add_argument("--members", type=int, default=30, help="members per Scala type")
+    parser.add_argument("--chunk-size", type=int, default=TRANSFORM_CHUNK_SIZE, help="Scala types per task")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    index = generate_index(args.packages, args.types, args.members)
+    scala_types = [(package, scala_type) for package, types in index.items() for scala_type in types]
+    print(f"{len(scala_types)} Scala types, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'blocks/s':>10} {'speedup':>8}")
+    baseline = expected = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        # threshold 1 for workers=1 would still start a pool; keep it serial instead
+        threshold = len(scala_types) + 1 if workers == 1 else 1
+        blocks = list(transform_scala_types(scala_types, workers, args.chunk_size, threshold))
+        elapsed = time.perf_counter() - start
+        expected = expected or blocks
+        assert blocks == expected, f"output differs with {workers} workers"
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {len(blocks) / elapsed:>10.0f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Memory held by the transformed records of a scaled-up test_index.js: dict-backed dataclasses (the previous record
+layout), the slotted EnrichedFunctionBlock list and the columnar EnrichedFunctionBlockBatch.
+
+    python -m benchmarks.bench_record_memory --copies 20000
+"""
+import argparse
+import json
+import os
+import tracemalloc
+from dataclasses import dataclass
+
+from src.transformer import (EnrichedFunctionBlock, EnrichedFunctionBlockBatch, FunctionBlock,
+                             index_js_to_enriched_function_blocks, trim_index_js)
+
+TEST_INDEX_JS = os.path.join(os.path.dirname(__file__), "..", "tests", "resources", "test_index.js")
+
+
+@dataclass
+class DictFunctionBlock:
+    label: str
+    tail: str
+    member: str
+    link: str
+    kind: str
+
+
+@dataclass
+class DictEnrichedFunctionBlock:
+    package_name: str
+    file_name: str
+    short_description: str
+    kind: str
+    case_class_link: str
+    class_link: str
+    object_link: str
+    trait_link: str
+    function_block: DictFunctionBlock
+
+
+def scaled_index_js(copies: int) -> str:
+    with open(TEST_INDEX_JS) as f:
+        packages = json.loads(trim_index_js(f.read()))
+    scaled = {f"{name}{i}": scala_types for i in range(copies) for name, scala_types in packages.items()}
+    return "Index.PACKAGES = " + json.dumps(scaled) + ";"
+
+
+def traced(build):
+    tracemalloc.start()
+    value = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, size
+
+
+def copy_blocks(blocks, record_type, function_block_type):
+    return [record_type(b.package_name, b.file_name, b.short_description, b.kind, b.case_class_link, b.class_link,
+                        b.object_link, b.trait_link,
+                        function_block_type(b.function_block.label, b.function_block.tail, b.function_block.member,
+                                            b.function_block.link, b.function_block.kind))
+            for b in blocks]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--copies", type=int, default=20000, help="number of copies of the test index packages")
+    args = parser.parse_args()
+
+    index_js = scaled_index_js(args.copies)
+    # Keep the strings alive outside the traced sections so only the record overhead is measured.
+    blocks = index_js_to_enriched_function_blocks(index_js)
+
+    _, dict_size = traced(lambda: copy_blocks(blocks, DictEnrichedFunctionBlock, DictFunctionBlock))
+    slotted, slotted_size = traced(lambda: copy_blocks(blocks, EnrichedFunctionBlock, FunctionBlock))
+    batch, batch_size = traced(lambda: EnrichedFunctionBlockBatch.from_enriched_function_blocks(blocks))
+    assert list(batch) == slotted == blocks
+
+    print(f"{len(blocks)} records")
+    print(f"{'layout':>22} {'MiB':>8} {'bytes/record':>13}")
+    for name, size in (("dict dataclasses", dict_size), ("slotted dataclasses", slotted_size),
+                       ("columnar batch", batch_size)):
+        print(f"{name:>22} {size / 2 ** 20:>8.1f} {size / len(blocks):>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
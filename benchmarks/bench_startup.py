@@ -0,0 +1,113 @@
+"""
+Cold-start latency of the CLI and of pool workers: wall time of fresh interpreters running each entry point, over a
+bare interpreter, plus the `python -X importtime` breakdown of `import src.main`. Bytecode is cached in a temporary
+pycache prefix first, so the numbers do not depend on PYTHONDONTWRITEBYTECODE or a stale __pycache__.
+
+Exits with status 1 when `import src.main` takes longer than --target-ms over the bare interpreter, or loads one of
+the modules only some commands or processes need (bs4, lxml, multiprocessing, the transformer, ...).
+
+    python -m benchmarks.bench_startup --repeat 21 --target-ms 100
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+# Default target for `import src.main` over a bare interpreter, in ms: half of the ~200 ms that importing every module
+# and parser eagerly took on the machine it was set on, where the lazy imports take 65-85 ms.
+TARGET_MS = 100.0
+SCENARIOS = {
+    "python": "pass",
+    "import src.main": "import src.main",
+    "main --help": "import sys, src.main; sys.argv = ['main', '--help']; src.main.run()",
+    "html worker (bs4)": "import src.html_backends as b; b.preload_backend('bs4')",
+    "transform worker": "import src.transformer",
+    "diff": "import src.main, src.api_diff",
+}
+# Modules `import src.main` must not load: parsers, multiprocessing and the modules of other commands.
+LAZY_MODULES = ("bs4", "lxml", "selectolax", "multiprocessing", "sqlite3", "orjson", "src.transformer", "src.joiner",
+                "src.manifest_cache", "src.api_diff")
+
+
+def run_python(code: str, env: Dict[str, str], *options: str) -> Tuple[float, str]:
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, *options, "-c", code], cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE, text=True, check=True)
+    return time.perf_counter() - start, process.stderr
+
+
+def median_ms(code: str, env: Dict[str, str], repeat: int) -> float:
+    return statistics.median(run_python(code, env)[0] for _ in range(repeat)) * 1000
+
+
+def import_times(env: Dict[str, str]) -> List[Tuple[int, str, int]]:
+    """
+    (depth, module, cumulative us) of every module the interpreter and `import src.main` load, from -X importtime,
+    in its order: a module follows the modules it imported.
+    """
+    _, stderr = run_python("import src.main", env, "-X", "importtime")
+    rows = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            _, cumulative_us, name = line[len("import time:"):].split("|")
+            # One space after the separator, then two per level.
+            depth = (len(name) - len(name.lstrip()) + 1) // 2
+            rows.append((depth, name.strip(), int(cumulative_us)))
+    return rows
+
+
+def direct_imports(rows: List[Tuple[int, str, int]], module: str) -> List[Tuple[str, int]]:
+    index = next(i for i, (_, name, _) in enumerate(rows) if name == module)
+    depth = rows[index][0]
+    children = []
+    for child_depth, name, cumulative in reversed(rows[:index]):
+        if child_depth <= depth:
+            break
+        if child_depth == depth + 1:
+            children.append((name, cumulative))
+    return children
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=11)
+    parser.add_argument("--target-ms", type=float, default=TARGET_MS,
+                        help="maximum cold-start latency of `import src.main` over a bare interpreter")
+    parser.add_argument("--top", type=int, default=10, help="slowest direct imports of src.main to print")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pycache:
+        env = dict(os.environ, PYTHONPYCACHEPREFIX=pycache)
+        env.pop("PYTHONDONTWRITEBYTECODE", None)
+        run_python("import src.main, src.api_diff, src.html_backends, bs4", env)
+
+        print(f"{'scenario':>20} {'ms':>8} {'over python':>12}")
+        baseline = None
+        results = {}
+        for name, code in SCENARIOS.items():
+            results[name] = median_ms(code, env, args.repeat)
+            baseline = results[name] if baseline is None else baseline
+            print(f"{name:>20} {results[name]:>8.1f} {results[name] - baseline:>12.1f}")
+
+        rows = import_times(env)
+        loaded = {name for _, name, _ in rows}
+        main_us = next(cumulative for _, name, cumulative in rows if name == "src.main")
+        print(f"\n-X importtime: src.main {main_us / 1000:.1f} ms cumulative; slowest direct imports:")
+        for name, cumulative in sorted(direct_imports(rows, "src.main"), key=lambda row: -row[1])[:args.top]:
+            print(f"{name:>30} {cumulative / 1000:>8.1f} ms")
+
+    eager = sorted(module for module in LAZY_MODULES if module in loaded)
+    cold_start = results["import src.main"] - baseline
+    print(f"\ncold start {cold_start:.1f} ms over python, target {args.target_ms:.1f} ms; "
+          f"eagerly loaded: {', '.join(eager) or 'none'}")
+    if cold_start > args.target_ms or eager:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Compares full-document and #template-only parsing of a member page: wall time and peak traced allocation per file.
+
+    python -m benchmarks.bench_targeted_parsing --repeat 20
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+from src.html_parser import extract_list_nodes, extract_list_nodes_targeted
+
+SAMPLE_PAGE = os.path.join(os.path.dirname(__file__), "..", "tests", "resources", "html_parser_test_data",
+                           "test_bifunctor.html")
+
+
+def measure(extractor, page: str, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        extractor(page)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    extractor(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--page", default=SAMPLE_PAGE)
+    args = parser.parse_args()
+
+    full_time, full_peak = measure(extract_list_nodes, args.page, args.repeat)
+    targeted_time, targeted_peak = measure(extract_list_nodes_targeted, args.page, args.repeat)
+    print(f"{'mode':>9} {'ms/file':>9} {'peak KiB':>9}")
+    print(f"{'full':>9} {full_time * 1000:>9.1f} {full_peak / 1024:>9.0f}")
+    print(f"{'targeted':>9} {targeted_time * 1000:>9.1f} {targeted_peak / 1024:>9.0f}")
+    print(f"time -{1 - targeted_time / full_time:.0%}, peak allocation -{1 - targeted_peak / full_peak:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Per-member cost of the index.js transform: extract_enriched_function_blocks against the previous implementation,
+which built two sets per member to validate its keys and looked up the parent fields again for every member. The
+synthetic index is decoded once; a share of its members are replaced by ('member', 'error') blocks.
+
+    python -m benchmarks.bench_transform_blocks --packages 200 --error-every 50
+"""
+import argparse
+import time
+
+from testing.corpus import generate_index
+from src.transformer import (FUNCTION_BLOCK_KEYS, EnrichedFunctionBlock, FunctionBlock, TransformReport,
+                             extract_enriched_function_blocks)
+
+
+def extract_enriched_function_blocks_reference(package_name, scala_type):
+    """
+    The transform before frozen key schemas, for comparison. Skips error blocks without counting them.
+    """
+    rtn_blocks = []
+    for k, v in scala_type.items():
+        if type(v) is list and k in FUNCTION_BLOCK_KEYS:
+            kind = scala_type.get('kind')
+            for fb in v:
+                if set(fb.keys()) == set(FunctionBlock.__annotations__.keys()):
+                    rtn_blocks.append(EnrichedFunctionBlock(
+                        package_name=package_name, file_name=scala_type.get('name'),
+                        short_description=scala_type.get('shortDescription'), kind=kind,
+                        case_class_link=scala_type.get('case class'), class_link=scala_type.get('class'),
+                        object_link=scala_type.get('object'), trait_link=scala_type.get('trait'),
+                        function_block=FunctionBlock(label=fb.get('label'), tail=fb.get('tail'),
+                                                     member=fb.get('member'), link=fb.get('link'),
+                                                     kind=fb.get('kind'))))
+    return rtn_blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packages", type=int, default=200)
+    parser.add_argument("--types", type=int, default=20, help="Scala types per package")
+    parser.add_argument("--members", type=int, default=30, help="members per Scala type")
+    parser.add_argument("--error-every", type=int, default=50, help="every Nth member is an error block, 0 for none")
+    parser.add_argument("--repeat", type=int, default=3, help="best of this many runs")
+    args = parser.parse_args()
+
+    index = generate_index(args.packages, args.types, args.members)
+    scala_types = [(package, scala_type) for package, types in index.items() for scala_type in types]
+    members = 0
+    for _, scala_type in scala_types:
+        for key in FUNCTION_BLOCK_KEYS & scala_type.keys():
+            blocks = scala_type[key]
+            for i in range(0, len(blocks), args.error_every or len(blocks) + 1):
+                blocks[i] = {"member": blocks[i]["member"], "error": "Could not resolve type"}
+            members += len(blocks)
+
+    def best_of(fn):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    report = TransformReport()
+    current = [block for package, scala_type in scala_types
+               for block in extract_enriched_function_blocks(package, scala_type, report)]
+    reference = [block for package, scala_type in scala_types
+                 for block in extract_enriched_function_blocks_reference(package, scala_type)]
+    assert current == reference, "transform output differs from the reference"
+
+    print(f"{len(scala_types)} Scala types, {members} members, {report}")
+    print(f"{'implementation':>16} {'ns/member':>10} {'speedup':>8}")
+    baseline = best_of(lambda: [extract_enriched_function_blocks_reference(package, scala_type)
+                                for package, scala_type in scala_types])
+    elapsed = best_of(lambda: [extract_enriched_function_blocks(package, scala_type)
+                               for package, scala_type in scala_types])
+    for name, seconds in (("reference", baseline), ("current", elapsed)):
+        print(f"{name:>16} {seconds / members * 1e9:>10.0f} {baseline / seconds:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
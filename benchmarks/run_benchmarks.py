@@ -0,0 +1,131 @@
+"""
+Benchmark harness. Generates a synthetic corpus (see testing.corpus), times every pipeline stage separately and
+writes throughput and peak traced memory per stage to a JSON results file that can be compared between commits.
+
+    python -m benchmarks.run_benchmarks --output results.json
+    python -m benchmarks.run_benchmarks --output new.json --compare results.json
+
+Each stage is timed once without tracing and measured once more under tracemalloc for its peak allocation.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from testing.corpus import write_corpus
+from src.html_backends import HTML_BACKENDS, get_list_node_extractor
+from src.html_parser import collect_html_file_paths
+from src.transformer import (encode_enriched_function_block, encode_enriched_function_block_fast,
+                             extract_enriched_function_blocks, trim_index_js)
+
+
+def measure(name: str, items: int, stage: Callable[[], object], trace_memory: bool = True) -> Dict:
+    start = time.perf_counter()
+    stage()
+    seconds = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        stage()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    result = {"items": items, "seconds": round(seconds, 6), "items_per_second": round(items / seconds, 1),
+              "peak_bytes": peak}
+    print(f"{name:>36} {items:>9} {seconds:>9.3f}s {items / seconds:>12.0f}/s "
+          f"{'' if peak is None else f'{peak / 2 ** 20:>9.1f} MiB'}", file=sys.stderr)
+    return result
+
+
+def run(directory: str, backends: List[str], trace_memory: bool) -> Dict[str, Dict]:
+    with open(os.path.join(directory, "index.js"), encoding="utf-8") as f:
+        raw_index_js = f.read()
+    trimmed = trim_index_js(raw_index_js)
+    index_json = json.loads(trimmed)
+    scala_types = [(package, scala_type) for package, types in index_json.items() for scala_type in types]
+    blocks = [block for package, scala_type in scala_types
+              for block in extract_enriched_function_blocks(package, scala_type)]
+    pages = sorted(collect_html_file_paths(directory, []))
+    index_bytes = len(raw_index_js.encode("utf-8"))
+
+    results = {
+        "trim_index_js": measure("trim_index_js (bytes)", index_bytes, lambda: trim_index_js(raw_index_js),
+                                 trace_memory),
+        "json.loads": measure("json.loads (bytes)", index_bytes, lambda: json.loads(trimmed), trace_memory),
+        "extract_enriched_function_blocks": measure(
+            "extract_enriched_function_blocks", len(blocks),
+            lambda: [extract_enriched_function_blocks(package, scala_type) for package, scala_type in scala_types],
+            trace_memory),
+        "encode_enriched_function_block": measure(
+            "encode_enriched_function_block", len(blocks),
+            lambda: [encode_enriched_function_block(block) for block in blocks], trace_memory),
+        "encode_enriched_function_block_fast": measure(
+            "encode_enriched_function_block_fast", len(blocks),
+            lambda: [encode_enriched_function_block_fast(block) for block in blocks], trace_memory),
+    }
+    for backend in backends:
+        try:
+            extractor = get_list_node_extractor(backend)
+        except ImportError:
+            print(f"{backend} not installed, skipped", file=sys.stderr)
+            continue
+        results[f"extract_list_nodes[{backend}]"] = measure(
+            f"extract_list_nodes[{backend}]", len(pages), lambda: [extractor(page) for page in pages], trace_memory)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: Dict, baseline: Dict):
+    print(f"{'stage':>36} {'baseline/s':>12} {'current/s':>12} {'change':>8}")
+    for stage, result in current["results"].items():
+        previous = baseline["results"].get(stage)
+        if previous is None:
+            continue
+        change = result["items_per_second"] / previous["items_per_second"] - 1
+        print(f"{stage:>36} {previous['items_per_second']:>12.0f} {result['items_per_second']:>12.0f} "
+              f"{change:>+8.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packages", type=int, default=20)
+    parser.add_argument("--types", type=int, default=10, help="Scala types per package")
+    parser.add_argument("--members", type=int, default=30, help="members per Scala type")
+    parser.add_argument("--backends", nargs="*", default=list(HTML_BACKENDS))
+    parser.add_argument("--corpus", default=None, help="reuse an existing corpus directory instead of generating one")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--output", default=None, help="JSON results file")
+    parser.add_argument("--compare", default=None, help="previous JSON results file to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.corpus:
+            directory, corpus = args.corpus, {}
+        else:
+            corpus = write_corpus(directory, args.packages, args.types, args.members)
+        results = run(directory, args.backends, not args.no_memory)
+
+    report = {"commit": git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+              "corpus": corpus, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+API diff between two extraction runs of a library, e.g. two versions of one java doc bundle. Both inputs are JSONL
+files of the same record type: EnrichedFunctionBlocks (extract), CommentedFunctionBlocks (extract --join) or
+HtmlCommentBlocks (html). Members are keyed by (package_name, file_name, normalized link); html records have no
+package or file name and are keyed by link only.
+
+Memory stays bounded for any input size: each input is sorted externally, in runs of at most run_size records that
+are spilled to temporary files and merged, and the two sorted streams are then joined in a single pass. Inputs that
+fit in one run are never spilled.
+"""
+import heapq
+import json
+import os
+import tempfile
+from dataclasses import dataclass, field
+from itertools import groupby
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from src import metrics
+from src.joiner import normalize_link
+from src.prefetch import chunked
+
+DEFAULT_RUN_SIZE = 100000
+ADDED, REMOVED, DEPRECATED, CHANGED = "added", "removed", "deprecated", "changed"
+# Separates the key components; sorts below every other character, so key strings sort like key tuples.
+_KEY_SEPARATOR = "\x00"
+
+
+@dataclass
+class MemberChange:
+    change: str
+    package_name: Optional[str]
+    file_name: Optional[str]
+    link: str
+    # Fields that differ, for CHANGED and DEPRECATED; function block fields are prefixed with 'function_block.'.
+    fields: List[str] = field(default_factory=list)
+
+
+@dataclass
+class DiffReport:
+    added: int = 0
+    removed: int = 0
+    deprecated: int = 0
+    changed: int = 0
+    unchanged: int = 0
+
+    def __str__(self):
+        return (f"added={self.added} removed={self.removed} deprecated={self.deprecated} changed={self.changed} "
+                f"unchanged={self.unchanged}")
+
+
+def record_key(record: Dict) -> str:
+    """
+    Sort and join key of a record: package name, file name and normalized member link.
+    """
+    function_block = record.get('function_block')
+    link = function_block['link'] if function_block is not None else record['link']
+    return _KEY_SEPARATOR.join((record.get('package_name') or "", record.get('file_name') or "",
+                                normalize_link(link or "")))
+
+
+def iter_sorted_records(f: TextIO, run_size: int = DEFAULT_RUN_SIZE,
+                        temp_dir: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Yields (key, line) for every record of a JSONL stream, sorted by key; records with equal keys keep their input
+    order. At most run_size records are held in memory, longer inputs are sorted in runs spilled to temp_dir.
+    """
+    lines = (line.rstrip("\n") for line in f if line.strip())
+    runs = []
+    try:
+        for chunk in chunked(lines, run_size):
+            with metrics.timer("diff.sort"):
+                entries = sorted(((record_key(json.loads(line)), line) for line in chunk), key=_entry_key)
+            if not runs and len(chunk) < run_size:
+                yield from entries
+                return
+            with metrics.timer("diff.spill"):
+                runs.append(_spill(entries, temp_dir))
+            metrics.count("diff.runs")
+        # heapq.merge is stable across runs in run order, which keeps equal keys in input order.
+        yield from heapq.merge(*(_iter_run(run) for run in runs), key=_entry_key)
+    finally:
+        for run in runs:
+            run.close()
+
+
+def _entry_key(entry: Tuple[str, str]) -> str:
+    return entry[0]
+
+
+def _spill(entries: List[Tuple[str, str]], temp_dir: Optional[str]) -> TextIO:
+    run = tempfile.TemporaryFile("w+", encoding="utf-8", dir=temp_dir)
+    for key, line in entries:
+        # JSON escapes tabs and newlines, so neither can occur inside the encoded key or the record line.
+        run.write(json.dumps(key))
+        run.write("\t")
+        run.write(line)
+        run.write("\n")
+    run.seek(0)
+    return run
+
+
+def _iter_run(run: TextIO) -> Iterator[Tuple[str, str]]:
+    for line in run:
+        key, record = line.rstrip("\n").split("\t", 1)
+        yield json.loads(key), record
+
+
+def diff_records(old: Iterator[Tuple[str, str]], new: Iterator[Tuple[str, str]],
+                 report: Optional[DiffReport] = None) -> Iterator[MemberChange]:
+    """
+    Joins two key-sorted (key, line) streams, see iter_sorted_records, and yields the changes from old to new in key
+    order. Records with the same key are paired in order; extra ones count as added or removed.
+    """
+    report = report if report is not None else DiffReport()
+    old_groups, new_groups = groupby(old, key=_entry_key), groupby(new, key=_entry_key)
+    old_group, new_group = next(old_groups, None), next(new_groups, None)
+    while old_group is not None or new_group is not None:
+        if new_group is None or (old_group is not None and old_group[0] < new_group[0]):
+            old_lines, new_lines = [line for _, line in old_group[1]], []
+            old_group = next(old_groups, None)
+        elif old_group is None or new_group[0] < old_group[0]:
+            old_lines, new_lines = [], [line for _, line in new_group[1]]
+            new_group = next(new_groups, None)
+        else:
+            old_lines, new_lines = [line for _, line in old_group[1]], [line for _, line in new_group[1]]
+            old_group, new_group = next(old_groups, None), next(new_groups, None)
+        for i in range(max(len(old_lines), len(new_lines))):
+            change = _compare(old_lines[i] if i < len(old_lines) else None,
+                              new_lines[i] if i < len(new_lines) else None, report)
+            if change is not None:
+                yield change
+
+
+def _compare(old_line: Optional[str], new_line: Optional[str], report: DiffReport) -> Optional[MemberChange]:
+    if old_line == new_line:
+        report.unchanged += 1
+        return None
+    old = json.loads(old_line) if old_line is not None else None
+    new = json.loads(new_line) if new_line is not None else None
+    if old is None:
+        report.added += 1
+        return _member_change(ADDED, new)
+    if new is None:
+        report.removed += 1
+        return _member_change(REMOVED, old)
+    old_fields, new_fields = _flatten(old), _flatten(new)
+    fields = sorted(name for name in old_fields.keys() | new_fields.keys()
+                    if old_fields.get(name) != new_fields.get(name))
+    if not fields:
+        # Same values, different formatting
+        report.unchanged += 1
+        return None
+    if new.get('is_deprecated') and not old.get('is_deprecated'):
+        report.deprecated += 1
+        return _member_change(DEPRECATED, new, fields)
+    report.changed += 1
+    return _member_change(CHANGED, new, fields)
+
+
+def _flatten(record: Dict) -> Dict:
+    flat = {name: value for name, value in record.items() if name != 'function_block'}
+    for name, value in (record.get('function_block') or {}).items():
+        flat['function_block.' + name] = value
+    return flat
+
+
+def _member_change(change: str, record: Dict, fields: Optional[List[str]] = None) -> MemberChange:
+    function_block = record.get('function_block')
+    return MemberChange(change, record.get('package_name'), record.get('file_name'),
+                        function_block['link'] if function_block is not None else record['link'], fields or [])
+
+
+def diff_files(old_path: str, new_path: str, run_size: int = DEFAULT_RUN_SIZE, report: Optional[DiffReport] = None,
+               temp_dir: Optional[str] = None) -> Iterator[MemberChange]:
+    """
+    Streams the changes between two JSONL files of extracted records, see diff_records.
+    """
+    with open(old_path, encoding="utf-8") as old, open(new_path, encoding="utf-8") as new:
+        yield from diff_records(iter_sorted_records(old, run_size, temp_dir),
+                                iter_sorted_records(new, run_size, temp_dir), report)
+
+
+def encode_member_change(change: MemberChange) -> str:
+    """
+    Encodes a MemberChange as a JSON string.
+    """
+    return json.dumps({'change': change.change, 'package_name': change.package_name, 'file_name': change.file_name,
+                       'link': change.link, 'fields': change.fields}, separators=(',', ':'))
+
+
+def default_temp_dir(output: Optional[str]) -> Optional[str]:
+    """
+    Spill runs next to the output file, which is likely to have room for them, or in the system temp directory.
+    """
+    return os.path.dirname(os.path.abspath(output)) if output and output != "-" else None
@@ -0,0 +1,85 @@
+"""
+Batch mode: many java doc bundles extracted in one process, over one shared parser pool. The batch manifest is a JSONL
+file with one bundle per line:
+
+    {"path": "cats-core_2.13-javadoc.zip"}
+    {"path": "fs2-core_2.13-javadoc.zip", "output": "fs2.jsonl", "comments_output": "fs2.comments.jsonl",
+     "cache": "fs2.sqlite"}
+
+Only path is required; output defaults to <output dir>/<bundle name>.jsonl. Bundles are scheduled largest first so the
+long ones do not end up alone at the tail of the run.
+"""
+import json
+import os
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class BundleJob:
+    path: str
+    output: str
+    comments_output: Optional[str] = None
+    cache: Optional[str] = None
+    size: int = 0
+
+
+@dataclass
+class BundleResult:
+    path: str
+    records: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    def __str__(self):
+        status = f"error={self.error!r}" if self.error else "ok"
+        return f"bundle={self.path} records={self.records} seconds={self.seconds:.2f} {status}"
+
+
+def bundle_name(path: str) -> str:
+    """
+    Output name of a bundle: the zip file name without its extension, or the directory name.
+    """
+    name = os.path.basename(os.path.normpath(path))
+    return name[:-len(".zip")] if name.endswith(".zip") else name
+
+
+def bundle_size(path: str) -> int:
+    """
+    Size in bytes of a zip, or of every file under a directory.
+    """
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def read_batch_manifest(path: str, output_dir: str = ".") -> List[BundleJob]:
+    """
+    Reads a batch manifest and returns its jobs in scheduling order, largest bundle first. Relative bundle and output
+    paths are resolved against the manifest's directory and output_dir respectively.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "path" not in entry:
+                raise ValueError(f"{path}:{line_number}: bundle entry without a path")
+            bundle = os.path.join(base, entry["path"])
+            output = entry.get("output") or bundle_name(bundle) + ".jsonl"
+            comments_output = entry.get("comments_output")
+            jobs.append(BundleJob(path=bundle, output=os.path.join(output_dir, output),
+                                  comments_output=os.path.join(output_dir, comments_output) if comments_output else None,
+                                  cache=entry.get("cache") and os.path.join(base, entry["cache"])))
+    return schedule(jobs)
+
+
+def schedule(jobs: List[BundleJob]) -> List[BundleJob]:
+    """
+    Largest bundle first; missing bundles sort last and fail when they are run. Ties keep manifest order.
+    """
+    for job in jobs:
+        job.size = bundle_size(job.path) if os.path.exists(job.path) else -1
+    return sorted(jobs, key=lambda job: -job.size)
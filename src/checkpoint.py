@@ -0,0 +1,171 @@
+"""
+Checkpoints for resumable runs. Every checkpoint_interval records, the Checkpointer flushes and fsyncs the JSONL
+outputs and atomically rewrites a small JSON file recording, per output, the byte offset and number of records known
+to be on disk, plus how many member pages (in walk order) have all their records in the comments output.
+
+A resumed run truncates each output to its checkpointed offset, which drops a partially written tail, reopens it for
+appending and skips what the checkpoint covers: the first function records of the index.js stream, which is
+deterministic, and the member pages already written, which are not parsed again. The checkpoint is removed when the run
+completes.
+"""
+import json
+import os
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Iterable, TextIO
+
+CHECKPOINT_SUFFIX = ".checkpoint"
+CHECKPOINT_VERSION = 1
+DEFAULT_CHECKPOINT_INTERVAL = 10000
+
+
+@dataclass
+class OutputState:
+    offset: int = 0
+    records: int = 0
+
+
+@dataclass
+class Checkpoint:
+    command: str
+    bundle: str
+    outputs: Dict[str, OutputState] = field(default_factory=dict)
+    # Member pages whose records are all in the comments output, in walk order, and their number of records.
+    html_files: int = 0
+    html_records: int = 0
+    version: int = CHECKPOINT_VERSION
+
+
+def checkpoint_path(output: str) -> str:
+    return output + CHECKPOINT_SUFFIX
+
+
+def read_checkpoint(path: str) -> Checkpoint:
+    """
+    Reads a checkpoint file. Raises ValueError for checkpoints of another version.
+    """
+    with open(path, encoding="utf-8") as f:
+        entry = json.load(f)
+    if entry.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} has checkpoint version {entry.get('version')}, expected {CHECKPOINT_VERSION}")
+    entry["outputs"] = {name: OutputState(**state) for name, state in entry["outputs"].items()}
+    return Checkpoint(**entry)
+
+
+def write_checkpoint(path: str, checkpoint: Checkpoint):
+    """
+    Replaces the checkpoint file atomically, so a crash leaves either the previous or the new checkpoint.
+    """
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(asdict(checkpoint), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+
+class CheckpointedOutput:
+    """
+    Text stream over a JSONL output file that counts the records written through it and lets its Checkpointer save a
+    checkpoint whenever a write completes a record.
+    """
+
+    def __init__(self, out: TextIO, checkpointer: 'Checkpointer', resumed_records: int = 0):
+        self.out = out
+        self.records = resumed_records
+        self.resumed_records = resumed_records
+        self._checkpointer = checkpointer
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, text: str) -> int:
+        self.out.write(text)
+        records = text.count("\n")
+        if records:
+            self.records += records
+            if text.endswith("\n"):
+                self._checkpointer.records_written(records)
+        return len(text)
+
+    def flush(self):
+        self.out.flush()
+
+    def close(self):
+        self.out.close()
+
+    def sync(self) -> OutputState:
+        """
+        Flushes and fsyncs the file and returns its state. Only call between records.
+        """
+        self.out.flush()
+        os.fsync(self.out.fileno())
+        return OutputState(offset=self.out.tell(), records=self.records)
+
+
+class Checkpointer:
+    """
+    Opens the outputs of a run and saves a checkpoint every interval records. With resume, continues the outputs of
+    the checkpoint at path instead of truncating them; the checkpoint must belong to the same command, bundle and
+    outputs. Call complete() when the run succeeded to remove the checkpoint.
+    """
+
+    def __init__(self, path: str, command: str, bundle: str, outputs: Iterable[str],
+                 interval: int = DEFAULT_CHECKPOINT_INTERVAL, resume: bool = False):
+        self.path = path
+        self.interval = interval
+        self._pending = 0
+        if resume:
+            self.checkpoint = read_checkpoint(path)
+            if (self.checkpoint.command, self.checkpoint.bundle) != (command, bundle) \
+                    or set(self.checkpoint.outputs) != set(outputs):
+                raise ValueError(f"{path} belongs to '{self.checkpoint.command} {self.checkpoint.bundle}' with "
+                                 f"outputs {sorted(self.checkpoint.outputs)}")
+        else:
+            self.checkpoint = Checkpoint(command, bundle, {output: OutputState() for output in outputs})
+        self._outputs: Dict[str, CheckpointedOutput] = {}
+        # Pages written since the checkpoint was loaded; the checkpoint itself only changes on save().
+        self.html_files = self.checkpoint.html_files
+        self.html_records = self.checkpoint.html_records
+
+    def __repr__(self):
+        return f"Checkpointer({self.path!r})"
+
+    def open_output(self, output: str, buffer_size: int) -> CheckpointedOutput:
+        """
+        Opens one of the outputs: truncated to its checkpointed offset and appended to when resuming, new otherwise.
+        Use the returned stream as a context manager.
+        """
+        state = self.checkpoint.outputs[output]
+        if state.offset:
+            with open(output, "r+b") as f:
+                f.truncate(state.offset)
+            out = open(output, "a", encoding="utf-8", buffering=buffer_size)
+        else:
+            out = open(output, "w", encoding="utf-8", buffering=buffer_size)
+        self._outputs[output] = CheckpointedOutput(out, self, state.records)
+        return self._outputs[output]
+
+    def html_file_done(self, records: int):
+        """
+        Called once all records of the next member page are in the comments output.
+        """
+        self.html_files += 1
+        self.html_records += records
+
+    def records_written(self, records: int):
+        self._pending += records
+        if self._pending >= self.interval:
+            self.save()
+
+    def save(self):
+        for output, out in self._outputs.items():
+            self.checkpoint.outputs[output] = out.sync()
+        self.checkpoint.html_files = self.html_files
+        self.checkpoint.html_records = self.html_records
+        write_checkpoint(self.path, self.checkpoint)
+        self._pending = 0
+
+    def complete(self):
+        os.remove(self.path)
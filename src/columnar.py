@@ -0,0 +1,310 @@
+"""
+Columnar output for EnrichedFunctionBlocks. Records are buffered into row groups of one list per column and written
+either as Parquet, when pyarrow is installed, or as a small self-describing columnar file (colfile) that needs nothing
+beyond the standard library. Both dictionary-encode the repetitive Scala type columns, so a package name or a class
+link is stored once per row group instead of once per member.
+
+colfile layout, all integers little-endian:
+
+    MAGIC
+    column segments, one or more per column per row group, each optionally zlib compressed
+    footer: UTF-8 JSON describing the columns, row groups and segment offsets
+    footer length (8 bytes)
+    MAGIC
+
+A plain string column is stored as a 'lengths' segment (int64 UTF-8 byte length per value, -1 for None) and a 'data'
+segment (the concatenated values). A dictionary column stores the distinct values of the row group the same way
+('dictionary_lengths', 'dictionary_data') plus an 'indices' segment (int32 index per row, -1 for None).
+"""
+import json
+import struct
+import sys
+import zlib
+from abc import ABC, abstractmethod
+from array import array
+from typing import TYPE_CHECKING, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from src.transformer import EnrichedFunctionBlock
+
+COLFILE_MAGIC = b"JDXCOL1\n"
+PARQUET_MAGIC = b"PAR1"
+COLFILE_VERSION = 1
+ROW_GROUP_SIZE = 1 << 16
+
+PARENT_COLUMNS = ('package_name', 'file_name', 'short_description', 'kind', 'case_class_link', 'class_link',
+                  'object_link', 'trait_link')
+FUNCTION_BLOCK_COLUMNS = ('function_block.label', 'function_block.tail', 'function_block.member',
+                          'function_block.link', 'function_block.kind')
+COLUMNS = PARENT_COLUMNS + FUNCTION_BLOCK_COLUMNS
+# Every Scala type field repeats for each of its members; member links and signatures are mostly unique.
+DICTIONARY_COLUMNS = frozenset(PARENT_COLUMNS + ('function_block.kind',))
+
+# 'columnar' writes Parquet when pyarrow is installed, colfile otherwise.
+COLUMNAR_FORMATS = ("columnar", "parquet", "colfile")
+
+_LENGTHS_TYPE, _INDICES_TYPE = 'q', 'i'
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+class ColumnarWriter(ABC):
+    """
+    Buffers EnrichedFunctionBlocks into row groups of row_group_size records. Subclasses write the row groups. Use as a
+    context manager, or call close() to write the last row group.
+    """
+
+    def __init__(self, row_group_size: int = ROW_GROUP_SIZE):
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self._columns: Dict[str, List[Optional[str]]] = {name: [] for name in COLUMNS}
+        self._pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, efb: 'EnrichedFunctionBlock'):
+        columns = self._columns
+        fb = efb.function_block
+        for name, value in zip(COLUMNS, (efb.package_name, efb.file_name, efb.short_description, efb.kind,
+                                         efb.case_class_link, efb.class_link, efb.object_link, efb.trait_link,
+                                         fb.label, fb.tail, fb.member, fb.link, fb.kind)):
+            columns[name].append(value)
+        self._pending += 1
+        if self._pending >= self.row_group_size:
+            self.flush()
+
+    def write_enriched_function_blocks(self, blocks: Iterable['EnrichedFunctionBlock']) -> int:
+        """
+        Writes blocks and returns their number, like transformer.write_enriched_function_blocks does for JSONL.
+        """
+        count = 0
+        for efb in blocks:
+            self.write(efb)
+            count += 1
+        return count
+
+    def flush(self):
+        if self._pending:
+            self._write_row_group(self._columns, self._pending)
+            self.rows += self._pending
+            self._columns = {name: [] for name in COLUMNS}
+            self._pending = 0
+
+    def close(self):
+        self.flush()
+        self._close()
+
+    @abstractmethod
+    def _write_row_group(self, columns: Dict[str, List[Optional[str]]], rows: int):
+        ...
+
+    @abstractmethod
+    def _close(self):
+        ...
+
+
+class ColfileWriter(ColumnarWriter):
+    """
+    Writes the colfile format described in the module docstring. compression is 'zlib' or None.
+    """
+
+    def __init__(self, out: BinaryIO, row_group_size: int = ROW_GROUP_SIZE, compression: Optional[str] = "zlib"):
+        super().__init__(row_group_size)
+        if compression not in ("zlib", None):
+            raise ValueError(f"Unknown colfile compression '{compression}'. Expected 'zlib' or None")
+        self._out = out
+        self._compression = compression
+        self._offset = len(COLFILE_MAGIC)
+        self._row_groups = []
+        out.write(COLFILE_MAGIC)
+
+    def _write_row_group(self, columns: Dict[str, List[Optional[str]]], rows: int):
+        row_group = {"rows": rows, "columns": {}}
+        for name in COLUMNS:
+            values = columns[name]
+            if name in DICTIONARY_COLUMNS:
+                dictionary, indices = _dictionary_encode(values)
+                lengths, data = _encode_strings(dictionary)
+                segments = {"dictionary_lengths": lengths, "dictionary_data": data, "indices": _to_bytes(indices)}
+            else:
+                lengths, data = _encode_strings(values)
+                segments = {"lengths": lengths, "data": data}
+            row_group["columns"][name] = {
+                segment_name: self._write_segment(segment) for segment_name, segment in segments.items()}
+        self._row_groups.append(row_group)
+
+    def _write_segment(self, segment: bytes) -> Tuple[int, int]:
+        if self._compression == "zlib":
+            segment = zlib.compress(segment, 1)
+        self._out.write(segment)
+        location = (self._offset, len(segment))
+        self._offset += len(segment)
+        return location
+
+    def _close(self):
+        footer = json.dumps({
+            "version": COLFILE_VERSION,
+            "compression": self._compression,
+            "columns": [{"name": name, "encoding": "dictionary" if name in DICTIONARY_COLUMNS else "plain"}
+                        for name in COLUMNS],
+            "row_groups": self._row_groups,
+        }, separators=(',', ':')).encode("utf-8")
+        self._out.write(footer)
+        self._out.write(struct.pack("<Q", len(footer)))
+        self._out.write(COLFILE_MAGIC)
+        self._out.flush()
+
+
+class ParquetWriter(ColumnarWriter):
+    """
+    Writes a Parquet file through pyarrow, one Parquet row group per buffered row group. Dictionary columns are
+    written as Arrow dictionary arrays.
+    """
+
+    def __init__(self, out: BinaryIO, row_group_size: int = ROW_GROUP_SIZE, compression: Optional[str] = "snappy"):
+        super().__init__(row_group_size)
+        import pyarrow
+        import pyarrow.parquet
+
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema([
+            pyarrow.field(name, pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+                          if name in DICTIONARY_COLUMNS else pyarrow.string())
+            for name in COLUMNS])
+        self._writer = pyarrow.parquet.ParquetWriter(out, self._schema, compression=compression or "none",
+                                                     use_dictionary=sorted(DICTIONARY_COLUMNS))
+
+    def _write_row_group(self, columns: Dict[str, List[Optional[str]]], rows: int):
+        pyarrow = self._pyarrow
+        arrays = []
+        for name in COLUMNS:
+            values = pyarrow.array(columns[name], pyarrow.string())
+            arrays.append(values.dictionary_encode() if name in DICTIONARY_COLUMNS else values)
+        self._writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self._schema), row_group_size=rows)
+
+    def _close(self):
+        self._writer.close()
+
+
+def open_columnar_writer(out: BinaryIO, columnar_format: str = "columnar",
+                         row_group_size: int = ROW_GROUP_SIZE) -> ColumnarWriter:
+    """
+    Returns a writer for one of COLUMNAR_FORMATS. Raises ValueError for unknown formats and ImportError when
+    'parquet' is requested without pyarrow.
+    """
+    if columnar_format not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unknown columnar format '{columnar_format}'. Expected one of: {', '.join(COLUMNAR_FORMATS)}")
+    if columnar_format == "columnar":
+        try:
+            import pyarrow.parquet  # noqa: F401
+            columnar_format = "parquet"
+        except ImportError:
+            columnar_format = "colfile"
+    if columnar_format == "parquet":
+        return ParquetWriter(out, row_group_size)
+    return ColfileWriter(out, row_group_size)
+
+
+def iter_row_groups(path: str) -> Iterator[Dict[str, List[Optional[str]]]]:
+    """
+    Reads a colfile or Parquet file written by this module and yields one dict of column lists per row group.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(len(COLFILE_MAGIC))
+    if magic.startswith(PARQUET_MAGIC):
+        import pyarrow.parquet
+
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        for i in range(parquet_file.num_row_groups):
+            yield parquet_file.read_row_group(i).to_pydict()
+        return
+    if magic != COLFILE_MAGIC:
+        raise ValueError(f"{path} is neither a colfile nor a Parquet file")
+    yield from _iter_colfile_row_groups(path)
+
+
+def iter_columnar_enriched_function_blocks(path: str) -> Iterator['EnrichedFunctionBlock']:
+    """
+    Rebuilds the EnrichedFunctionBlocks of a columnar file, in the order they were written.
+    """
+    # Imported here so that importing columnar for its format names does not load the transformer.
+    from src.transformer import EnrichedFunctionBlock, FunctionBlock
+
+    for columns in iter_row_groups(path):
+        parents = zip(*(columns[name] for name in PARENT_COLUMNS))
+        function_blocks = zip(*(columns[name] for name in FUNCTION_BLOCK_COLUMNS))
+        for parent, function_block in zip(parents, function_blocks):
+            yield EnrichedFunctionBlock(*parent, FunctionBlock(*function_block))
+
+
+def _iter_colfile_row_groups(path: str) -> Iterator[Dict[str, List[Optional[str]]]]:
+    with open(path, "rb") as f:
+        f.seek(-(8 + len(COLFILE_MAGIC)), 2)
+        footer_length, = struct.unpack("<Q", f.read(8))
+        f.seek(-(8 + len(COLFILE_MAGIC) + footer_length), 2)
+        footer = json.loads(f.read(footer_length))
+        if footer["version"] != COLFILE_VERSION:
+            raise ValueError(f"Unsupported colfile version {footer['version']} in {path}")
+        encodings = {column["name"]: column["encoding"] for column in footer["columns"]}
+
+        def read(location) -> bytes:
+            offset, length = location
+            f.seek(offset)
+            segment = f.read(length)
+            return zlib.decompress(segment) if footer["compression"] == "zlib" else segment
+
+        for row_group in footer["row_groups"]:
+            columns = {}
+            for name, segments in row_group["columns"].items():
+                if encodings[name] == "dictionary":
+                    dictionary = _decode_strings(read(segments["dictionary_lengths"]),
+                                                 read(segments["dictionary_data"]))
+                    indices = _from_bytes(_INDICES_TYPE, read(segments["indices"]))
+                    columns[name] = [dictionary[i] if i >= 0 else None for i in indices]
+                else:
+                    columns[name] = _decode_strings(read(segments["lengths"]), read(segments["data"]))
+            yield columns
+
+
+def _dictionary_encode(values: List[Optional[str]]) -> Tuple[List[str], array]:
+    positions: Dict[str, int] = {}
+    indices = array(_INDICES_TYPE, [-1 if value is None else positions.setdefault(value, len(positions))
+                                    for value in values])
+    return list(positions), indices
+
+
+def _encode_strings(values: List[Optional[str]]) -> Tuple[bytes, bytes]:
+    # surrogatepass: index.js escapes can decode to lone surrogates, which plain UTF-8 cannot represent.
+    encoded = [None if value is None else value.encode("utf-8", "surrogatepass") for value in values]
+    lengths = array(_LENGTHS_TYPE, [-1 if value is None else len(value) for value in encoded])
+    return _to_bytes(lengths), b"".join(value for value in encoded if value is not None)
+
+
+def _decode_strings(lengths: bytes, data: bytes) -> List[Optional[str]]:
+    values = []
+    position = 0
+    for length in _from_bytes(_LENGTHS_TYPE, lengths):
+        if length < 0:
+            values.append(None)
+        else:
+            values.append(data[position:position + length].decode("utf-8", "surrogatepass"))
+            position += length
+    return values
+
+
+def _to_bytes(values: array) -> bytes:
+    if _BIG_ENDIAN:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if _BIG_ENDIAN:
+        values.byteswap()
+    return values
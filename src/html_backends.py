@@ -0,0 +1,161 @@
+"""
+Alternative HTML backends for extract_list_nodes. Every backend returns the same HtmlCommentBlock values as the
+BeautifulSoup implementation in html_parser. bs4-targeted only builds the #template subtree, lxml and selectolax build
+the tree with a C parser. lxml and selectolax are optional dependencies. No parser is imported until a page is parsed
+with it, so pool workers load the backend they use (see preload_backend) and the parent process none.
+"""
+import importlib
+import importlib.util
+from concurrent.futures import Executor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.html_parser import (ANCHOR_CLASS, DEPRECATED_CLASS, FULL_COMMENT_CLASS, SHORT_COMMENT_CLASS, HtmlCommentBlock,
+                             _has_class, _select_href, _warn_unmarked_deprecation, extract_list_nodes,
+                             extract_list_nodes_targeted, open_member)
+
+# (path, source) -> blocks, see html_parser.open_member
+ListNodeExtractor = Callable[..., Optional[List[HtmlCommentBlock]]]
+
+
+def get_list_node_extractor(backend: str = "bs4") -> ListNodeExtractor:
+    """
+    Returns the extract_list_nodes implementation for a backend name. Raises ValueError for unknown backends and
+    ImportError when the backend's parser is not installed.
+    """
+    if backend not in HTML_BACKENDS:
+        raise ValueError(f"Unknown html backend '{backend}'. Expected one of: {', '.join(HTML_BACKENDS)}")
+    for module in BACKEND_MODULES[backend]:
+        # Fail before any worker starts, without importing the parser here.
+        if importlib.util.find_spec(module.partition(".")[0]) is None:
+            raise ImportError(f"The {backend} html backend needs {module}, which is not installed")
+    return HTML_BACKENDS[backend]
+
+
+def preload_backend(backend: str = "bs4"):
+    """
+    Imports the parser modules of a backend. Used as the initializer of parser pools, so workers load their parser
+    while the first files are read rather than on their first task.
+    """
+    for module in BACKEND_MODULES[backend]:
+        importlib.import_module(module)
+
+
+def open_parser_pool(max_workers: Optional[int] = None, backend: str = "bs4") -> Executor:
+    """
+    Process pool for extract_list_nodes and the index.js transform whose workers preload the parser of backend.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=preload_backend, initargs=(backend,))
+
+
+def _class_matches(class_value: Optional[str], expected: str) -> bool:
+    # class_value is the raw attribute; html_parser._has_class matches its classes the way BeautifulSoup does.
+    return class_value is not None and _has_class(class_value.split(), expected)
+
+
+def _build_comment_block(link: str, short_comment: Optional[str], has_full_comment: bool,
+                         deprecated_comment: Optional[str], is_deprecated: bool, text: Callable[[], str],
+                         raw_html: Callable[[], str]) -> HtmlCommentBlock:
+    # Mirrors node_to_flattened_function_comment_block, including the full comment holding the short comment text.
+    if not deprecated_comment and "@deprecated" in text():
+        _warn_unmarked_deprecation(raw_html())
+    return HtmlCommentBlock(link=link, short_comment=short_comment,
+                            full_comment=short_comment if has_full_comment else None,
+                            is_deprecated=is_deprecated, deprecated_comment=deprecated_comment)
+
+
+def extract_list_nodes_lxml(path: str, source=None) -> Optional[List[HtmlCommentBlock]]:
+    """
+    lxml implementation of extract_list_nodes.
+    """
+    import lxml.etree
+    import lxml.html
+
+    with open_member(path, source) as f:
+        root = lxml.html.document_fromstring(f.read())
+    template_nodes = root.xpath('//*[@id="template"]')
+    if len(template_nodes) != 1:
+        return None
+    return [_lxml_node_to_comment_block(li, lxml.etree) for li in template_nodes[0].iterdescendants("li")]
+
+
+def _lxml_node_to_comment_block(li, etree) -> HtmlCommentBlock:
+    short_tag = full_tag = deprecated_tag = anchor_tag = None
+    hrefs = []
+    for el in li.iterdescendants(etree.Element):
+        class_value = el.get("class")
+        if short_tag is None and _class_matches(class_value, SHORT_COMMENT_CLASS):
+            short_tag = el
+        if full_tag is None and _class_matches(class_value, FULL_COMMENT_CLASS):
+            full_tag = el
+        if deprecated_tag is None and _class_matches(class_value, DEPRECATED_CLASS):
+            deprecated_tag = el
+        if el.tag == "a":
+            if anchor_tag is None and _class_matches(class_value, ANCHOR_CLASS):
+                anchor_tag = el
+            href = el.get("href")
+            if href is not None:
+                hrefs.append(href)
+    deprecated_comment = deprecated_tag.get("title") if deprecated_tag is not None else None
+    return _build_comment_block(
+        link=_select_href(anchor_tag.text_content(), hrefs),
+        short_comment=short_tag.text_content() if short_tag is not None else None,
+        has_full_comment=full_tag is not None,
+        deprecated_comment=deprecated_comment,
+        is_deprecated=deprecated_tag is not None,
+        text=li.text_content,
+        raw_html=lambda: etree.tostring(li, encoding="unicode", with_tail=False))
+
+
+def extract_list_nodes_selectolax(path: str, source=None) -> Optional[List[HtmlCommentBlock]]:
+    """
+    selectolax (lexbor) implementation of extract_list_nodes.
+    """
+    from selectolax.lexbor import LexborHTMLParser
+
+    with open_member(path, source) as f:
+        tree = LexborHTMLParser(f.read())
+    template_nodes = tree.css("#template")
+    if len(template_nodes) != 1:
+        return None
+    return [_selectolax_node_to_comment_block(li) for li in template_nodes[0].css("li")]
+
+
+def _selectolax_first_descendant(node, selector: str, expected_class: str):
+    # css() can match the node itself, BeautifulSoup's find only searches descendants.
+    for match in node.css(selector):
+        if match.mem_id != node.mem_id and _class_matches(match.attributes.get("class"), expected_class):
+            return match
+    return None
+
+
+def _selectolax_node_to_comment_block(li) -> HtmlCommentBlock:
+    short_tag = _selectolax_first_descendant(li, ".shortcomment.cmt", SHORT_COMMENT_CLASS)
+    full_tag = _selectolax_first_descendant(li, ".comment.cmt", FULL_COMMENT_CLASS)
+    deprecated_tag = _selectolax_first_descendant(li, ".name.deprecated", DEPRECATED_CLASS)
+    anchor_tag = _selectolax_first_descendant(li, "a.anchorToMember", ANCHOR_CLASS)
+    hrefs = [a.attributes.get("href") or "" for a in li.css("a[href]") if a.mem_id != li.mem_id]
+    deprecated_comment = deprecated_tag.attributes.get("title") if deprecated_tag is not None else None
+    return _build_comment_block(
+        link=_select_href(anchor_tag.text(deep=True), hrefs),
+        short_comment=short_tag.text(deep=True) if short_tag is not None else None,
+        has_full_comment=full_tag is not None,
+        deprecated_comment=deprecated_comment,
+        is_deprecated=deprecated_tag is not None,
+        text=lambda: li.text(deep=True),
+        raw_html=lambda: li.html)
+
+
+HTML_BACKENDS: Dict[str, ListNodeExtractor] = {
+    "bs4": extract_list_nodes,
+    "bs4-targeted": extract_list_nodes_targeted,
+    "lxml": extract_list_nodes_lxml,
+    "selectolax": extract_list_nodes_selectolax,
+}
+# Parser modules each backend imports when it parses its first page.
+BACKEND_MODULES: Dict[str, Tuple[str, ...]] = {
+    "bs4": ("bs4",),
+    "bs4-targeted": ("bs4",),
+    "lxml": ("lxml.etree", "lxml.html"),
+    "selectolax": ("selectolax.lexbor",),
+}
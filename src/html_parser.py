@@ -1,8 +1,38 @@
-import bs4
+import functools
+import html
+import io
+import json
 import logging
 import os
-from dataclasses import dataclass
-from typing import List, Iterator, Optional, Dict
+import re
+from concurrent.futures import Executor
+from dataclasses import dataclass, asdict
+from functools import partial
+from typing import IO, TYPE_CHECKING, Callable, Dict, List, Iterable, Iterator, Optional, Pattern, TextIO, Tuple
+
+from src import metrics
+from src.prefetch import PREFETCH_SIZE, chunked, map_bounded, prefetch
+
+if TYPE_CHECKING:
+    import bs4
+
+SHORT_COMMENT_CLASS = "shortcomment cmt"
+FULL_COMMENT_CLASS = "comment cmt"
+DEPRECATED_CLASS = "name deprecated"
+ANCHOR_CLASS = "anchorToMember"
+
+# Chunks submitted to the process pool per worker before waiting for the oldest result.
+PENDING_CHUNKS_PER_WORKER = 4
+
+# bs4 is imported by the functions that parse with it: processes that only scan links, use the lxml or selectolax
+# backend or never parse html do not load it.
+# Opening tag of the #template node, used to skip tokenizing the page chrome in front of it.
+TEMPLATE_TAG_PATTERN = re.compile(r"""<[a-zA-Z][^<>]*?\sid\s*=\s*["']?template["'\s/>]""")
+_TEMPLATE_TAG_PATTERN_BYTES = re.compile(TEMPLATE_TAG_PATTERN.pattern.encode())
+_TAG_NAME_PATTERN = re.compile(rb"[a-zA-Z][^\s/>]*")
+_ATTR_PATTERN = re.compile(rb"""([^\s/>"'=]+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s>]*))?""")
+_ANY_TAG_PATTERN = re.compile(rb"""<(?:[^>"']|"[^"]*"|'[^']*')*>""")
+_ANCHOR_END_PATTERN = re.compile(rb"</a\s*>", re.I)
 
 
 @dataclass
@@ -15,53 +45,421 @@ class HtmlCommentBlock:
 
 
 def collect_html_file_paths(path: str, acc: List[str]) -> List[str]:
-    iter_items: Iterator[os.DirEntry] = os.scandir(path)
-    for item in iter_items:
-        if item.is_dir():
-            collect_html_file_paths(item.path, acc)
-        else:
-            if item.name.endswith(".html"):
-                acc.append(item.path)
+    acc.extend(iter_html_file_paths(path))
     return acc
 
 
-def extract_list_nodes(path: str) -> List[HtmlCommentBlock]:
+def iter_html_file_paths(path: str) -> Iterator[str]:
+    """
+    Yields the .html files under path, depth first with the entries of every directory in name order, so the order
+    does not depend on the file system. The walk keeps an explicit stack and does not recurse.
+    """
+    stack = [iter(_sorted_entries(path))]
+    while stack:
+        item = next(stack[-1], None)
+        if item is None:
+            stack.pop()
+        elif item.is_dir():
+            stack.append(iter(_sorted_entries(item.path)))
+        elif item.name.endswith(".html"):
+            yield item.path
+
+
+def _sorted_entries(path: str) -> List[os.DirEntry]:
+    with os.scandir(path) as entries:
+        return sorted(entries, key=lambda entry: entry.name)
+
+
+def open_member(path: str, source=None) -> TextIO:
+    """
+    Opens a member page, either from the file system or from a source (see sources.DirectorySource / ZipSource).
+    """
+    return source.open(path) if source is not None else open(path)
+
+
+def extract_list_nodes(path: str, source=None) -> List[HtmlCommentBlock]:
     # 'cats/instances/package$$all$.html#catsStdNonEmptyParallelForSeqZipSeq:cats.NonEmptyParallel.Aux[Seq,cats.data.ZipSeq]
-    with open(path) as f:
+    import bs4
+
+    with open_member(path, source) as f:
         soup = bs4.BeautifulSoup(markup=f, features='html.parser')
-        template_nodes = soup.findAll(id='template')
-        if len(template_nodes) != 1:
-            # throw exception and log
-            pass
+        return _template_list_nodes(soup)
+
+
+def extract_list_nodes_targeted(path: str, source=None) -> Optional[List[HtmlCommentBlock]]:
+    """
+    Same output as extract_list_nodes, but only the #template subtree is built. When the #template opening tag can be
+    located in the raw text, tokenizing starts there, and a SoupStrainer drops anything outside the subtree.
+    """
+    import bs4
+
+    with open_member(path, source) as f:
+        markup = f.read()
+    template_tags = TEMPLATE_TAG_PATTERN.findall(markup)
+    if len(template_tags) == 1:
+        markup = markup[markup.index(template_tags[0]):]
+    soup = bs4.BeautifulSoup(markup=markup, features='html.parser', parse_only=_template_strainer())
+    return _template_list_nodes(soup)
+
+
+@functools.lru_cache(maxsize=None)
+def _template_strainer() -> 'bs4.SoupStrainer':
+    import bs4
+    return bs4.SoupStrainer(id='template')
+
+
+def _template_list_nodes(soup: 'bs4.BeautifulSoup') -> Optional[List[HtmlCommentBlock]]:
+    template_nodes = soup.find_all(id='template')
+    if len(template_nodes) != 1:
+        # throw exception and log
+        pass
+    else:
+        head: 'bs4.element.Tag' = template_nodes[0]
+        list_elements = head.find_all(name="li")
+        return list(map(lambda li: node_to_flattened_function_comment_block(li), list_elements))
+
+
+class LazyHtmlCommentBlock:
+    """
+    HtmlCommentBlock whose link is extracted up front and whose other fields are parsed from the member's <li> on
+    first access. The record keeps the page path, its source and the byte range of the <li> in the page; the first
+    access reads and parses that range only, and caches the result.
+    """
+    __slots__ = ('link', 'path', 'source', 'start', 'end', '_block')
+
+    def __init__(self, link: str, path: str, source=None, start: int = 0, end: int = 0,
+                 block: Optional[HtmlCommentBlock] = None):
+        self.link = link
+        self.path = path
+        self.source = source
+        self.start = start
+        self.end = end
+        self._block = block
+
+    def __repr__(self):
+        return f"LazyHtmlCommentBlock({self.link!r}, {self.path!r}, start={self.start}, end={self.end})"
+
+    @property
+    def loaded(self) -> bool:
+        return self._block is not None
+
+    def load(self) -> HtmlCommentBlock:
+        """
+        Returns the HtmlCommentBlock of the member, parsing its <li> on the first call.
+        """
+        if self._block is None:
+            import bs4
+            with _open_member_binary(self.path, self.source) as f:
+                f.seek(self.start)
+                markup = _decode_markup(f.read(self.end - self.start))
+            li = bs4.BeautifulSoup(markup=markup, features='html.parser').find(name="li")
+            self._block = node_to_flattened_function_comment_block(li)
+        return self._block
+
+    @property
+    def short_comment(self) -> Optional[str]:
+        return self.load().short_comment
+
+    @property
+    def full_comment(self) -> Optional[str]:
+        return self.load().full_comment
+
+    @property
+    def is_deprecated(self) -> bool:
+        return self.load().is_deprecated
+
+    @property
+    def deprecated_comment(self) -> Optional[str]:
+        return self.load().deprecated_comment
+
+
+def extract_list_links(path: str, source=None) -> Optional[List[LazyHtmlCommentBlock]]:
+    """
+    Lazy version of extract_list_nodes: the same members with the same links, as LazyHtmlCommentBlocks. Only the tags
+    that decide membership and links (the #template element, <li> and <a>) are tokenized, with regular expressions
+    instead of a tree. Pages the scanner cannot follow, e.g. with unclosed <li> tags, are parsed by extract_list_nodes
+    and come back already loaded.
+    """
+    # Records reference the page itself, never the text a prefetching caller already read.
+    page_source = source.source if isinstance(source, _PrefetchedMember) else source
+    with _open_member_binary(path, page_source) as f:
+        data = f.read()
+    members = _scan_list_links(data)
+    if members is None:
+        blocks = extract_list_nodes(path, source)
+        return None if blocks is None else [LazyHtmlCommentBlock(block.link, path, page_source, block=block)
+                                            for block in blocks]
+    return [LazyHtmlCommentBlock(link, path, page_source, start, end) for link, start, end in members]
+
+
+def _open_member_binary(path: str, source=None):
+    return source.open_binary(path) if source is not None else open(path, "rb")
+
+
+def _decode_markup(data: bytes) -> str:
+    # Same text as reading the page through open_member, which applies universal newlines.
+    return data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _scan_list_links(data: bytes) -> Optional[List[Tuple[str, int, int]]]:
+    """
+    Helper function. Returns (link, start, end) for every <li> in the #template element, in document order, or None
+    when the page needs the full parser.
+    """
+    template_tags = _TEMPLATE_TAG_PATTERN_BYTES.findall(data)
+    if len(template_tags) != 1:
+        return None
+    start = data.index(template_tags[0])
+    template_name = _TAG_NAME_PATTERN.match(data, start + 1).group().lower()
+    pattern = _list_tag_pattern(template_name)
+    depth = 0
+    members = []
+    open_items = []
+    for token in pattern.finditer(data, start):
+        name = token.group('open')
+        if name is not None:
+            name = name.lower()
+            if name == template_name and not token.group('self_closing'):
+                depth += 1
+            if name == b"li":
+                # [link candidates, anchor text, start]; the end is set when the item closes.
+                item = [[], None, token.start()]
+                open_items.append(item)
+                members.append(item)
+            elif name == b"a" and open_items:
+                attrs = _parse_attrs(token.group('attrs'))
+                classes = attrs.get('class', '').split()
+                anchor_text = None
+                if classes and _has_class(classes, ANCHOR_CLASS):
+                    anchor_text = _anchor_text(data, token.end())
+                for item in open_items:
+                    if 'href' in attrs:
+                        item[0].append(attrs['href'])
+                    if item[1] is None and anchor_text is not None:
+                        item[1] = anchor_text
         else:
-            head: bs4.element.Tag = template_nodes[0]
-            list_elements = head.find_all(name="li")
-            return list(map(lambda li: node_to_flattened_function_comment_block(li), list_elements))
+            name = token.group('close')
+            if name is None:
+                continue
+            name = name.lower()
+            if name == b"li" and open_items:
+                open_items.pop().append(token.end())
+            elif name == template_name:
+                depth -= 1
+                if depth == 0:
+                    break
+    if depth or open_items or any(item[1] is None for item in members):
+        return None
+    return [(_select_href(anchor, hrefs), start, end) for hrefs, anchor, start, end in members]
 
 
-def node_to_flattened_function_comment_block(tag: bs4.element.Tag) -> HtmlCommentBlock:
-    maybe_short_comment_tag = tag.find(attrs={'class': "shortcomment cmt"})
-    maybe_short_comment = maybe_short_comment_tag.text if maybe_short_comment_tag else None
+def _parse_attrs(attrs: bytes) -> Dict[str, str]:
+    # Like html.parser: lower-cased names, first occurrence wins, entities in values decoded.
+    parsed = {}
+    for name, value in _ATTR_PATTERN.findall(attrs):
+        name = name.decode("utf-8").lower()
+        if name not in parsed:
+            if value[:1] in (b'"', b"'"):
+                value = value[1:-1]
+            parsed[name] = html.unescape(_decode_markup(value))
+    return parsed
 
-    maybe_full_comment_tag = tag.find(attrs={'class': "comment cmt"})
-    maybe_full_comment = maybe_short_comment_tag.text if maybe_full_comment_tag else None
 
-    maybe_deprecated_tag = tag.find(attrs={'class': "name deprecated"})
-    deprecated_comment = maybe_deprecated_tag.attrs.get('title') if maybe_deprecated_tag else None
-    if not deprecated_comment and "@deprecated" in tag.text:
-        logging.warning(
-            f"""Found @deprecated text in html, but record was not marked as deprecated. Inspect and update parser.
-            Raw html: {tag}""")
-    return HtmlCommentBlock(link=select_link(tag), short_comment=maybe_short_comment, full_comment=maybe_full_comment,
-                            is_deprecated=bool(maybe_deprecated_tag), deprecated_comment=deprecated_comment)
+def _anchor_text(data: bytes, start: int) -> str:
+    end = _ANCHOR_END_PATTERN.search(data, start)
+    text = _ANY_TAG_PATTERN.sub(b"", data[start:end.start() if end else len(data)])
+    return html.unescape(_decode_markup(text))
 
 
-def select_link(tag: bs4.element.Tag) -> str:
-    function_id = tag.find(name="a", attrs={'class': "anchorToMember"})
-    links = tag.find_all(name="a", href=True)
-    for link in links:
-        current = link.attrs.get('href')
-        if function_id.text in current:
+@functools.lru_cache(maxsize=None)
+def _list_tag_pattern(template_name: bytes) -> Pattern[bytes]:
+    # Comments and raw text elements are matched whole so tags inside them are skipped.
+    names = b"|".join(re.escape(name) for name in {b"li", b"a", template_name})
+    return re.compile(rb"""
+        <!--.*?-->
+      | <(?:script|style)\b.*?</(?:script|style)\s*>
+      | </(?P<close>""" + names + rb""")\s*>
+      | <(?P<open>""" + names + rb""")(?=[\s/>])
+        (?P<attrs>(?:\s*[^\s/>"'=]+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s>]*))?)*)\s*(?P<self_closing>/?)>
+    """, re.S | re.X | re.I)
+
+
+def extract_list_nodes_parallel(paths: Iterable[str], max_workers: Optional[int] = None, chunk_size: int = 1,
+                                extractor: Optional[Callable] = None, source=None,
+                                prefetch_size: int = PREFETCH_SIZE) -> List[Tuple[str, List[HtmlCommentBlock]]]:
+    """
+    Batch version of extract_list_nodes. Returns (path, blocks) pairs in the same order as the input paths.
+    """
+    return list(iter_extract_list_nodes_parallel(paths, max_workers, chunk_size, extractor, source, prefetch_size))
+
+
+def iter_extract_list_nodes_parallel(paths: Iterable[str], max_workers: Optional[int] = None, chunk_size: int = 1,
+                                     extractor: Optional[Callable] = None, source=None,
+                                     prefetch_size: int = PREFETCH_SIZE, executor: Optional[Executor] = None
+                                     ) -> Iterator[Tuple[str, List[HtmlCommentBlock]]]:
+    """
+    Spreads extract_list_nodes over a process pool and streams (path, blocks) pairs in input order. Files without a
+    #template node produce an empty list. With max_workers=1 the files are parsed in this process. extractor replaces
+    extract_list_nodes, e.g. with a backend from html_backends; it must be a module level function. source reads the
+    paths from a bundle source instead of the file system. When metrics are enabled, the workers' measurements are
+    merged into this process's metrics.
+
+    paths may be a lazy iterator such as iter_html_file_paths: it is consumed by a prefetch thread while earlier files
+    are parsed, and at most PENDING_CHUNKS_PER_WORKER chunks per worker are in flight. In-process, the prefetch thread
+    also reads the file contents ahead of the parser. prefetch_size bounds both queues; 0 disables prefetching.
+
+    executor shares an existing process pool, e.g. between the bundles of a batch run, instead of starting one.
+    """
+    extractor = extractor or extract_list_nodes
+    if max_workers == 1:
+        # Lazy records read their byte ranges from the page, so reading its text ahead would be wasted.
+        if not prefetch_size or extractor is extract_list_links:
+            yield from map(partial(_extract_path, extractor, source), paths)
+            return
+        for path, text in prefetch(((path, _read_member(path, source)) for path in paths), prefetch_size):
+            yield _extract_path(extractor, _PrefetchedMember(text, source), path)
+        return
+    if prefetch_size and not isinstance(paths, (list, tuple)):
+        paths = prefetch(paths, prefetch_size)
+    collector = metrics.get_metrics()
+    if collector.enabled:
+        extract = partial(_extract_path_with_metrics, extractor, source, collector.slow_files)
+    else:
+        extract = partial(_extract_path, extractor, source)
+    window = (max_workers or os.cpu_count() or 1) * PENDING_CHUNKS_PER_WORKER
+    if executor is not None:
+        yield from _iter_extract_in_pool(executor, extract, paths, chunk_size, window, collector)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        yield from _iter_extract_in_pool(executor, extract, paths, chunk_size, window, collector)
+
+
+def _iter_extract_in_pool(executor: Executor, extract: Callable, paths: Iterable[str], chunk_size: int, window: int,
+                          collector: metrics.Metrics) -> Iterator[Tuple[str, List[HtmlCommentBlock]]]:
+    for results in map_bounded(executor, partial(_extract_chunk, extract), chunked(paths, chunk_size), window):
+        if not collector.enabled:
+            yield from results
+            continue
+        for path, blocks, summary in results:
+            collector.merge(summary)
+            yield path, blocks
+
+
+def _extract_chunk(extract: Callable, paths: List[str]) -> list:
+    return [extract(path) for path in paths]
+
+
+def _read_member(path: str, source) -> str:
+    with open_member(path, source) as f:
+        return f.read()
+
+
+class _PrefetchedMember:
+    """
+    Stands in for the bundle source of a single member whose text was already read, so extractors parse it through
+    the usual open_member call. source is the bundle source the text was read from, None for the file system.
+    """
+
+    def __init__(self, text: str, source=None):
+        self._text = text
+        self.source = source
+
+    def open(self, name: str) -> TextIO:
+        return io.StringIO(self._text)
+
+    def open_binary(self, name: str) -> IO[bytes]:
+        # Byte offsets refer to the page as stored, not to the newline-translated text.
+        return _open_member_binary(name, self.source)
+
+
+def _extract_path(extractor: Callable, source, path: str) -> Tuple[str, List[HtmlCommentBlock]]:
+    with metrics.timer("html.parse", path):
+        blocks = extractor(path, source) or []
+    metrics.count("html.files")
+    metrics.count("html.blocks", len(blocks))
+    return path, blocks
+
+
+def _extract_path_with_metrics(extractor: Callable, source, slow_files: int,
+                               path: str) -> Tuple[str, List[HtmlCommentBlock], Dict]:
+    # Runs in a pool worker: measure this file only and hand the summary back to the parent.
+    metrics.enable_metrics(slow_files)
+    try:
+        path, blocks = _extract_path(extractor, source, path)
+        return path, blocks, metrics.get_metrics().summary()
+    finally:
+        metrics.disable_metrics()
+
+
+def node_to_flattened_function_comment_block(tag: 'bs4.element.Tag') -> HtmlCommentBlock:
+    """
+    Collects the anchor, hrefs, comment nodes and deprecation marker of a member in one walk over its descendants.
+    Matches the first descendant per class like tag.find, and select_link's choice of href.
+    """
+    from bs4.element import Tag
+
+    short_comment_tag = full_comment_tag = deprecated_tag = anchor_tag = None
+    hrefs = []
+    has_at_sign = False
+    for node in tag.descendants:
+        if type(node) is Tag:
+            classes = node.attrs.get('class')
+            if classes:
+                if short_comment_tag is None and _has_class(classes, SHORT_COMMENT_CLASS):
+                    short_comment_tag = node
+                if full_comment_tag is None and _has_class(classes, FULL_COMMENT_CLASS):
+                    full_comment_tag = node
+                if deprecated_tag is None and _has_class(classes, DEPRECATED_CLASS):
+                    deprecated_tag = node
+            if node.name == 'a':
+                if anchor_tag is None and classes and _has_class(classes, ANCHOR_CLASS):
+                    anchor_tag = node
+                href = node.attrs.get('href')
+                if href is not None:
+                    hrefs.append(href)
+        elif not has_at_sign and '@' in node:
+            has_at_sign = True
+
+    maybe_short_comment = short_comment_tag.text if short_comment_tag else None
+    # The full comment has always been reported with the short comment's text.
+    maybe_full_comment = maybe_short_comment if full_comment_tag else None
+    deprecated_comment = deprecated_tag.attrs.get('title') if deprecated_tag else None
+    # tag.text is only built when a string holds an '@', which also covers matches spanning several strings.
+    if not deprecated_comment and has_at_sign and "@deprecated" in tag.text:
+        _warn_unmarked_deprecation(tag)
+    return HtmlCommentBlock(link=_select_href(anchor_tag.text, hrefs), short_comment=maybe_short_comment,
+                            full_comment=maybe_full_comment, is_deprecated=bool(deprecated_tag),
+                            deprecated_comment=deprecated_comment)
+
+
+def _warn_unmarked_deprecation(raw_html) -> None:
+    logging.warning(
+        f"""Found @deprecated text in html, but record was not marked as deprecated. Inspect and update parser.
+            Raw html: {raw_html}""")
+
+
+def _has_class(classes: List[str], expected: str) -> bool:
+    # Same rule as tag.find(attrs={'class': expected}): one of the classes, or the whole class string.
+    return expected in classes or " ".join(classes) == expected
+
+
+def _select_href(function_id: str, hrefs: List[str]) -> str:
+    for current in hrefs:
+        if function_id in current:
             return current.lstrip("../")
-    # TODO throw exception or log
     return ""
+
+
+def select_link(tag: 'bs4.element.Tag') -> str:
+    function_id = tag.find(name="a", attrs={'class': ANCHOR_CLASS})
+    links = tag.find_all(name="a", href=True)
+    # TODO throw exception or log when nothing matches
+    return _select_href(function_id.text, [link.attrs.get('href') for link in links])
+
+
+def encode_html_comment_block(hcb: HtmlCommentBlock) -> str:
+    """
+    Encodes an HtmlCommentBlock as a JSON string.
+    """
+    return json.dumps(asdict(hcb), separators=(',', ':'))
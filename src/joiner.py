@@ -0,0 +1,97 @@
+"""
+Joins the two pipelines: EnrichedFunctionBlocks from index.js and HtmlCommentBlocks from the member pages. Comment
+blocks are indexed by normalized link once, then every function block is matched with a single dict lookup, so the
+join is linear in the number of members on both sides.
+"""
+import html
+import json
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from src.html_parser import HtmlCommentBlock
+from src.transformer import EnrichedFunctionBlock
+
+
+@dataclass
+class CommentedFunctionBlock(EnrichedFunctionBlock):
+    """
+    An EnrichedFunctionBlock with the comment and deprecation data of its member page. The comment fields keep their
+    defaults when no HtmlCommentBlock matched the function link.
+    """
+    short_comment: Optional[str] = None
+    full_comment: Optional[str] = None
+    is_deprecated: bool = False
+    deprecated_comment: Optional[str] = None
+
+
+@dataclass
+class JoinReport:
+    matched: int = 0
+    duplicate_comment_links: int = 0
+    unmatched_function_links: List[str] = field(default_factory=list)
+    unmatched_comment_links: List[str] = field(default_factory=list)
+
+    def __str__(self):
+        return (f"matched={self.matched} unmatched_functions={len(self.unmatched_function_links)} "
+                f"unmatched_comments={len(self.unmatched_comment_links)} "
+                f"duplicate_comment_links={self.duplicate_comment_links}")
+
+
+def normalize_link(link: str) -> str:
+    """
+    Normalizes index.js and html member links to the same form: bundle-relative, with html entities decoded.
+    """
+    return html.unescape(link).lstrip("./")
+
+
+def build_comment_index(comment_blocks: Iterable[HtmlCommentBlock],
+                        report: Optional[JoinReport] = None) -> Dict[str, HtmlCommentBlock]:
+    """
+    Hash index from normalized link to HtmlCommentBlock. The first block wins when a link appears more than once.
+    """
+    index: Dict[str, HtmlCommentBlock] = {}
+    for block in comment_blocks:
+        key = normalize_link(block.link)
+        if key in index:
+            if report is not None:
+                report.duplicate_comment_links += 1
+        else:
+            index[key] = block
+    return index
+
+
+def join_function_blocks(function_blocks: Iterable[EnrichedFunctionBlock], comment_index: Dict[str, HtmlCommentBlock],
+                         report: Optional[JoinReport] = None) -> Iterator[CommentedFunctionBlock]:
+    """
+    Attaches comments to every function block, in input order. When the input is exhausted the report holds the
+    unmatched links of both sides.
+    """
+    matched: Set[str] = set()
+    for efb in function_blocks:
+        key = normalize_link(efb.function_block.link)
+        comment = comment_index.get(key)
+        if comment is None:
+            if report is not None:
+                report.unmatched_function_links.append(efb.function_block.link)
+            yield CommentedFunctionBlock(**_fields(efb))
+        else:
+            matched.add(key)
+            if report is not None:
+                report.matched += 1
+            yield CommentedFunctionBlock(**_fields(efb), short_comment=comment.short_comment,
+                                         full_comment=comment.full_comment, is_deprecated=comment.is_deprecated,
+                                         deprecated_comment=comment.deprecated_comment)
+    if report is not None:
+        report.unmatched_comment_links.extend(block.link for key, block in comment_index.items() if key not in matched)
+
+
+def _fields(efb: EnrichedFunctionBlock) -> Dict:
+    # Shallow copy of the fields; asdict would deep copy the nested FunctionBlock.
+    return {name: getattr(efb, name) for name in EnrichedFunctionBlock.__dataclass_fields__}
+
+
+def encode_commented_function_block(cfb: CommentedFunctionBlock) -> str:
+    """
+    Encodes a CommentedFunctionBlock as a JSON string.
+    """
+    return json.dumps(asdict(cfb), separators=(',', ':'))
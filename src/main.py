@@ -1,25 +1,165 @@
 # -*- coding: utf-8 -*-
 """
-This is a skeleton file that can serve as a starting point for a Python
-console script. To run this script uncomment the following lines in the
-[options.entry_points] section in setup.cfg:
+Console entry point for the java-doc-extractor.
 
-    console_scripts =
-         fibonacci = java_doc_extractor.skeleton:run
+    python -m src.main extract <javadoc.zip|javadoc_dir> [-o functions.jsonl] [--comments-output comments.jsonl]
+    python -m src.main html <javadoc.zip|javadoc_dir> [-o comments.jsonl]
+    python -m src.main batch <bundles.jsonl> [--output-dir out]
+    python -m src.main diff <old.jsonl> <new.jsonl> [-o changes.jsonl]
 
-Then run `python setup.py install` which will install the command `fibonacci`
-inside your current environment.
-Besides console scripts, the header (i.e. until _logger...) of this file can
-also be used as template for Python modules.
-
-Note: This skeleton file can be safely removed if not needed!
+extract streams the EnrichedFunctionBlocks of the bundle's index.js as JSONL, and optionally the HtmlCommentBlocks of
+its member pages. With --join the function records carry their member page comments (see joiner). html only writes
+the HtmlCommentBlocks. Records are written as they are produced, in file order.
+Both commands accept --workers, --chunk-size, --backend, --cache, --buffer-size and --stats. --metrics writes per stage
+timers, counters and the slowest html files as JSON; --profile writes a cProfile dump of the run. --shards writes
+the JSONL output as size-capped, optionally compressed shards with a manifest (see sink) and --upload copies them to S3.
+batch runs extract for every bundle of a batch manifest (see batch) over one shared parser pool. diff writes the
+added, removed, deprecated and changed members between the outputs of two runs (see api_diff).
 """
 
-import sys
+import argparse
+import contextlib
+import io
 import logging
+import sys
+import os
+import time
+from dataclasses import dataclass
+from itertools import islice
+
+from src import metrics
+from src.batch import BundleResult, read_batch_manifest
+from src.checkpoint import DEFAULT_CHECKPOINT_INTERVAL, Checkpointer, checkpoint_path
+from src.columnar import COLUMNAR_FORMATS
+from src.html_backends import HTML_BACKENDS, get_list_node_extractor, open_parser_pool
+from src.html_parser import encode_html_comment_block, iter_extract_list_nodes_parallel
+from src.sink import COMPRESSIONS
+from src.sources import open_source
+
+# Modules only some commands need (transformer, joiner, manifest_cache, the sink and columnar writers, api_diff) and
+# multiprocessing are imported where they are used, to keep the startup of the CLI and of spawned workers short; see
+# benchmarks/bench_startup.py. The html parsers are imported by the processes that parse, see html_backends.
 
 _logger = logging.getLogger(__name__)
 
+DEFAULT_BUFFER_SIZE = 1 << 20
+DEFAULT_CONCURRENT_BUNDLES = 2
+# Outputs are written under this suffix and renamed when their bundle succeeded.
+PARTIAL_SUFFIX = ".partial"
+
+
+@dataclass
+class RunStats:
+    records: int
+    seconds: float
+    peak_rss_kib: int
+
+    def __str__(self):
+        rate = self.records / self.seconds if self.seconds else 0.0
+        return (f"records={self.records} seconds={self.seconds:.2f} records_per_second={rate:.1f} "
+                f"peak_rss_kib={self.peak_rss_kib}")
+
+
+def parse_args(args):
+    """Parse command line parameters
+
+    Args:
+      args ([str]): command line parameters as list of strings
+
+    Returns:
+      :obj:`argparse.Namespace`: command line parameters namespace
+    """
+    parser = argparse.ArgumentParser(description="Extract Scala functions from java doc bundles.")
+    parser.add_argument("-v", "--verbose", dest="loglevel", help="set loglevel to INFO",
+                        action="store_const", const=logging.INFO)
+
+    observability = argparse.ArgumentParser(add_help=False)
+    observability.add_argument("--buffer-size", type=int, default=DEFAULT_BUFFER_SIZE,
+                               help="output buffer size in bytes")
+    observability.add_argument("--stats", action="store_true",
+                               help="print records per second and peak RSS to stderr when done")
+    observability.add_argument("--metrics", default=None, metavar="PATH",
+                               help="write per stage timers, counters and the slowest files as JSON (- for stderr)")
+    observability.add_argument("--slow-files", type=int, default=metrics.DEFAULT_SLOW_FILES,
+                               help="number of slowest files kept by --metrics")
+    observability.add_argument("--profile", default=None, metavar="PATH",
+                               help="profile the run with cProfile and write the stats to PATH (see pstats)")
+
+    tuning = argparse.ArgumentParser(add_help=False, parents=[observability])
+    tuning.add_argument("--workers", type=int, default=None,
+                        help="number of parser processes (default: one per CPU, 1 parses in-process)")
+    tuning.add_argument("--chunk-size", type=int, default=1, help="number of files sent to a worker per task")
+    tuning.add_argument("--backend", choices=sorted(HTML_BACKENDS), default="bs4",
+                        help="html parser used to extract members (lxml and selectolax must be installed)")
+
+    common = argparse.ArgumentParser(add_help=False, parents=[tuning])
+    common.add_argument("path", help="java doc zip or extracted directory")
+    common.add_argument("-o", "--output", default=None, help="output JSONL file (default: stdout)")
+    common.add_argument("--cache", default=None,
+                        help="manifest file of previous results; only new or changed files and index.js are parsed")
+    common.add_argument("--shards", default=None, metavar="DIR",
+                        help="write the JSONL output as shards plus a manifest.json into DIR instead of -o")
+    common.add_argument("--shard-records", type=int, default=None, help="maximum records per shard")
+    common.add_argument("--shard-bytes", type=int, default=None, help="maximum uncompressed bytes per shard")
+    common.add_argument("--compression", choices=COMPRESSIONS, default=None,
+                        help="compress shards (zstd needs the zstandard package)")
+    common.add_argument("--upload", default=None, metavar="URL",
+                        help="upload every finished shard and the manifest to s3://bucket/prefix (needs boto3) or "
+                             "file:///path")
+    common.add_argument("--upload-endpoint", default=None, metavar="URL",
+                        help="S3 endpoint for --upload, e.g. a MinIO server")
+    common.add_argument("--checkpoint", action="store_true",
+                        help="save a checkpoint next to the -o file every --checkpoint-interval records")
+    common.add_argument("--checkpoint-interval", type=int, default=DEFAULT_CHECKPOINT_INTERVAL,
+                        help="records between checkpoints")
+    common.add_argument("--resume", action="store_true",
+                        help="continue an interrupted --checkpoint run from its last checkpoint, with the same arguments")
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    extract = subparsers.add_parser("extract", parents=[common],
+                                    help="extract EnrichedFunctionBlocks from the bundle's index.js")
+    extract.add_argument("--comments-output", default=None,
+                         help="also extract HtmlCommentBlocks from the member pages into this JSONL file")
+    extract.add_argument("--join", action="store_true",
+                         help="attach member page comments and deprecations to every function record")
+    extract.add_argument("--transform-workers", type=int, default=1,
+                         help="processes for the index.js transform of large indexes (default: 1, in-process)")
+    extract.add_argument("--format", choices=("jsonl",) + COLUMNAR_FORMATS, default="jsonl",
+                         help="function record output format: columnar writes Parquet when pyarrow is installed and "
+                              "a colfile (see src/columnar.py) otherwise; columnar formats need -o and no --join")
+    subparsers.add_parser("html", parents=[common], help="extract HtmlCommentBlocks from the member pages")
+    batch = subparsers.add_parser("batch", parents=[tuning],
+                                  help="extract every bundle of a batch manifest over one shared worker pool")
+    batch.add_argument("manifest", help="JSONL file with one {\"path\": ...} entry per bundle, see src/batch.py")
+    batch.add_argument("--output-dir", default=".", help="directory for outputs without an explicit path")
+    batch.add_argument("--join", action="store_true",
+                       help="attach member page comments and deprecations to every function record")
+    batch.add_argument("--transform-workers", type=int, default=1,
+                       help="transform large index.js files on the shared worker pool unless 1 (default)")
+    batch.add_argument("--bundles", type=int, default=DEFAULT_CONCURRENT_BUNDLES,
+                       help="number of bundles extracted at the same time")
+    diff = subparsers.add_parser("diff", parents=[observability],
+                                 help="report added, removed, deprecated and changed members between two runs")
+    diff.add_argument("old", help="JSONL output of the earlier run")
+    diff.add_argument("new", help="JSONL output of the later run, of the same record type")
+    diff.add_argument("-o", "--output", default=None, help="output JSONL file of changes (default: stdout)")
+    diff.add_argument("--run-size", type=int, default=None,
+                      help="records sorted in memory at a time (default: 100000); larger inputs are sorted in "
+                           "temporary files")
+    parsed = parser.parse_args(args)
+    if getattr(parsed, "format", "jsonl") != "jsonl" and (parsed.join or not parsed.output or parsed.output == "-"):
+        parser.error("columnar output formats need an -o file and cannot be combined with --join")
+    if getattr(parsed, "shards", None) and (parsed.output or getattr(parsed, "format", "jsonl") != "jsonl"):
+        parser.error("--shards replaces -o and only writes JSONL")
+    if getattr(parsed, "checkpoint", False) or getattr(parsed, "resume", False):
+        if not parsed.output or parsed.output == "-" or parsed.shards or getattr(parsed, "join", False) \
+                or getattr(parsed, "format", "jsonl") != "jsonl":
+            parser.error("--checkpoint and --resume need a JSONL -o file and cannot be combined with --join or --shards")
+    if parsed.command not in ("batch", "diff") and not parsed.shards and (
+            parsed.shard_records or parsed.shard_bytes or parsed.compression or parsed.upload):
+        parser.error("--shard-records, --shard-bytes, --compression and --upload need --shards")
+    return parsed
+
 
 def setup_logging(loglevel):
     """Setup basic logging
@@ -28,18 +168,428 @@ def setup_logging(loglevel):
       loglevel (int): minimum loglevel for emitting messages
     """
     logformat = "[%(asctime)s] %(levelname)s:%(name)s:%(message)s"
-    logging.basicConfig(level=loglevel, stream=sys.stdout,
+    logging.basicConfig(level=loglevel, stream=sys.stderr,
                         format=logformat, datefmt="%Y-%m-%d %H:%M:%S")
 
 
+@contextlib.contextmanager
+def open_output(path, buffer_size):
+    """Open a JSONL output stream with the requested buffer size
+
+    Args:
+      path (str): output file, or None / "-" for stdout
+      buffer_size (int): write buffer size in bytes
+    """
+    if path and path != "-":
+        with open(path, "w", encoding="utf-8", buffering=buffer_size) as out:
+            yield out
+        return
+    try:
+        out = open(sys.stdout.fileno(), "w", encoding="utf-8", buffering=buffer_size, closefd=False)
+    except (AttributeError, io.UnsupportedOperation):
+        # stdout was replaced by an in-memory stream
+        yield sys.stdout
+        return
+    sys.stdout.flush()
+    with out:
+        yield out
+
+
+def peak_rss_kib():
+    """Peak resident set size of this process and its finished children, in KiB
+
+    Returns:
+      int: peak RSS, 0 where the resource module is unavailable
+    """
+    try:
+        import resource
+    except ImportError:
+        return 0
+    usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is reported in bytes on macOS and KiB elsewhere
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+
+def run_extract(source, out, comments_out=None, workers=None, chunk_size=1, backend="bs4", cache=None, join=False,
+                executor=None, transform_workers=1, checkpointer=None):
+    """Stream the bundle's EnrichedFunctionBlocks, and optionally its HtmlCommentBlocks, as JSONL
+
+    Args:
+      source (sources.DirectorySource | sources.ZipSource): java doc bundle
+      out (io.TextIOBase | columnar.ColumnarWriter): EnrichedFunctionBlock output stream, or a columnar writer
+      comments_out (io.TextIOBase): optional HtmlCommentBlock output stream
+      workers (int): number of parser processes
+      chunk_size (int): number of files per worker task
+      backend (str): html backend name, see html_backends.HTML_BACKENDS
+      cache (str): optional manifest path, see manifest_cache.ManifestCache
+      join (bool): write CommentedFunctionBlocks, joined with the member page comments, instead of
+        EnrichedFunctionBlocks
+      executor (concurrent.futures.Executor): optional shared parser pool
+      transform_workers (int): processes for the index.js transform, see transformer.transform_scala_types; other
+        than 1, the transform runs on executor when given
+      checkpointer (checkpoint.Checkpointer): checkpoints the run; out and comments_out must be its outputs, and
+        records they already hold are skipped
+
+    Returns:
+      int: number of records written
+    """
+    from src.columnar import ColumnarWriter
+    from src.joiner import JoinReport, build_comment_index, encode_commented_function_block, join_function_blocks
+    from src.transformer import (TransformReport, stream_index_js_to_enriched_function_blocks,
+                                 write_enriched_function_blocks)
+
+    count = 0
+    comment_index = None
+    report = JoinReport()
+    if join:
+        comment_blocks = iter_html_comment_blocks(source, workers, chunk_size, backend, cache, executor)
+        if comments_out is not None:
+            comment_blocks = _tee_html_comment_blocks(comment_blocks, comments_out)
+        comment_index = build_comment_index(comment_blocks, report)
+        if comments_out is not None:
+            count += len(comment_index) + report.duplicate_comment_links
+
+    index_js_name = source.index_js_name()
+    if source.exists(index_js_name):
+        transform_report = TransformReport()
+        with contextlib.ExitStack() as stack:
+            if cache is not None:
+                blocks = _cached_enriched_function_blocks(source, index_js_name, cache, transform_workers, executor,
+                                                          transform_report)
+            else:
+                f = stack.enter_context(source.open(index_js_name))
+                if transform_workers == 1:
+                    blocks = stream_index_js_to_enriched_function_blocks(f, report=transform_report)
+                else:
+                    blocks = stream_index_js_to_enriched_function_blocks(f, max_workers=transform_workers,
+                                                                         executor=executor, report=transform_report)
+            if checkpointer is not None and out.resumed_records:
+                blocks = islice(blocks, out.resumed_records, None)
+            if join:
+                for block in join_function_blocks(blocks, comment_index, report):
+                    out.write(encode_commented_function_block(block))
+                    out.write("\n")
+                    count += 1
+            elif isinstance(out, ColumnarWriter):
+                count += out.write_enriched_function_blocks(blocks)
+            else:
+                count += write_enriched_function_blocks(blocks, out)
+        _logger.info(f"Transform {transform_report}")
+    else:
+        _logger.error(f"No {index_js_name} found in {source}")
+
+    if join:
+        _logger.info(f"Join {report}")
+    elif comments_out is not None:
+        count += run_html(source, workers, chunk_size, comments_out, backend, cache, executor, checkpointer)
+    return count
+
+
+def _cached_enriched_function_blocks(source, index_js_name, cache, transform_workers, executor, report):
+    """Transform the bundle's index.js through the manifest cache
+
+    See manifest_cache.ManifestCache.index_js_to_enriched_function_blocks. Cached index.js entries of other file
+    names, e.g. from before the bundle moved to another zip prefix, are dropped.
+    """
+    from src.manifest_cache import INDEX_JS_NAMESPACE, ManifestCache
+
+    with ManifestCache(cache) as manifest:
+        blocks = manifest.index_js_to_enriched_function_blocks(index_js_name, source, transform_workers, executor,
+                                                               report)
+        manifest.remove_missing(INDEX_JS_NAMESPACE, [index_js_name])
+        _logger.info(f"Manifest cache {manifest.stats}")
+    return blocks
+
+
+def run_batch(jobs, workers=None, chunk_size=1, backend="bs4", join=False, buffer_size=DEFAULT_BUFFER_SIZE,
+              concurrent_bundles=DEFAULT_CONCURRENT_BUNDLES, transform_workers=1):
+    """Extract every bundle of a batch over one shared parser pool
+
+    Bundles are started in job order, so schedule the largest first (see batch.read_batch_manifest). A failing
+    bundle leaves no output behind and does not stop the others.
+
+    Args:
+      jobs ([batch.BundleJob]): bundles and their outputs
+      workers (int): number of parser processes shared by all bundles
+      chunk_size (int): number of files per worker task
+      backend (str): html backend name, see html_backends.HTML_BACKENDS
+      join (bool): write CommentedFunctionBlocks instead of EnrichedFunctionBlocks
+      buffer_size (int): write buffer size in bytes
+      concurrent_bundles (int): number of bundles extracted at the same time
+      transform_workers (int): other than 1, large index.js files are transformed on the shared pool
+
+    Returns:
+      [batch.BundleResult]: one result per job, in job order
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    with contextlib.ExitStack() as stack:
+        executor = None if workers == 1 else stack.enter_context(open_parser_pool(workers, backend))
+        with ThreadPoolExecutor(max_workers=concurrent_bundles, thread_name_prefix="bundle") as bundles:
+            futures = [bundles.submit(run_bundle, job, workers, chunk_size, backend, join, buffer_size, executor,
+                                      transform_workers) for job in jobs]
+            return [future.result() for future in futures]
+
+
+def run_bundle(job, workers=None, chunk_size=1, backend="bs4", join=False, buffer_size=DEFAULT_BUFFER_SIZE,
+               executor=None, transform_workers=1):
+    """Extract one bundle of a batch; errors are reported in the result instead of raised
+
+    Args:
+      job (batch.BundleJob): bundle and its outputs
+      workers (int): number of parser processes
+      chunk_size (int): number of files per worker task
+      backend (str): html backend name, see html_backends.HTML_BACKENDS
+      join (bool): write CommentedFunctionBlocks instead of EnrichedFunctionBlocks
+      buffer_size (int): write buffer size in bytes
+      executor (concurrent.futures.Executor): optional shared parser pool
+      transform_workers (int): processes for the index.js transform, see run_extract
+
+    Returns:
+      batch.BundleResult: records written, or the error
+    """
+    start = time.perf_counter()
+    outputs = [job.output] + ([job.comments_output] if job.comments_output else [])
+    try:
+        for output in outputs:
+            os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open_source(job.path) as source, contextlib.ExitStack() as stack:
+            out = stack.enter_context(open_output(job.output + PARTIAL_SUFFIX, buffer_size))
+            comments_out = None
+            if job.comments_output:
+                comments_out = stack.enter_context(open_output(job.comments_output + PARTIAL_SUFFIX, buffer_size))
+            count = run_extract(source, out, comments_out, workers, chunk_size, backend, job.cache, join, executor,
+                                transform_workers)
+    except (Exception, SystemExit) as e:
+        # SystemExit: trim_index_js exits on a malformed index.js
+        _logger.error(f"Bundle {job.path} failed: {e!r}")
+        for output in outputs:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(output + PARTIAL_SUFFIX)
+        return BundleResult(job.path, seconds=time.perf_counter() - start, error=repr(e))
+    for output in outputs:
+        os.replace(output + PARTIAL_SUFFIX, output)
+    result = BundleResult(job.path, records=count, seconds=time.perf_counter() - start)
+    _logger.info(f"Bundle {result}")
+    return result
+
+
+def run_html(source, workers, chunk_size, out, backend="bs4", cache=None, executor=None, checkpointer=None):
+    """Extract every HtmlCommentBlock of a bundle and write them as JSONL
+
+    Args:
+      source (sources.DirectorySource | sources.ZipSource): java doc bundle
+      workers (int): number of parser processes
+      chunk_size (int): number of files per worker task
+      out (io.TextIOBase): output stream
+      backend (str): html backend name, see html_backends.HTML_BACKENDS
+      cache (str): optional manifest path, see manifest_cache.ManifestCache
+      executor (concurrent.futures.Executor): optional shared parser pool
+      checkpointer (checkpoint.Checkpointer): checkpoints the run; out must be one of its outputs, and member pages
+        it already holds are skipped
+
+    Returns:
+      int: number of records written
+    """
+    count = 0
+    if checkpointer is None:
+        blocks = iter_html_comment_blocks(source, workers, chunk_size, backend, cache, executor)
+    else:
+        skip_files, skip_records = checkpointer.html_files, out.resumed_records - checkpointer.html_records
+        blocks = iter_html_comment_blocks(source, workers, chunk_size, backend, cache, executor, skip_files,
+                                          checkpointer.html_file_done)
+        # The checkpoint may fall between the records of a page.
+        blocks = islice(blocks, skip_records, None)
+    for _ in _tee_html_comment_blocks(blocks, out):
+        count += 1
+    return count
+
+
+def iter_html_comment_blocks(source, workers, chunk_size, backend="bs4", cache=None, executor=None, skip_files=0,
+                             file_done=None):
+    """Yield every HtmlCommentBlock of a bundle, in file order
+
+    Args:
+      source (sources.DirectorySource | sources.ZipSource): java doc bundle
+      workers (int): number of parser processes
+      chunk_size (int): number of files per worker task
+      backend (str): html backend name, see html_backends.HTML_BACKENDS
+      cache (str): optional manifest path, see manifest_cache.ManifestCache
+      executor (concurrent.futures.Executor): optional shared parser pool
+      skip_files (int): number of files at the start of the walk that are not parsed
+      file_done (callable): called with the number of blocks of each file once they were all consumed
+    """
+    extractor = get_list_node_extractor(backend)
+    with contextlib.ExitStack() as stack:
+        if executor is None and workers != 1:
+            executor = stack.enter_context(open_parser_pool(workers, backend))
+        if cache is None:
+            # The walk runs in a prefetch thread while the first files are parsed.
+            _logger.info(f"Parsing html files with {backend}")
+            for _, blocks in iter_extract_list_nodes_parallel(islice(source.iter_html_files(), skip_files, None),
+                                                              max_workers=workers, chunk_size=chunk_size,
+                                                              extractor=extractor, source=source, executor=executor):
+                yield from blocks
+                if file_done is not None:
+                    file_done(len(blocks))
+            return
+        from src.manifest_cache import ManifestCache, html_namespace
+        # The manifest needs every path and content hash up front.
+        with metrics.timer("walk"):
+            paths = source.list_html_files()
+        metrics.count("walk.files", len(paths))
+        _logger.info(f"Parsing {len(paths)} html files with {backend}")
+        with ManifestCache(cache) as manifest:
+            for _, blocks in manifest.iter_extract_list_nodes(paths[skip_files:], max_workers=workers,
+                                                              chunk_size=chunk_size, extractor=extractor,
+                                                              source=source, executor=executor):
+                yield from blocks
+                if file_done is not None:
+                    file_done(len(blocks))
+            manifest.remove_missing(html_namespace(extractor), paths)
+            _logger.info(f"Manifest cache {manifest.stats}")
+
+
+def _tee_html_comment_blocks(blocks, out):
+    for block in blocks:
+        out.write(encode_html_comment_block(block))
+        out.write("\n")
+        yield block
+
+
 def main(args):
     """Main entry point allowing external calls
 
     Args:
       args ([str]): command line parameter list
     """
-    _logger.debug("Starting crazy calculations...")
-    _logger.info("Script ends here")
+    args = parse_args(args)
+    setup_logging(args.loglevel or logging.WARNING)
+    if args.metrics:
+        metrics.enable_metrics(args.slow_files)
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        _run(args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if args.metrics:
+            write_metrics(args.metrics)
+            metrics.disable_metrics()
+
+
+def _run(args):
+    if args.command == "batch":
+        _run_batch(args)
+        return
+    if args.command == "diff":
+        _run_diff(args)
+        return
+    start = time.perf_counter()
+    checkpointer = _open_checkpointer(args) if args.checkpoint or args.resume else None
+    with open_source(args.path) as source, contextlib.ExitStack() as stack:
+        comments_out = None
+        if checkpointer is None:
+            out = stack.enter_context(_open_function_output(args))
+            if getattr(args, "comments_output", None):
+                comments_out = stack.enter_context(open_output(args.comments_output, args.buffer_size))
+        else:
+            out = stack.enter_context(checkpointer.open_output(args.output, args.buffer_size))
+            if getattr(args, "comments_output", None):
+                comments_out = stack.enter_context(checkpointer.open_output(args.comments_output, args.buffer_size))
+            # A run killed before its first interval resumes from the start.
+            checkpointer.save()
+        if args.command == "extract":
+            count = run_extract(source, out, comments_out, args.workers, args.chunk_size, args.backend, args.cache,
+                                args.join, transform_workers=args.transform_workers, checkpointer=checkpointer)
+        else:
+            count = run_html(source, args.workers, args.chunk_size, out, args.backend, args.cache,
+                             checkpointer=checkpointer)
+    if checkpointer is not None:
+        checkpointer.complete()
+    stats = RunStats(records=count, seconds=time.perf_counter() - start, peak_rss_kib=peak_rss_kib())
+    _logger.info(f"Wrote {count} records")
+    if args.stats:
+        print(stats, file=sys.stderr)
+
+
+def _run_batch(args):
+    jobs = read_batch_manifest(args.manifest, args.output_dir)
+    results = run_batch(jobs, args.workers, args.chunk_size, args.backend, args.join, args.buffer_size, args.bundles,
+                        args.transform_workers)
+    failed = [result for result in results if result.error]
+    _logger.info(f"Extracted {len(results) - len(failed)} of {len(results)} bundles")
+    if args.stats:
+        for result in results:
+            print(result, file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+def _run_diff(args):
+    from src.api_diff import DEFAULT_RUN_SIZE, DiffReport, default_temp_dir, diff_files, encode_member_change
+
+    start = time.perf_counter()
+    report = DiffReport()
+    count = 0
+    with open_output(args.output, args.buffer_size) as out:
+        for change in diff_files(args.old, args.new, args.run_size or DEFAULT_RUN_SIZE, report, default_temp_dir(args.output)):
+            out.write(encode_member_change(change))
+            out.write("\n")
+            count += 1
+    _logger.info(f"Diff: {report}")
+    if args.stats:
+        print(RunStats(records=count, seconds=time.perf_counter() - start, peak_rss_kib=peak_rss_kib()),
+              file=sys.stderr)
+
+
+def _open_checkpointer(args):
+    path = checkpoint_path(args.output)
+    if args.resume and not os.path.exists(path):
+        sys.exit(f"No checkpoint {path} to resume from; the run completed or was not started with --checkpoint")
+    outputs = [args.output] + ([args.comments_output] if getattr(args, "comments_output", None) else [])
+    try:
+        return Checkpointer(path, args.command, os.path.abspath(args.path), outputs, args.checkpoint_interval,
+                            args.resume)
+    except ValueError as e:
+        sys.exit(f"Cannot resume: {e}")
+
+
+@contextlib.contextmanager
+def _open_function_output(args):
+    if args.shards:
+        from src.sink import ShardedSink, open_uploader
+        uploader = open_uploader(args.upload, args.upload_endpoint) if args.upload else None
+        with ShardedSink(args.shards, max_records=args.shard_records, max_bytes=args.shard_bytes,
+                         compression=args.compression, uploader=uploader) as sink:
+            yield sink
+        return
+    if getattr(args, "format", "jsonl") == "jsonl":
+        with open_output(args.output, args.buffer_size) as out:
+            yield out
+        return
+    from src.columnar import open_columnar_writer
+    with open(args.output, "wb", buffering=args.buffer_size) as f, open_columnar_writer(f, args.format) as writer:
+        yield writer
+
+
+def write_metrics(path):
+    """Write the collected metrics summary as JSON
+
+    Args:
+      path (str): output file, or "-" for stderr
+    """
+    if path == "-":
+        print(metrics.get_metrics().to_json(), file=sys.stderr)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(metrics.get_metrics().to_json())
 
 
 def run():
@@ -49,5 +599,4 @@ def run():
 
 
 if __name__ == "__main__":
-    setup_logging(logging.INFO)
     run()
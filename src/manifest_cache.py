@@ -0,0 +1,170 @@
+"""
+On-disk manifest that maps file path -> content hash -> extracted results, so re-runs over a new doc release only
+parse files that changed. The manifest is a single SQLite file and belongs to one java doc bundle: remove_missing
+drops every cached path that is not part of the current run. Html results are cached per extractor, see
+html_namespace, so switching --backend never returns the results of another parser.
+"""
+import hashlib
+import json
+import sqlite3
+from concurrent.futures import Executor
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.html_parser import HtmlCommentBlock, extract_list_nodes, iter_extract_list_nodes_parallel
+from src.transformer import (EnrichedFunctionBlock, FunctionBlock, TransformReport,
+                             index_js_file_to_enriched_function_blocks, index_js_to_enriched_function_blocks)
+
+# Bump when the extracted output changes shape so stale entries are treated as misses.
+MANIFEST_VERSION = 1
+HTML_NAMESPACE = "html"
+INDEX_JS_NAMESPACE = "index_js"
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    removed: int = 0
+
+    def __str__(self):
+        return f"hits={self.hits} misses={self.misses} removed={self.removed}"
+
+
+def hash_file(path: str, source=None) -> str:
+    """
+    Content hash of a file, or of a member of a bundle source, read in blocks.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with (source.open_binary(path) if source is not None else open(path, "rb")) as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def html_namespace(extractor: Optional[Callable] = None) -> str:
+    """
+    Namespace of the html results of an extractor, extract_list_nodes by default: every backend and extractor
+    caches its results apart.
+    """
+    extractor = extractor or extract_list_nodes
+    return f"{HTML_NAMESPACE}:{extractor.__module__}.{extractor.__qualname__}"
+
+
+class ManifestCache:
+    """
+    SQLite backed results cache. Use as a context manager, or call close() when done.
+    """
+
+    def __init__(self, db_path: str):
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS manifest (
+                                  namespace TEXT NOT NULL,
+                                  path TEXT NOT NULL,
+                                  content_hash TEXT NOT NULL,
+                                  version INTEGER NOT NULL,
+                                  results TEXT NOT NULL,
+                                  PRIMARY KEY (namespace, path))""")
+        self.stats = CacheStats()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
+
+    def get(self, namespace: str, path: str, content_hash: str) -> Optional[list]:
+        """
+        Returns the cached JSON results for a path, or None when the path is unknown or its content changed.
+        """
+        if not self.is_current(namespace, path, content_hash):
+            return None
+        return self._results(namespace, path)
+
+    def is_current(self, namespace: str, path: str, content_hash: str) -> bool:
+        """
+        Whether the cached results for a path are up to date, without reading them. Counts a hit or a miss.
+        """
+        row = self._conn.execute("SELECT content_hash, version FROM manifest WHERE namespace = ? AND path = ?",
+                                 (namespace, path)).fetchone()
+        if row and row[0] == content_hash and row[1] == MANIFEST_VERSION:
+            self.stats.hits += 1
+            return True
+        self.stats.misses += 1
+        return False
+
+    def _results(self, namespace: str, path: str) -> list:
+        row = self._conn.execute("SELECT results FROM manifest WHERE namespace = ? AND path = ?",
+                                 (namespace, path)).fetchone()
+        return json.loads(row[0])
+
+    def put(self, namespace: str, path: str, content_hash: str, results: list):
+        self._conn.execute("INSERT OR REPLACE INTO manifest VALUES (?, ?, ?, ?, ?)",
+                           (namespace, path, content_hash, MANIFEST_VERSION,
+                            json.dumps(results, separators=(',', ':'))))
+
+    def remove_missing(self, namespace: str, live_paths: Iterable[str]) -> int:
+        """
+        Drops cached results for paths that are no longer part of the bundle. Returns the number of removed entries.
+        """
+        live = set(live_paths)
+        cached = [row[0] for row in self._conn.execute("SELECT path FROM manifest WHERE namespace = ?", (namespace,))]
+        stale = [(namespace, path) for path in cached if path not in live]
+        self._conn.executemany("DELETE FROM manifest WHERE namespace = ? AND path = ?", stale)
+        self._conn.commit()
+        self.stats.removed += len(stale)
+        return len(stale)
+
+    def iter_extract_list_nodes(self, paths: List[str], max_workers: Optional[int] = None, chunk_size: int = 1,
+                                extractor: Optional[Callable] = None, source=None, executor: Optional[Executor] = None
+                                ) -> Iterator[Tuple[str, List[HtmlCommentBlock]]]:
+        """
+        Cached version of iter_extract_list_nodes_parallel. Only new or changed files are parsed; results come back
+        in input order and are identical to an uncached run. Cached results are read and decoded one file at a time,
+        as they are yielded.
+        """
+        namespace = html_namespace(extractor)
+        hashes = {path: hash_file(path, source) for path in paths}
+        hits = {path for path in paths if self.is_current(namespace, path, hashes[path])}
+        misses = [path for path in paths if path not in hits]
+
+        parsed = iter_extract_list_nodes_parallel(misses, max_workers, chunk_size, extractor, source, executor=executor)
+        for path in paths:
+            if path in hits:
+                yield path, [HtmlCommentBlock(**block) for block in self._results(namespace, path)]
+            else:
+                parsed_path, blocks = next(parsed)
+                self.put(namespace, parsed_path, hashes[parsed_path], [asdict(block) for block in blocks])
+                yield parsed_path, blocks
+        self._conn.commit()
+
+    def index_js_to_enriched_function_blocks(self, path: str, source=None, max_workers: Optional[int] = 1,
+                                             executor: Optional[Executor] = None,
+                                             report: Optional[TransformReport] = None
+                                             ) -> List[EnrichedFunctionBlock]:
+        """
+        Cached version of index_js_to_enriched_function_blocks for an index.js file path or source member. Files
+        that the source exposes as a local path are decoded in place, see transformer.load_index_js. Skipped blocks
+        are counted in report on a miss only.
+        """
+        content_hash = hash_file(path, source)
+        results = self.get(INDEX_JS_NAMESPACE, path, content_hash)
+        if results is not None:
+            return [_decode_enriched_function_block(block) for block in results]
+        local_path = source.local_path(path) if source is not None else path
+        if local_path is not None:
+            blocks = index_js_file_to_enriched_function_blocks(local_path, max_workers, executor, report)
+        else:
+            with source.open(path) as f:
+                blocks = index_js_to_enriched_function_blocks(f.read(), max_workers, executor, report)
+        self.put(INDEX_JS_NAMESPACE, path, content_hash, [asdict(block) for block in blocks])
+        self._conn.commit()
+        return blocks
+
+
+def _decode_enriched_function_block(block: Dict) -> EnrichedFunctionBlock:
+    return EnrichedFunctionBlock(**{**block, 'function_block': FunctionBlock(**block['function_block'])})
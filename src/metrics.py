@@ -0,0 +1,149 @@
+"""
+Lightweight instrumentation for the extraction pipeline: per-stage timers and counters, plus the slowest files seen
+by the html parser. Metrics are disabled by default; timer() then returns a shared no-op context manager, so
+instrumented code only pays for one function call and a flag check.
+
+Process pool workers collect into their own process-local Metrics, which the parent merges (see
+html_parser.iter_extract_list_nodes_parallel). Threads share the Metrics of their process, e.g. the bundles of a
+batch, so every update holds its lock.
+"""
+import heapq
+import json
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_SLOW_FILES = 20
+
+_NULL_TIMER = nullcontext()
+
+
+@dataclass
+class TimerStats:
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def add(self, seconds: float, count: int = 1):
+        self.count += count
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+
+class Metrics:
+    """
+    Timers and counters keyed by stage name. Items passed to timer() are kept in a bounded min-heap of the slowest
+    slow_files items.
+    """
+
+    def __init__(self, enabled: bool = True, slow_files: int = DEFAULT_SLOW_FILES):
+        self.enabled = enabled
+        self.slow_files = slow_files
+        self.timers: Dict[str, TimerStats] = {}
+        self.counters: Dict[str, int] = {}
+        self._slowest: List[Tuple[float, str, str]] = []
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float, item: Optional[str] = None):
+        with self._lock:
+            stats = self.timers.get(stage)
+            if stats is None:
+                stats = self.timers[stage] = TimerStats()
+            stats.add(seconds)
+            if item is not None and self.slow_files:
+                self._add_slow((seconds, stage, item))
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, other: Dict):
+        """
+        Adds a summary() of another Metrics, e.g. from a worker process.
+        """
+        with self._lock:
+            for stage, stats in other["timers"].items():
+                mine = self.timers.get(stage)
+                if mine is None:
+                    mine = self.timers[stage] = TimerStats()
+                mine.count += stats["count"]
+                mine.total_seconds += stats["total_seconds"]
+                mine.max_seconds = max(mine.max_seconds, stats["max_seconds"])
+            for name, n in other["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+            if self.slow_files:
+                for slow in other["slow_files"]:
+                    self._add_slow((slow["seconds"], slow["stage"], slow["item"]))
+
+    def _add_slow(self, entry: Tuple[float, str, str]):
+        # Called with the lock held.
+        if len(self._slowest) < self.slow_files:
+            heapq.heappush(self._slowest, entry)
+        elif entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                "timers": {stage: asdict(stats) for stage, stats in sorted(self.timers.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "slow_files": [{"seconds": seconds, "stage": stage, "item": item}
+                               for seconds, stage, item in sorted(self._slowest, reverse=True)],
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), indent=2)
+
+
+class _Timer:
+    __slots__ = ('_metrics', '_stage', '_item', '_start')
+
+    def __init__(self, metrics: Metrics, stage: str, item: Optional[str]):
+        self._metrics = metrics
+        self._stage = stage
+        self._item = item
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._metrics.record(self._stage, time.perf_counter() - self._start, self._item)
+
+
+_metrics = Metrics(enabled=False)
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def enable_metrics(slow_files: int = DEFAULT_SLOW_FILES) -> Metrics:
+    """
+    Starts collecting into a fresh process-local Metrics and returns it.
+    """
+    global _metrics
+    _metrics = Metrics(enabled=True, slow_files=slow_files)
+    return _metrics
+
+
+def disable_metrics():
+    global _metrics
+    _metrics = Metrics(enabled=False)
+
+
+def timer(stage: str, item: Optional[str] = None):
+    """
+    Context manager timing a stage. item, e.g. a file path, makes the measurement eligible for the slow file list.
+    """
+    if not _metrics.enabled:
+        return _NULL_TIMER
+    return _Timer(_metrics, stage, item)
+
+
+def count(name: str, n: int = 1):
+    if _metrics.enabled:
+        _metrics.count(name, n)
@@ -0,0 +1,95 @@
+"""
+Background prefetching for the html pipeline. prefetch() runs an iterator, e.g. the directory walk or member reads, in
+a thread and hands its items to the consumer through a bounded queue, so I/O overlaps with parsing and a slow consumer
+holds back the producer instead of letting it buffer the whole bundle. map_bounded() does the same for process pool
+tasks: it keeps a bounded number of tasks in flight and returns results in input order.
+"""
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Executor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, TypeVar
+
+PREFETCH_SIZE = 64
+# How often a producer blocked on a full queue checks whether the consumer went away, in seconds.
+_STOP_POLL_INTERVAL = 0.1
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def prefetch(items: Iterable[T], maxsize: int = PREFETCH_SIZE) -> Iterator[T]:
+    """
+    Yields items in order while a background thread iterates them at most maxsize items ahead. An exception raised by
+    the producer is re-raised in the consumer after the items produced before it. Closing the generator early stops
+    the producer thread.
+    """
+    buffer = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=_STOP_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((False, item)):
+                    return
+        except BaseException as e:
+            put((True, e))
+        else:
+            put((True, None))
+
+    thread = threading.Thread(target=produce, name="prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            done, value = buffer.get()
+            if done:
+                if value is not None:
+                    raise value
+                return
+            yield value
+    finally:
+        stop.set()
+        thread.join()
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """
+    Splits items into consecutive lists of size items; the last one may be shorter.
+    """
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def map_bounded(executor: Executor, fn: Callable[[T], R], items: Iterable[T], window: int) -> Iterator[R]:
+    """
+    Like executor.map, but consumes items lazily: at most window tasks are submitted ahead of the result being
+    waited for, so a lazy or large input is neither read up front nor queued in full.
+    """
+    items = iter(items)
+    pending = deque()
+    while True:
+        while len(pending) < window:
+            item = next(items, _EXHAUSTED)
+            if item is _EXHAUSTED:
+                break
+            pending.append(executor.submit(fn, item))
+        if not pending:
+            return
+        yield pending.popleft().result()
+
+
+_EXHAUSTED = object()
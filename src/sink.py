@@ -0,0 +1,347 @@
+"""
+Sharded JSONL output. ShardedSink is a text stream that the JSONL writers write to like a file; it cuts the lines into
+shards by record count and/or uncompressed size, compresses them with gzip or zstd on a background thread, and
+publishes every shard atomically: a shard is written under a temporary name and renamed once complete. Closing the
+sink writes a manifest of all shards, and an optional uploader copies each shard, then the manifest, to an object
+store.
+
+    with ShardedSink("out", max_records=100000, compression="gzip", uploader=open_uploader("s3://bucket/cats")) as sink:
+        write_enriched_function_blocks(blocks, sink)
+"""
+import hashlib
+import json
+import os
+import queue
+import shutil
+import threading
+from dataclasses import dataclass, asdict
+from typing import BinaryIO, List, Optional
+
+# gzip and urllib are imported where they are used, like zstandard: main imports this module for COMPRESSIONS on
+# every run, and most runs write no shards.
+
+COMPRESSIONS = ("gzip", "zstd")
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+MANIFEST_NAME = "manifest.json"
+TEMP_SUFFIX = ".tmp"
+# Encoded chunks queued for the background writer; the writing thread blocks beyond this, bounding memory.
+WRITE_QUEUE_SIZE = 64
+# How often a writer blocked on a full queue checks for an error of the background writer, in seconds.
+_ERROR_POLL_INTERVAL = 0.1
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+@dataclass
+class ShardInfo:
+    name: str
+    records: int
+    bytes: int
+    stored_bytes: int
+    sha256: str
+
+
+class LocalUploader:
+    """
+    Object store stand-in backed by a directory: upload copies a file to <root>/<key>, atomically.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def __repr__(self):
+        return f"LocalUploader({self.root!r})"
+
+    def upload(self, path: str, key: str):
+        target = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        shutil.copyfile(path, target + TEMP_SUFFIX)
+        os.replace(target + TEMP_SUFFIX, target)
+
+
+class S3Uploader:
+    """
+    Uploads to s3://bucket/prefix/<key> with boto3, which is only imported when the uploader is created. endpoint_url
+    points the client at an S3 compatible store such as MinIO.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None, client=None):
+        if client is None:
+            import boto3
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self._client = client
+
+    def __repr__(self):
+        return f"S3Uploader({self.bucket!r}, {self.prefix!r})"
+
+    def upload(self, path: str, key: str):
+        self._client.upload_file(path, self.bucket, f"{self.prefix}/{key}" if self.prefix else key)
+
+
+def open_uploader(url: str, endpoint_url: Optional[str] = None):
+    """
+    Returns the uploader for an s3://bucket/prefix or file:///path (or plain directory) URL.
+    """
+    from urllib.parse import urlparse
+
+    parsed = urlparse(url)
+    if parsed.scheme == "s3":
+        return S3Uploader(parsed.netloc, parsed.path, endpoint_url)
+    if parsed.scheme in ("", "file"):
+        return LocalUploader(parsed.path if parsed.scheme else url)
+    raise ValueError(f"Unsupported upload URL '{url}'. Expected s3://bucket/prefix or file:///path")
+
+
+class ShardedSink:
+    """
+    Text stream writing JSONL lines into shards of at most max_records lines and max_bytes uncompressed bytes (the
+    first line of a shard is always accepted). Lines may arrive in any pieces; shards are only cut at line ends.
+    compression is None, 'gzip' or 'zstd' (needs the zstandard package). Errors of the background writer are raised
+    by the next write or by close.
+    """
+
+    def __init__(self, directory: str, prefix: str = "part", max_records: Optional[int] = None,
+                 max_bytes: Optional[int] = None, compression: Optional[str] = None, uploader=None,
+                 queue_size: int = WRITE_QUEUE_SIZE):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown compression '{compression}'. Expected one of: {', '.join(COMPRESSIONS)}")
+        if compression == "zstd":
+            import zstandard  # noqa: F401
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.uploader = uploader
+        self.shards: List[ShardInfo] = []
+        self.closed = False
+        self._partial: List[str] = []
+        self._shard_records = 0
+        self._shard_bytes = 0
+        self._shard_open = False
+        self._shard_count = 0
+        self._queue = queue.Queue(queue_size)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="shard-writer", daemon=True)
+        self._thread.start()
+
+    def __repr__(self):
+        return f"ShardedSink({self.directory!r})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if self.closed:
+            raise ValueError("write to a closed ShardedSink")
+        if "\n" not in text:
+            self._partial.append(text)
+            return len(text)
+        lines = text.split("\n")
+        if self._partial:
+            lines[0] = "".join(self._partial) + lines[0]
+            self._partial = []
+        if lines[-1]:
+            self._partial.append(lines[-1])
+        self._write_lines(lines[:-1])
+        return len(text)
+
+    def flush(self):
+        self._raise_error()
+
+    def close(self):
+        """
+        Publishes the last shard, writes the manifest and waits for the uploads. Unterminated text is written as a
+        final line.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if self._partial:
+                self._write_lines(["".join(self._partial)])
+                self._partial = []
+            if self._shard_open:
+                self._put(("close", None))
+        finally:
+            # The writer keeps consuming after an error, so this cannot block for good.
+            self._queue.put(("stop", None))
+            self._thread.join()
+        self._raise_error()
+        self._write_manifest()
+
+    def abort(self):
+        """
+        Stops the writer without publishing the current shard or a manifest. Shards already published are kept.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.put(("stop", None))
+        self._thread.join()
+
+    def _write_lines(self, lines: List[str]):
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        if self._fits(len(lines), len(data)):
+            self._append(data, len(lines))
+            return
+        # The lines straddle a shard boundary: hand them over in one chunk per shard.
+        chunk, chunk_bytes = [], 0
+        for line in lines:
+            line_data = (line + "\n").encode("utf-8")
+            if self._shard_records + len(chunk) and not self._fits(len(chunk) + 1, chunk_bytes + len(line_data)):
+                if chunk:
+                    self._append(b"".join(chunk), len(chunk))
+                    chunk, chunk_bytes = [], 0
+                self._put(("close", None))
+                self._shard_open = False
+                self._shard_records = self._shard_bytes = 0
+            chunk.append(line_data)
+            chunk_bytes += len(line_data)
+        self._append(b"".join(chunk), len(chunk))
+
+    def _fits(self, records: int, size: int) -> bool:
+        if self.max_records is not None and self._shard_records + records > self.max_records:
+            return False
+        return self.max_bytes is None or self._shard_bytes + size <= self.max_bytes
+
+    def _append(self, data: bytes, records: int):
+        if not self._shard_open:
+            name = f"{self.prefix}-{self._shard_count:05d}.jsonl{COMPRESSION_SUFFIXES[self.compression]}"
+            self._put(("open", name))
+            self._shard_open = True
+            self._shard_count += 1
+        self._shard_records += records
+        self._shard_bytes += len(data)
+        self._put(("data", (data, records)))
+
+    def _put(self, message):
+        while True:
+            self._raise_error()
+            try:
+                self._queue.put(message, timeout=_ERROR_POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        shard = None
+        try:
+            while True:
+                kind, value = self._queue.get()
+                if kind == "open":
+                    shard = _ShardFile(os.path.join(self.directory, value), self.compression)
+                elif kind == "data":
+                    shard.write(*value)
+                elif kind == "close":
+                    info, shard = shard.close(), None
+                    self._publish(info)
+                else:
+                    if shard is not None:
+                        shard.discard()
+                    return
+        except BaseException as e:
+            self._error = e
+            if shard is not None:
+                shard.discard()
+            # Keep draining so the writing thread never blocks on a full queue.
+            while self._queue.get()[0] != "stop":
+                pass
+
+    def _publish(self, info: ShardInfo):
+        if self.uploader is not None:
+            self.uploader.upload(os.path.join(self.directory, info.name), info.name)
+        self.shards.append(info)
+
+    def _write_manifest(self):
+        manifest = {
+            "compression": self.compression,
+            "records": sum(shard.records for shard in self.shards),
+            "shards": [asdict(shard) for shard in self.shards],
+        }
+        path = os.path.join(self.directory, MANIFEST_NAME)
+        with open(path + TEMP_SUFFIX, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + TEMP_SUFFIX, path)
+        if self.uploader is not None:
+            self.uploader.upload(path, MANIFEST_NAME)
+
+
+class _ShardFile:
+    """
+    Helper class. One shard being written: a temporary file, optionally behind a compressor, renamed on close.
+    """
+
+    def __init__(self, path: str, compression: Optional[str]):
+        self.path = path
+        self.records = 0
+        self.bytes = 0
+        self._file = open(path + TEMP_SUFFIX, "wb")
+        self._digest = hashlib.sha256()
+        self._stream = _compressing_stream(_DigestWriter(self._file, self._digest), compression)
+
+    def write(self, data: bytes, records: int):
+        self._stream.write(data)
+        self.records += records
+        self.bytes += len(data)
+
+    def close(self) -> ShardInfo:
+        self._stream.close()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        stored_bytes = self._file.tell()
+        self._file.close()
+        os.replace(self.path + TEMP_SUFFIX, self.path)
+        return ShardInfo(name=os.path.basename(self.path), records=self.records, bytes=self.bytes,
+                         stored_bytes=stored_bytes, sha256=self._digest.hexdigest())
+
+    def discard(self):
+        self._file.close()
+        os.remove(self.path + TEMP_SUFFIX)
+
+
+class _DigestWriter:
+    """
+    Helper class. Write-only file wrapper hashing what reaches the file, i.e. the compressed bytes.
+    """
+
+    def __init__(self, f: BinaryIO, digest):
+        self._file = f
+        self._digest = digest
+
+    def write(self, data) -> int:
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        # The shard closes the underlying file itself.
+        pass
+
+
+def _compressing_stream(f, compression: Optional[str]):
+    if compression == "gzip":
+        import gzip
+        return gzip.GzipFile(fileobj=f, mode="wb", compresslevel=GZIP_LEVEL, mtime=0)
+    if compression == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(f, closefd=False)
+    return f
@@ -0,0 +1,161 @@
+"""
+Java doc bundle sources. A source lists the bundle's html member pages and opens members by name, so the parsers and
+the transformer can read an extracted directory or a zip archive without unpacking it to disk.
+
+Every source is picklable and can be handed to process pool workers. Zip archives are memory-mapped, so the central
+directory and member data are shared through the page cache, and each worker process opens the archive at most once.
+"""
+import functools
+import io
+import mmap
+import os
+import zipfile
+from typing import IO, Iterator, List, Optional, TextIO
+
+from src.html_parser import collect_html_file_paths, iter_html_file_paths
+
+INDEX_JS = "index.js"
+ZIP_SOURCES_PER_PROCESS = 8
+
+
+class DirectorySource:
+    """
+    An extracted java doc directory. Member names are file paths, as returned by collect_html_file_paths.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def __repr__(self):
+        return f"DirectorySource({self.root!r})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        pass
+
+    def list_html_files(self) -> List[str]:
+        return collect_html_file_paths(self.root, [])
+
+    def iter_html_files(self) -> Iterator[str]:
+        return iter_html_file_paths(self.root)
+
+    def index_js_name(self) -> str:
+        return os.path.join(self.root, INDEX_JS)
+
+    def exists(self, name: str) -> bool:
+        return os.path.isfile(name)
+
+    def open(self, name: str) -> TextIO:
+        return open(name)
+
+    def open_binary(self, name: str) -> IO[bytes]:
+        return open(name, "rb")
+
+    def local_path(self, name: str) -> Optional[str]:
+        return name
+
+
+class ZipSource:
+    """
+    A java doc zip read in place. Member names are archive names. The archive is opened through a read-only memory
+    map; reads of different members from several threads are serialized by zipfile's shared file lock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._archive = zipfile.ZipFile(_MappedFile(self._map))
+        self._names = set(self._archive.namelist())
+
+    def __repr__(self):
+        return f"ZipSource({self.path!r})"
+
+    def __reduce__(self):
+        return _open_zip_source, (self.path,)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._archive.close()
+        self._map.close()
+        self._file.close()
+
+    def list_html_files(self) -> List[str]:
+        return [info.filename for info in self._archive.infolist()
+                if not info.is_dir() and info.filename.endswith(".html")]
+
+    def local_path(self, name: str) -> Optional[str]:
+        # Members are compressed inside the archive and cannot be memory-mapped.
+        return None
+
+    def iter_html_files(self) -> Iterator[str]:
+        # The central directory is already in memory, so there is nothing to walk lazily.
+        return iter(self.list_html_files())
+
+    def index_js_name(self) -> str:
+        # Bundles are sometimes zipped with a single top level directory.
+        candidates = [name for name in self._names if name == INDEX_JS or name.endswith("/" + INDEX_JS)]
+        return min(candidates, key=lambda name: name.count("/")) if candidates else INDEX_JS
+
+    def exists(self, name: str) -> bool:
+        return name in self._names
+
+    def open(self, name: str) -> TextIO:
+        return io.TextIOWrapper(self._archive.open(name), encoding="utf-8")
+
+    def open_binary(self, name: str) -> IO[bytes]:
+        return self._archive.open(name)
+
+
+@functools.lru_cache(maxsize=ZIP_SOURCES_PER_PROCESS)
+def _open_zip_source(path: str) -> ZipSource:
+    # One open archive per process, shared by every task that unpickles a ZipSource for the same path. Bounded so a
+    # worker that serves a batch of bundles does not keep every archive mapped.
+    return ZipSource(path)
+
+
+class _MappedFile(io.RawIOBase):
+    """
+    Helper class. Minimal seekable file over an mmap, which zipfile can read its central directory and members from.
+    """
+
+    def __init__(self, mapped: mmap.mmap):
+        self._map = mapped
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._map.seek(offset, whence)
+        return self._map.tell()
+
+    def tell(self):
+        return self._map.tell()
+
+    def readinto(self, buffer):
+        data = self._map.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def read(self, size=-1):
+        return self._map.read(None if size is None or size < 0 else size)
+
+
+def open_source(path: str):
+    """
+    Returns a DirectorySource for directories and a ZipSource for anything else.
+    """
+    return DirectorySource(path) if os.path.isdir(path) else ZipSource(path)
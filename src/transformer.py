@@ -3,12 +3,54 @@ The transformer reads the index.js file in a java doc folder and transform it in
 Minimal keys are renamed, and no json values are altered. The transformer goal is to standardize the output without
 mutating values.
 """
+import contextlib
+import functools
 import json
+import logging
+import mmap
+import os
+import re
 import sys
+from array import array
+from concurrent.futures import Executor
 from dataclasses import dataclass, asdict
-from typing import Dict, List
+from itertools import chain, islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Pattern, TextIO, Tuple
 
-FUNCTION_BLOCK_KEYS = {'members_object', 'members_trait', 'members_class', 'members_case class'}
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+from src import metrics
+from src.prefetch import chunked, map_bounded
+
+_logger = logging.getLogger(__name__)
+
+FUNCTION_BLOCK_KEYS = frozenset(('members_object', 'members_trait', 'members_class', 'members_case class'))
+# Key sets of the entries of a members list: function blocks are the bulk, error blocks mark undocumented members.
+FUNCTION_BLOCK_SCHEMA = frozenset(('label', 'tail', 'member', 'link', 'kind'))
+ERROR_BLOCK_SCHEMA = frozenset(('member', 'error'))
+# Scala type keys that hold plain values.
+SCALA_TYPE_FIELDS = frozenset(('name', 'shortDescription', 'kind', 'case class', 'class', 'object', 'trait'))
+SCALA_KINDS = frozenset(("case class", "class", "object", "trait"))
+_SCALA_TYPE_PLANS: Dict[Tuple[str, ...], Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+_MAX_SCALA_TYPE_PLANS = 1024
+INDEX_PACKAGES_PREFIX = "Index.PACKAGES = "
+_INDEX_PACKAGES_PREFIX_BYTES = INDEX_PACKAGES_PREFIX.encode()
+# Bytes str.strip() removes from either end of an ASCII-compatible index.js.
+_ASCII_WHITESPACE = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+STREAM_CHUNK_SIZE = 1 << 16
+# Parallel transform: indexes with fewer Scala types stay serial, larger ones are sent to workers in chunks of this many
+# Scala types, with at most PENDING_TRANSFORM_CHUNKS_PER_WORKER chunks in flight per worker.
+PARALLEL_TRANSFORM_THRESHOLD = 1000
+TRANSFORM_CHUNK_SIZE = 250
+PENDING_TRANSFORM_CHUNKS_PER_WORKER = 2
+ENCODE_BATCH_SIZE = 1024
 
 
 @dataclass
@@ -17,6 +59,8 @@ class FunctionBlock:
     Represents a Scala function located in a JSON value list. The known JSON keys containing functions are:
     'members_object', 'members_trait', 'members_class', 'members_case class'
     """
+    __slots__ = ('label', 'tail', 'member', 'link', 'kind')
+
     label: str
     tail: str
     member: str
@@ -29,11 +73,13 @@ class EnrichedFunctionBlock:
     """
     Represents a function with the associated Scala Type (Class, Case Class, Object, Trait) that contains the function.
     This is a denormalized view of the data to make downstream indexing easier. This dataclass will be sparse with
-    regard to the the _link fields.
+    regard to the the _link fields. Siblings share the string objects of their parent Scala Type, so the per-record
+    cost is the slotted instance itself.
     """
-    # TODO use this to join
+    __slots__ = ('package_name', 'file_name', 'short_description', 'kind', 'case_class_link', 'class_link',
+                 'object_link', 'trait_link', 'function_block')
+
     package_name: str
-    # TODO Need to use this to join
     file_name: str
     short_description: str
     kind: str
@@ -44,95 +90,490 @@ class EnrichedFunctionBlock:
     function_block: FunctionBlock
 
 
+class EnrichedFunctionBlockBatch:
+    """
+    Columnar form of a list of EnrichedFunctionBlocks. The Scala Type fields are stored once per parent in parents,
+    every member stores its FunctionBlock fields in one list per field plus an index into parents. Indexing and
+    iterating rebuild EnrichedFunctionBlocks equal to the ones the batch was built from.
+    """
+    PARENT_FIELDS = ('package_name', 'file_name', 'short_description', 'kind', 'case_class_link', 'class_link',
+                     'object_link', 'trait_link')
+
+    def __init__(self):
+        self.parents: List[Tuple] = []
+        self.parent_ids = array('L')
+        self.label: List[str] = []
+        self.tail: List[str] = []
+        self.member: List[str] = []
+        self.link: List[str] = []
+        self.kind: List[str] = []
+
+    @classmethod
+    def from_enriched_function_blocks(cls, blocks: Iterable[EnrichedFunctionBlock]) -> 'EnrichedFunctionBlockBatch':
+        batch = cls()
+        batch.extend(blocks)
+        return batch
+
+    def extend(self, blocks: Iterable[EnrichedFunctionBlock]):
+        """
+        Appends blocks. Consecutive blocks with the same parent fields share one parent entry.
+        """
+        last_parent = self.parents[-1] if self.parents else None
+        for efb in blocks:
+            parent = (efb.package_name, efb.file_name, efb.short_description, efb.kind, efb.case_class_link,
+                      efb.class_link, efb.object_link, efb.trait_link)
+            if parent != last_parent:
+                self.parents.append(parent)
+                last_parent = parent
+            fb = efb.function_block
+            self.parent_ids.append(len(self.parents) - 1)
+            self.label.append(fb.label)
+            self.tail.append(fb.tail)
+            self.member.append(fb.member)
+            self.link.append(fb.link)
+            self.kind.append(fb.kind)
+
+    def __len__(self):
+        return len(self.parent_ids)
+
+    def __getitem__(self, i: int) -> EnrichedFunctionBlock:
+        parent = self.parents[self.parent_ids[i]]
+        return EnrichedFunctionBlock(*parent, FunctionBlock(self.label[i], self.tail[i], self.member[i], self.link[i],
+                                                            self.kind[i]))
+
+    def __iter__(self) -> Iterator[EnrichedFunctionBlock]:
+        return (self[i] for i in range(len(self)))
+
+
+@dataclass
+class TransformReport:
+    """
+    Blocks and keys of index.js that do not produce EnrichedFunctionBlocks. Error blocks ('member', 'error') are members
+    scaladoc failed to document.
+    """
+    error_blocks: int = 0
+    unknown_blocks: int = 0
+    unknown_lists: int = 0
+    unexpected_kinds: int = 0
+
+    def __str__(self):
+        return (f"error_blocks={self.error_blocks} unknown_blocks={self.unknown_blocks} "
+                f"unknown_lists={self.unknown_lists} unexpected_kinds={self.unexpected_kinds}")
+
+    def merge(self, other: 'TransformReport'):
+        self.error_blocks += other.error_blocks
+        self.unknown_blocks += other.unknown_blocks
+        self.unknown_lists += other.unknown_lists
+        self.unexpected_kinds += other.unexpected_kinds
+
+
 def trim_index_js(raw_index_js: str) -> str:
     """
     Helper function to convert an index.js string into parsable JSON.
     """
     stripped = raw_index_js.strip()
-    arr = stripped.split("Index.PACKAGES = ")
+    arr = stripped.split(INDEX_PACKAGES_PREFIX)
     if len(arr) > 2:
-        # TODO log
-        # Kill the process if more than one index packages string is found. This is unexpected
-        # and can be handled if needed in the future.
-        print("Found 'Index.PACKAGES = ' string in index.js body.")
-        sys.exit(1)
+        _exit_on_duplicate_prefix()
     prefix_removed = "".join(arr)
     return prefix_removed.rstrip(";")
 
 
-def index_js_to_enriched_function_blocks(index_js: str) -> List[EnrichedFunctionBlock]:
+def index_js_payload_bounds(buffer) -> Optional[Tuple[int, int]]:
     """
-    Main function of the file. Converts raw index.js file into the output dataclass.
+    Byte offsets of the JSON payload that trim_index_js keeps, found in a bytes-like buffer such as an mmap without
+    copying it. Exits like trim_index_js on a duplicate 'Index.PACKAGES = '. Returns None for the rare files where only
+    trim_index_js gives the same result: the prefix is not at the start, or the file starts or ends with non-ASCII.
     """
-    trimmed_index_js = trim_index_js(index_js)
-    index_json = json.loads(trimmed_index_js)
+    start, end = 0, len(buffer)
+    while start < end and buffer[start] in _ASCII_WHITESPACE:
+        start += 1
+    while end > start and buffer[end - 1] in _ASCII_WHITESPACE:
+        end -= 1
+    if start < end and (buffer[start] > 0x7f or buffer[end - 1] > 0x7f):
+        # Possibly non-ASCII whitespace, which str.strip() would remove too.
+        return None
+    first = buffer.find(_INDEX_PACKAGES_PREFIX_BYTES, start, end)
+    if first != -1:
+        if buffer.find(_INDEX_PACKAGES_PREFIX_BYTES, first + len(_INDEX_PACKAGES_PREFIX_BYTES), end) != -1:
+            _exit_on_duplicate_prefix()
+        if first != start:
+            return None
+        start += len(_INDEX_PACKAGES_PREFIX_BYTES)
+    while end > start and buffer[end - 1] == ord(";"):
+        end -= 1
+    return start, end
+
+
+def load_index_js(path: str) -> Dict:
+    """
+    Decodes the Index.PACKAGES object of an index.js file without reading the file into a str. The file is
+    memory-mapped and the JSON decoder gets the payload slice directly: orjson, when installed, decodes a memoryview of
+    the map without any copy, json needs one bytes copy of the payload.
+
+    Decodes the whole index at once: extract uses it for index.js files missing from its --cache manifest, see
+    ManifestCache.index_js_to_enriched_function_blocks, and otherwise streams index.js with bounded memory, see
+    stream_index_js_to_enriched_function_blocks.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap cannot map an empty file
+            return json.loads(trim_index_js(""))
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with metrics.timer("index_js.trim"):
+                bounds = index_js_payload_bounds(mapped)
+            with metrics.timer("index_js.decode"):
+                if bounds is None:
+                    return json.loads(trim_index_js(mapped[:].decode("utf-8")))
+                return _loads_slice(mapped, *bounds)
+
+
+def _loads_slice(mapped: mmap.mmap, start: int, end: int) -> Dict:
+    if orjson is not None:
+        # The views must be released before the map can be closed.
+        with memoryview(mapped) as view, view[start:end] as payload:
+            try:
+                return orjson.loads(payload)
+            except orjson.JSONDecodeError:
+                # orjson is stricter than json, e.g. about NaN, huge integers and lone surrogates: let json decide.
+                pass
+    return json.loads(mapped[start:end])
+
+
+def _exit_on_duplicate_prefix():
+    # Kill the process if more than one index packages string is found. This is unexpected
+    # and can be handled if needed in the future. Logged, never printed: stdout may be the JSONL output.
+    _logger.error("Found 'Index.PACKAGES = ' string in index.js body.")
+    sys.exit(1)
 
+
+def index_js_to_enriched_function_blocks(index_js: str, max_workers: Optional[int] = 1,
+                                         executor: Optional[Executor] = None,
+                                         report: Optional[TransformReport] = None) -> List[EnrichedFunctionBlock]:
+    """
+    Main function of the file. Converts raw index.js file into the output dataclass. With max_workers other than 1,
+    or an executor, large indexes are transformed over a process pool, see transform_scala_types. Skipped blocks are
+    counted in report.
+    """
+    with metrics.timer("index_js.trim"):
+        trimmed_index_js = trim_index_js(index_js)
+    with metrics.timer("index_js.decode"):
+        index_json = json.loads(trimmed_index_js)
+    return _index_json_to_enriched_function_blocks(index_json, max_workers, executor, report)
+
+
+def index_js_file_to_enriched_function_blocks(path: str, max_workers: Optional[int] = 1,
+                                              executor: Optional[Executor] = None,
+                                              report: Optional[TransformReport] = None) -> List[EnrichedFunctionBlock]:
+    """
+    Same as index_js_to_enriched_function_blocks for an index.js file, decoded in place with load_index_js.
+    """
+    return _index_json_to_enriched_function_blocks(load_index_js(path), max_workers, executor, report)
+
+
+def _index_json_to_enriched_function_blocks(index_json: Dict, max_workers: Optional[int] = 1,
+                                            executor: Optional[Executor] = None,
+                                            report: Optional[TransformReport] = None) -> List[EnrichedFunctionBlock]:
+    if max_workers != 1 or executor is not None:
+        scala_types = ((package_name, scala_type) for package_name, list_of_scala_types in index_json.items()
+                       for scala_type in list_of_scala_types)
+        return list(transform_scala_types(scala_types, max_workers, executor=executor, report=report))
     rtn_blocks = []
-    for package_name, list_of_scala_types in index_json.items():
-        for scala_type in list_of_scala_types:
-            enriched_blocks = extract_enriched_function_blocks(package_name, scala_type)
-            rtn_blocks.extend(enriched_blocks)
+    with metrics.timer("index_js.transform"):
+        for package_name, list_of_scala_types in index_json.items():
+            for scala_type in list_of_scala_types:
+                enriched_blocks = extract_enriched_function_blocks(package_name, scala_type, report)
+                rtn_blocks.extend(enriched_blocks)
+    metrics.count("index_js.blocks", len(rtn_blocks))
     return rtn_blocks
 
 
-def extract_enriched_function_blocks(package_name: str, scala_type: Dict) -> List[EnrichedFunctionBlock]:
+def index_js_to_enriched_function_block_batch(index_js_file: TextIO) -> EnrichedFunctionBlockBatch:
+    """
+    Columnar version of index_js_to_enriched_function_blocks for large indexes. Reads index.js from an open file handle.
+    """
+    return EnrichedFunctionBlockBatch.from_enriched_function_blocks(
+        stream_index_js_to_enriched_function_blocks(index_js_file))
+
+
+def stream_index_js_to_enriched_function_blocks(index_js_file: TextIO, chunk_size: int = STREAM_CHUNK_SIZE,
+                                                max_workers: Optional[int] = 1, executor: Optional[Executor] = None,
+                                                report: Optional[TransformReport] = None
+                                                ) -> Iterator[EnrichedFunctionBlock]:
+    """
+    Streaming version of index_js_to_enriched_function_blocks. Reads index.js from an open file handle and yields
+    enriched blocks one Scala type at a time, so memory is bounded by the largest Scala type rather than the file size.
+    max_workers and executor enable the parallel transform, see transform_scala_types. Skipped blocks are counted in
+    report.
+    """
+    scala_types = iter_index_js_scala_types(index_js_file, chunk_size)
+    if max_workers != 1 or executor is not None:
+        yield from transform_scala_types(scala_types, max_workers, executor=executor, report=report)
+        return
+    for package_name, scala_type in scala_types:
+        with metrics.timer("index_js.transform"):
+            blocks = extract_enriched_function_blocks(package_name, scala_type, report)
+        metrics.count("index_js.blocks", len(blocks))
+        yield from blocks
+
+
+def transform_scala_types(scala_types: Iterable[Tuple[str, Dict]], max_workers: Optional[int] = None,
+                          chunk_size: int = TRANSFORM_CHUNK_SIZE, threshold: int = PARALLEL_TRANSFORM_THRESHOLD,
+                          executor: Optional[Executor] = None, report: Optional[TransformReport] = None
+                          ) -> Iterator[EnrichedFunctionBlock]:
+    """
+    Runs extract_enriched_function_blocks for every (package_name, scala_type) pair and yields the blocks in input
+    order. Inputs with fewer than threshold Scala types are transformed in this process, so small indexes do not pay
+    for worker startup. Larger inputs are sent to a process pool, or to executor, in chunks of chunk_size consecutive
+    Scala types; chunks come back as EnrichedFunctionBlockBatches, which pickle several times faster than lists of
+    blocks, together with the TransformReport of the chunk, which is merged into report.
+    """
+    scala_types = iter(scala_types)
+    head = list(islice(scala_types, threshold))
+    if len(head) < threshold:
+        for package_name, scala_type in head:
+            with metrics.timer("index_js.transform"):
+                blocks = extract_enriched_function_blocks(package_name, scala_type, report)
+            metrics.count("index_js.blocks", len(blocks))
+            yield from blocks
+        return
+    window = (max_workers or os.cpu_count() or 1) * PENDING_TRANSFORM_CHUNKS_PER_WORKER
+    chunks = chunked(chain(head, scala_types), chunk_size)
+    with contextlib.ExitStack() as stack:
+        if executor is None:
+            # Imported here: multiprocessing is only needed for indexes large enough for the pool.
+            from concurrent.futures import ProcessPoolExecutor
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=max_workers))
+        for batch, chunk_report in map_bounded(executor, _transform_chunk, chunks, window):
+            metrics.count("index_js.blocks", len(batch))
+            # Workers run without metrics; count their skipped blocks here.
+            metrics.count("index_js.error_blocks", chunk_report.error_blocks)
+            metrics.count("index_js.unknown_blocks", chunk_report.unknown_blocks)
+            if report is not None:
+                report.merge(chunk_report)
+            yield from batch
+
+
+def _transform_chunk(chunk: List[Tuple[str, Dict]]) -> Tuple[EnrichedFunctionBlockBatch, TransformReport]:
+    batch = EnrichedFunctionBlockBatch()
+    report = TransformReport()
+    for package_name, scala_type in chunk:
+        batch.extend(extract_enriched_function_blocks(package_name, scala_type, report))
+    return batch, report
+
+
+def iter_index_js_scala_types(index_js_file: TextIO, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Tuple[str, Dict]]:
+    """
+    Incrementally tokenizes the Index.PACKAGES object and yields (package_name, scala_type) pairs in file order.
+    Only the text of the value currently being decoded is held in memory.
+    """
+    reader = _IndexJsReader(index_js_file, chunk_size)
+    reader.skip_prefix()
+    reader.expect("{")
+    if reader.consume_if("}"):
+        reader.expect_end()
+        return
+    while True:
+        package_name = reader.decode_value()
+        reader.expect(":")
+        if reader.consume_if("["):
+            if not reader.consume_if("]"):
+                while True:
+                    yield package_name, reader.decode_value()
+                    if reader.consume_if("]"):
+                        break
+                    reader.expect(",")
+        else:
+            # Not a list of Scala types. Mirror the eager path, which iterates whatever the value is.
+            for scala_type in reader.decode_value():
+                yield package_name, scala_type
+        if reader.consume_if("}"):
+            break
+        reader.expect(",")
+    reader.expect_end()
+
+
+class _IndexJsReader:
+    """
+    Helper class. A forward-only buffer over an index.js file handle that decodes one JSON value at a time.
+    """
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, index_js_file: TextIO, chunk_size: int):
+        self._file = index_js_file
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int) -> bool:
+        if self._eof:
+            return False
+        if self._pos:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        chunk = self._file.read(size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer += chunk
+        return True
+
+    def _skip_whitespace(self):
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos].isspace():
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill(self._chunk_size):
+                return
+
+    def skip_prefix(self):
+        self._skip_whitespace()
+        while len(self._buffer) - self._pos < len(INDEX_PACKAGES_PREFIX) and self._fill(self._chunk_size):
+            pass
+        if self._buffer.startswith(INDEX_PACKAGES_PREFIX, self._pos):
+            self._pos += len(INDEX_PACKAGES_PREFIX)
+
+    def consume_if(self, token: str) -> bool:
+        self._skip_whitespace()
+        if self._buffer.startswith(token, self._pos):
+            self._pos += len(token)
+            return True
+        return False
+
+    def expect(self, token: str):
+        if not self.consume_if(token):
+            raise json.JSONDecodeError(f"Expecting '{token}'", self._buffer, self._pos)
+
+    def expect_end(self):
+        self._skip_whitespace()
+        while self.consume_if(";"):
+            pass
+        if self._pos < len(self._buffer):
+            raise json.JSONDecodeError("Extra data", self._buffer, self._pos)
+
+    def decode_value(self):
+        with metrics.timer("index_js.decode"):
+            return self._decode_value()
+
+    def _decode_value(self):
+        self._skip_whitespace()
+        read_size = self._chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # The value may be cut off at the end of the buffer. Read more, growing the read size so a single
+                # large value is re-scanned a logarithmic number of times.
+                if not self._fill(read_size):
+                    raise
+                read_size *= 2
+                continue
+            if end == len(self._buffer) and not self._eof and type(value) in (int, float):
+                # A number at the buffer edge may continue in the next chunk.
+                if self._fill(read_size):
+                    continue
+            if INDEX_PACKAGES_PREFIX in self._buffer[self._pos:end]:
+                _exit_on_duplicate_prefix()
+            self._pos = end
+            return value
+
+
+def extract_enriched_function_blocks(package_name: str, scala_type: Dict,
+                                     report: Optional[TransformReport] = None) -> List[EnrichedFunctionBlock]:
     """
     Iterates through nested function blocks. Produces function blocks enriched with data from the parent block.
+    Blocks that are not function blocks, e.g. error blocks, are counted in report and skipped.
     """
+    member_keys, other_keys = _scala_type_plan(scala_type)
+    for k in other_keys:
+        if type(scala_type[k]) is list:
+            logging.warning(f"Unrecognized list '{k}' in Scala type {scala_type.get('name')}, may be missing functions")
+            if report is not None:
+                report.unknown_lists += 1
     rtn_blocks = []
-    for k, v in scala_type.items():
+    for k in member_keys:
+        v = scala_type[k]
         if type(v) is list:
-            if k in FUNCTION_BLOCK_KEYS:
-                fbst = _enrich_function_blocks(package_name, scala_type, v)
-                rtn_blocks.extend(fbst)
-            else:
-                # TODO log, maybe error
-                print(f"error may be missing functions in block {k}")
+            rtn_blocks.extend(_enrich_function_blocks(package_name, scala_type, v, report))
     return rtn_blocks
 
 
-def _enrich_function_blocks(package_name: str, meta_data: Dict, fn_blocks: List[Dict]) -> List[EnrichedFunctionBlock]:
+def _scala_type_plan(scala_type: Dict) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
     """
-    Helper function. Build an enriched function block.
+    Helper function. Splits the keys of a Scala type, in order, into the members lists and the unknown keys. Scala
+    types of one index share a handful of key layouts, so the split is computed once per layout.
     """
-    kind = meta_data.get('kind')
+    layout = tuple(scala_type)
+    plan = _SCALA_TYPE_PLANS.get(layout)
+    if plan is None:
+        plan = (tuple(k for k in layout if k in FUNCTION_BLOCK_KEYS),
+                tuple(k for k in layout if k not in FUNCTION_BLOCK_KEYS and k not in SCALA_TYPE_FIELDS))
+        if len(_SCALA_TYPE_PLANS) < _MAX_SCALA_TYPE_PLANS:
+            _SCALA_TYPE_PLANS[layout] = plan
+    return plan
 
-    if kind not in {"case class", "class", "object", "trait"}:
-        # TODO log, maybe error
-        print(f"Unexpected Scala Type found. Kind: {kind}")
 
+def _enrich_function_blocks(package_name: str, meta_data: Dict, fn_blocks: List[Dict],
+                            report: Optional[TransformReport] = None) -> List[EnrichedFunctionBlock]:
+    """
+    Helper function. Build the enriched function blocks of one members list.
+    """
+    kind = _intern(meta_data.get('kind'))
+
+    if kind not in SCALA_KINDS:
+        logging.warning(f"Unexpected Scala Type found. Kind: {kind}")
+        if report is not None:
+            report.unexpected_kinds += 1
+
+    # The parent fields are looked up once and shared by every member.
+    parent = (package_name, meta_data.get('name'), meta_data.get('shortDescription'), kind,
+              meta_data.get('case class'), meta_data.get('class'), meta_data.get('object'), meta_data.get('trait'))
+    rtn_blocks = []
     for fb in fn_blocks:
-        _function_block = build_function_block(fb)
-        if _function_block:
-            yield EnrichedFunctionBlock(
-                package_name=package_name,
-                file_name=meta_data.get('name'),
-                short_description=meta_data.get('shortDescription'),
-                kind=kind,
-                case_class_link=meta_data.get('case class'),
-                class_link=meta_data.get('class'),
-                object_link=meta_data.get('object'),
-                trait_link=meta_data.get('trait'),
-                function_block=_function_block
-            )
-
-
-def build_function_block(block: Dict) -> FunctionBlock:
-    """
-    Helper function. Build a function block.
-    """
-    if set(block.keys()) == set(FunctionBlock.__annotations__.keys()):
-        return FunctionBlock(
-            label=block.get('label'),
-            tail=block.get('tail'),
-            member=block.get('member'),
-            link=block.get('link'),
-            kind=block.get('kind')
-        )
-    else:
-        # ErrorBlocks unhandled- not needed right now. These contain keys ('member', 'error'). There
-        # may be other blocks to handle in the future, but the bulk of the blocks are function blocks.
-        pass
+        if fb.keys() == FUNCTION_BLOCK_SCHEMA:
+            rtn_blocks.append(EnrichedFunctionBlock(*parent, FunctionBlock(fb['label'], fb['tail'], fb['member'],
+                                                                           fb['link'], _intern(fb['kind']))))
+        else:
+            _skip_block(fb, report)
+    return rtn_blocks
+
+
+def _intern(value):
+    # Kinds repeat on every member, but json.loads allocates a new string for each occurrence.
+    return sys.intern(value) if type(value) is str else value
+
+
+def build_function_block(block: Dict) -> Optional[FunctionBlock]:
+    """
+    Helper function. Build a function block, or None for any other block kind.
+    """
+    if block.keys() == FUNCTION_BLOCK_SCHEMA:
+        return FunctionBlock(block['label'], block['tail'], block['member'], block['link'], _intern(block['kind']))
+    return None
+
+
+def _skip_error_block(block: Dict, report: Optional[TransformReport]):
+    _logger.debug(f"Skipping error block of {block['member']}: {block['error']}")
+    metrics.count("index_js.error_blocks")
+    if report is not None:
+        report.error_blocks += 1
+
+
+def _skip_unknown_block(block: Dict, report: Optional[TransformReport]):
+    _logger.debug(f"Skipping unknown block with keys {sorted(block)}")
+    metrics.count("index_js.unknown_blocks")
+    if report is not None:
+        report.unknown_blocks += 1
+
+
+# Handlers of the block kinds other than function blocks, by key set.
+_BLOCK_HANDLERS: Dict[frozenset, Callable[[Dict, Optional[TransformReport]], None]] = {
+    ERROR_BLOCK_SCHEMA: _skip_error_block,
+}
+
+
+def _skip_block(block: Dict, report: Optional[TransformReport]):
+    _BLOCK_HANDLERS.get(frozenset(block), _skip_unknown_block)(block, report)
 
 
 def encode_enriched_function_block(efb: EnrichedFunctionBlock) -> str:
@@ -140,3 +581,127 @@ def encode_enriched_function_block(efb: EnrichedFunctionBlock) -> str:
     Encodes an EnrichedFunctionBlock as a JSON string.
     """
     return json.dumps(asdict(efb), separators=(',', ':'))
+
+
+def enriched_function_block_to_dict(efb: EnrichedFunctionBlock) -> Dict:
+    """
+    Same result as dataclasses.asdict for an EnrichedFunctionBlock, without the generic recursive deep copy.
+    """
+    fb = efb.function_block
+    return {
+        'package_name': efb.package_name,
+        'file_name': efb.file_name,
+        'short_description': efb.short_description,
+        'kind': efb.kind,
+        'case_class_link': efb.case_class_link,
+        'class_link': efb.class_link,
+        'object_link': efb.object_link,
+        'trait_link': efb.trait_link,
+        'function_block': {
+            'label': fb.label,
+            'tail': fb.tail,
+            'member': fb.member,
+            'link': fb.link,
+            'kind': fb.kind
+        }
+    }
+
+
+def get_json_dumps(library: str = None) -> Callable[[Dict], str]:
+    """
+    Returns a dict -> str JSON serializer whose output is byte-identical to
+    json.dumps(value, separators=(',', ':')). library is 'orjson', 'msgspec' or 'json'; by default the fastest
+    installed one is used. Values holding floats are encoded with json: the fast encoders write them differently,
+    e.g. 1e+16 as 1e16, 1e-07 as 1e-7 and NaN as null.
+    """
+    if library is None:
+        library = 'orjson' if orjson else 'msgspec' if msgspec else 'json'
+    if library == 'json':
+        return _json_dumps
+    if library == 'orjson':
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+        return lambda value: _ascii_dumps(orjson.dumps, value)
+    if library == 'msgspec':
+        if msgspec is None:
+            raise ImportError("msgspec is not installed")
+        return lambda value, _encode=msgspec.json.Encoder().encode: _ascii_dumps(_encode, value)
+    raise ValueError(f"Unknown json library '{library}'")
+
+
+def _json_dumps(value: Dict) -> str:
+    return json.dumps(value, separators=(',', ':'))
+
+
+def _ascii_dumps(dumps: Callable[[Dict], bytes], value: Dict) -> str:
+    if _contains_float(value):
+        return _json_dumps(value)
+    try:
+        encoded = dumps(value).decode('utf-8')
+    except (TypeError, ValueError, UnicodeError):
+        # Lone surrogates and other values the fast encoders reject.
+        return _json_dumps(value)
+    if encoded.isascii() and '\x7f' not in encoded:
+        return encoded
+    return _non_ascii_pattern().sub(_escape_non_ascii, encoded)
+
+
+def _contains_float(value) -> bool:
+    # Records are mostly strings and None, which are skipped first.
+    for item in (value.values() if isinstance(value, dict) else value):
+        if item.__class__ is str or item is None:
+            continue
+        if isinstance(item, float) or isinstance(item, (dict, list, tuple)) and _contains_float(item):
+            return True
+    return False
+
+
+@functools.lru_cache(maxsize=None)
+def _non_ascii_pattern() -> Pattern:
+    # Characters json.dumps escapes with its default ensure_ascii=True, but orjson and msgspec write raw. Compiled on
+    # first use: the charset spans all of Unicode and takes milliseconds to compile, most encodes never need it.
+    return re.compile('[\x7f-\U0010ffff]')
+
+
+def _escape_non_ascii(match) -> str:
+    # Same escapes as json.encoder.py_encode_basestring_ascii, including surrogate pairs.
+    code_point = ord(match.group())
+    if code_point < 0x10000:
+        return '\\u{0:04x}'.format(code_point)
+    code_point -= 0x10000
+    return '\\u{0:04x}\\u{1:04x}'.format(0xd800 | (code_point >> 10), 0xdc00 | (code_point & 0x3ff))
+
+
+def encode_enriched_function_block_fast(efb: EnrichedFunctionBlock, dumps: Callable[[Dict], str] = None) -> str:
+    """
+    Faster drop-in for encode_enriched_function_block with identical output.
+    """
+    return (dumps or _default_dumps)(enriched_function_block_to_dict(efb))
+
+
+def write_enriched_function_blocks(blocks: Iterable[EnrichedFunctionBlock], out: TextIO,
+                                   batch_size: int = ENCODE_BATCH_SIZE, dumps: Callable[[Dict], str] = None) -> int:
+    """
+    Encodes blocks as JSONL and writes them to out in batches of batch_size lines. Returns the number of records.
+    """
+    dumps = dumps or _default_dumps
+    count = 0
+    blocks = iter(blocks)
+    while True:
+        batch = list(islice(blocks, batch_size))
+        if not batch:
+            return count
+        with metrics.timer("encode"):
+            lines = [dumps(enriched_function_block_to_dict(efb)) for efb in batch]
+        with metrics.timer("write"):
+            count += _write_batch(lines, out)
+
+
+def _write_batch(batch: List[str], out: TextIO) -> int:
+    batch.append("")
+    out.write("\n".join(batch))
+    metrics.count("records", len(batch) - 1)
+    return len(batch) - 1
+
+
+_default_dumps = get_json_dumps()
@@ -0,0 +1,147 @@
+"""
+Synthetic scaladoc corpus generator. Produces an index.js and member pages in the shapes transformer and html_parser
+expect, with the member links of both sides matching so the join stage can be exercised too.
+
+    python -m testing.corpus out_dir --packages 50 --types 20 --members 30
+"""
+import argparse
+import json
+import os
+import random
+from typing import Dict, List
+
+SCALA_KINDS = ("class", "case class", "object", "trait")
+MEMBER_KINDS = ("def", "val", "implicit def", "abstract def", "final def")
+
+PAGE_HEADER = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"/><title>{name}</title>
+<link href="../lib/template.css" media="screen" type="text/css" rel="stylesheet"/>
+<script type="text/javascript" src="../lib/template.js"></script></head>
+<body class="type"><div id="search"><span id="doc-title">Synthetic</span><span class="close">x</span></div>
+<div id="content-scroll-container"><div id="content-container"><div id="subpackage-spacer">
+<div id="packages"><h1>Packages</h1><ul>{navigation}</ul></div></div>
+<div id="content"><div id="definition"><h1>{name}</h1></div>
+<h4 id="signature" class="signature"><span class="modifier_kind"><span class="kind">{kind}</span></span>
+<span class="symbol"><span class="name">{name}</span></span></h4>
+<div id="comment" class="fullcommenttop"><div class="comment cmt"><p>{description}</p></div></div>
+<div id="mbrsel"><div id="filterby"><ol id="linearization"><li class="in" name="{name}"><span>{name}</span></li>
+<li class="in" name="scala.AnyRef"><span>AnyRef</span></li><li class="in" name="scala.Any"><span>Any</span></li>
+</ol></div></div>
+<div id="template"><div id="allMembers"><div class="values members"><h3>Value Members</h3><ol>
+"""
+PAGE_FOOTER = """</ol></div></div></div>
+<div id="inheritedMembers"><div class="parent" name="scala.AnyRef"><h3>Inherited from AnyRef</h3></div></div>
+</div></div></div><div id="tooltip"></div></body></html>
+"""
+MEMBER = """<li class="indented0 " name="{owner}#{label}" group="Ungrouped" fullComment="yes" data-isabs="false" visbl="pub">\
+<a id="{anchor}" class="anchorToMember"></a><a id="{anchor}" class="anchorToMember"></a> \
+<span class="permalink"><a href="../{link}" title="Permalink"><i class="material-icons"></i></a></span> \
+<span class="modifier_kind"><span class="modifier"></span> <span class="kind">{kind}</span></span> \
+<span class="symbol"><span class="name{deprecated_class}"{deprecated_title}>{label}</span>\
+<span class="params">(<span name="fa">fa: <span name="{owner}.F" class="extype">F</span>[A]</span>)</span>\
+<span class="result">: <a href="https://www.scala-lang.org/api/2.13.4/scala/Int.html#scala.Int" name="scala.Int" \
+id="scala.Int" class="extype">Int</a></span></span>{comments}</li>
+"""
+
+
+def _member_link(package: str, type_name: str, label: str, index: int) -> str:
+    return f"{package.replace('.', '/')}/{type_name}.html#{label}[A](fa:F[A]):Int{'' if index % 7 else '=>δ'}"
+
+
+def generate_index(packages: int, types: int, members: int, seed: int = 0) -> Dict[str, List[Dict]]:
+    """
+    Builds the Index.PACKAGES object: packages * types Scala types with members function blocks each.
+    """
+    rng = random.Random(seed)
+    index = {}
+    for p in range(packages):
+        package = f"synthetic.pkg{p}"
+        scala_types = []
+        for t in range(types):
+            type_name = f"Type{t}"
+            kind = SCALA_KINDS[(p + t) % len(SCALA_KINDS)]
+            blocks = []
+            for m in range(members):
+                label = f"member{m}"
+                blocks.append({
+                    "label": label,
+                    "tail": f"(fa: F[A]): Int{' ' * rng.randrange(3)}",
+                    "member": f"{package}.{type_name}.{label}",
+                    "link": _member_link(package, type_name, label, m),
+                    "kind": MEMBER_KINDS[m % len(MEMBER_KINDS)],
+                })
+            scala_types.append({
+                "name": f"{package}.{type_name}",
+                "shortDescription": f"Synthetic {kind} number {t} in {package}.",
+                kind: f"{package.replace('.', '/')}/{type_name}.html",
+                f"members_{kind}": blocks,
+                "kind": kind,
+            })
+        index[package] = scala_types
+    return index
+
+
+def render_index_js(index: Dict[str, List[Dict]]) -> str:
+    return "Index.PACKAGES = " + json.dumps(index, ensure_ascii=False) + ";"
+
+
+def render_member_page(scala_type: Dict, navigation_items: int = 50) -> str:
+    """
+    Renders one member page with a #template list item per function block, surrounded by page chrome.
+    """
+    kind = scala_type["kind"]
+    navigation = "".join(f'<li><a href="../nav{i}/index.html" class="tplshow">nav{i}</a></li>'
+                         for i in range(navigation_items))
+    parts = [PAGE_HEADER.format(name=scala_type["name"], kind=kind, navigation=navigation,
+                                description=scala_type["shortDescription"])]
+    for i, block in enumerate(scala_type[f"members_{kind}"]):
+        deprecated = i % 11 == 0
+        comments = ""
+        if i % 3 == 0:
+            comments = (f'<p class="shortcomment cmt">Short comment for {block["label"]}.</p>'
+                        f'<div class="fullcomment"><div class="comment cmt"><p>Full comment for {block["label"]}, '
+                        f'with <code>code</code> and more text.</p></div></div>')
+        parts.append(MEMBER.format(
+            owner=scala_type["name"], label=block["label"], kind=block["kind"],
+            anchor=block["link"].split("#", 1)[1].replace(">", "&gt;"),
+            link=block["link"].replace(">", "&gt;"),
+            deprecated_class=" deprecated" if deprecated else "",
+            deprecated_title=' title="Deprecated: (Since version 1.0) synthetic"' if deprecated else "",
+            comments=comments))
+    parts.append(PAGE_FOOTER)
+    return "".join(parts)
+
+
+def write_corpus(directory: str, packages: int, types: int, members: int, seed: int = 0) -> Dict[str, int]:
+    """
+    Writes index.js and one member page per Scala type under directory. Returns the generated sizes.
+    """
+    index = generate_index(packages, types, members, seed)
+    with open(os.path.join(directory, "index.js"), "w", encoding="utf-8") as f:
+        f.write(render_index_js(index))
+    pages = 0
+    for package, scala_types in index.items():
+        package_dir = os.path.join(directory, *package.split("."))
+        os.makedirs(package_dir, exist_ok=True)
+        for scala_type in scala_types:
+            type_name = scala_type["name"].rsplit(".", 1)[1]
+            with open(os.path.join(package_dir, f"{type_name}.html"), "w", encoding="utf-8") as f:
+                f.write(render_member_page(scala_type))
+            pages += 1
+    return {"packages": packages, "types": packages * types, "members": packages * types * members, "pages": pages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("directory")
+    parser.add_argument("--packages", type=int, default=50)
+    parser.add_argument("--types", type=int, default=20, help="Scala types per package")
+    parser.add_argument("--members", type=int, default=30, help="members per Scala type")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    os.makedirs(args.directory, exist_ok=True)
+    print(write_corpus(args.directory, args.packages, args.types, args.members, args.seed))
+
+
+if __name__ == "__main__":
+    main()
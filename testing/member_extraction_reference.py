@@ -0,0 +1,47 @@
+"""
+The multi-pass bs4 member extraction that node_to_flattened_function_comment_block replaced: three find calls,
+tag.text and select_link's find and find_all over every member. Kept as the parity reference of the tests and the
+baseline of benchmarks/bench_member_extraction.py.
+"""
+import logging
+
+import bs4
+
+from src.html_parser import HtmlCommentBlock, collect_html_file_paths
+
+
+def node_to_flattened_function_comment_block_multipass(tag: bs4.element.Tag) -> HtmlCommentBlock:
+    maybe_short_comment_tag = tag.find(attrs={'class': "shortcomment cmt"})
+    maybe_short_comment = maybe_short_comment_tag.text if maybe_short_comment_tag else None
+
+    maybe_full_comment_tag = tag.find(attrs={'class': "comment cmt"})
+    maybe_full_comment = maybe_short_comment_tag.text if maybe_full_comment_tag else None
+
+    maybe_deprecated_tag = tag.find(attrs={'class': "name deprecated"})
+    deprecated_comment = maybe_deprecated_tag.attrs.get('title') if maybe_deprecated_tag else None
+    if not deprecated_comment and "@deprecated" in tag.text:
+        logging.warning(
+            f"""Found @deprecated text in html, but record was not marked as deprecated. Inspect and update parser.
+            Raw html: {tag}""")
+    return HtmlCommentBlock(link=_select_link_multipass(tag), short_comment=maybe_short_comment,
+                            full_comment=maybe_full_comment, is_deprecated=bool(maybe_deprecated_tag),
+                            deprecated_comment=deprecated_comment)
+
+
+def _select_link_multipass(tag: bs4.element.Tag) -> str:
+    function_id = tag.find(name="a", attrs={'class': "anchorToMember"})
+    for link in tag.find_all(name="a", href=True):
+        current = link.attrs.get('href')
+        if function_id.text in current:
+            return current.lstrip("../")
+    return ""
+
+
+def load_list_items(directory: str):
+    items = []
+    for path in sorted(collect_html_file_paths(directory, [])):
+        with open(path, encoding="utf-8") as f:
+            template = bs4.BeautifulSoup(f, features="html.parser").find(id="template")
+        if template is not None:
+            items.extend(template.find_all(name="li"))
+    return items
@@ -0,0 +1,98 @@
+import io
+import json
+import random
+
+import pytest
+
+from src.api_diff import *
+from src.main import main
+
+
+def _record(link, tail="t", package="cats", is_deprecated=False, short_comment="c"):
+    return {'package_name': package, 'file_name': 'cats.Bifunctor', 'short_description': '', 'kind': 'trait',
+            'function_block': {'label': 'l', 'tail': tail, 'member': 'm', 'link': link, 'kind': 'def'},
+            'short_comment': short_comment, 'full_comment': None, 'is_deprecated': is_deprecated,
+            'deprecated_comment': 'gone' if is_deprecated else None}
+
+
+def _jsonl(records):
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+def _diff(old, new, run_size=DEFAULT_RUN_SIZE, report=None):
+    return list(diff_records(iter_sorted_records(io.StringIO(_jsonl(old)), run_size),
+                             iter_sorted_records(io.StringIO(_jsonl(new)), run_size), report))
+
+
+def test_diff_records_reports_added_removed_deprecated_and_changed_members():
+    old = [_record('c/B.html#kept'), _record('c/B.html#removed'), _record('c/B.html#old'),
+           _record('c/B.html#retyped', tail='(a:Int)')]
+    new = [_record('c/B.html#retyped', tail='(a:Long)'), _record('c/B.html#old', is_deprecated=True),
+           _record('c/B.html#kept'), _record('c/B.html#added')]
+    report = DiffReport()
+    changes = _diff(old, new, report=report)
+
+    assert [(c.change, c.link) for c in changes] == [
+        (ADDED, 'c/B.html#added'), (DEPRECATED, 'c/B.html#old'), (REMOVED, 'c/B.html#removed'),
+        (CHANGED, 'c/B.html#retyped')]
+    assert changes[1].fields == ['deprecated_comment', 'is_deprecated']
+    assert changes[3].fields == ['function_block.tail']
+    assert str(report) == "added=1 removed=1 deprecated=1 changed=1 unchanged=1"
+
+
+def test_diff_records_keys_members_by_package_and_normalized_link():
+    old = [_record('../c/B.html#f[A&gt;:B]', package='cats'), _record('c/B.html#f', package='cats')]
+    new = [_record('c/B.html#f[A>:B]', package='cats', short_comment='c'), _record('c/B.html#f', package='fs2')]
+    changes = _diff(old, new)
+
+    assert sorted((c.change, c.package_name, c.link) for c in changes) == [
+        (ADDED, 'fs2', 'c/B.html#f'), (CHANGED, 'cats', 'c/B.html#f[A>:B]'), (REMOVED, 'cats', 'c/B.html#f')]
+
+
+def test_diff_records_handles_html_comment_blocks_and_duplicate_links():
+    old = [{'link': 'c/B.html#f', 'short_comment': 'a'}, {'link': 'c/B.html#f', 'short_comment': 'b'}]
+    new = [{'link': 'c/B.html#f', 'short_comment': 'a'}]
+    changes = _diff(old, new)
+    assert [(c.change, c.package_name, c.link) for c in changes] == [(REMOVED, None, 'c/B.html#f')]
+
+
+def test_reformatted_records_are_unchanged():
+    record = _record('c/B.html#f')
+    compact = json.dumps(record, separators=(',', ':')) + "\n"
+    report = DiffReport()
+    changes = list(diff_records(iter_sorted_records(io.StringIO(json.dumps(record) + "\n")),
+                                iter_sorted_records(io.StringIO(compact)), report))
+    assert changes == []
+    assert report.unchanged == 1
+
+
+@pytest.mark.parametrize("run_size", [1, 3, 7, 1000])
+def test_external_sort_matches_an_in_memory_sort(run_size):
+    rng = random.Random(run_size)
+    records = [_record(f'c/B.html#m{rng.randrange(40)}', tail=str(i)) for i in range(100)]
+    actual = list(iter_sorted_records(io.StringIO(_jsonl(records)), run_size))
+    expected = sorted(((record_key(r), json.dumps(r)) for r in records), key=lambda entry: entry[0])
+    assert actual == expected
+
+
+def test_small_runs_give_the_same_diff_as_one_run():
+    rng = random.Random(0)
+    old = [_record(f'c/B.html#m{i}', tail=str(rng.randrange(3))) for i in range(200)]
+    new = [_record(f'c/B.html#m{i}', tail=str(rng.randrange(3)), is_deprecated=rng.random() < 0.1)
+           for i in range(50, 250)]
+    rng.shuffle(new)
+    assert _diff(old, new, run_size=16) == _diff(old, new)
+
+
+def test_main_diff_writes_changes_as_jsonl(tmp_path, capsys):
+    old, new = tmp_path / "old.jsonl", tmp_path / "new.jsonl"
+    old.write_text(_jsonl([_record('c/B.html#f'), _record('c/B.html#g')]))
+    new.write_text(_jsonl([_record('c/B.html#g', is_deprecated=True)]))
+    main(["diff", str(old), str(new), "--run-size", "1", "--stats"])
+    captured = capsys.readouterr()
+
+    assert [json.loads(line) for line in captured.out.splitlines()] == [
+        {'change': REMOVED, 'package_name': 'cats', 'file_name': 'cats.Bifunctor', 'link': 'c/B.html#f', 'fields': []},
+        {'change': DEPRECATED, 'package_name': 'cats', 'file_name': 'cats.Bifunctor', 'link': 'c/B.html#g',
+         'fields': ['deprecated_comment', 'is_deprecated']}]
+    assert "records=2 " in captured.err
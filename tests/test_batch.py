@@ -0,0 +1,73 @@
+import json
+import os
+import shutil
+import zipfile
+
+import pytest
+
+from src.batch import *
+from src.html_parser import collect_html_file_paths
+from src.main import main
+
+test_dir_path = os.path.join(os.path.dirname(__file__))
+test_data_path = os.path.join(test_dir_path, "resources", "html_parser_test_data")
+
+
+def _build_bundle(directory):
+    shutil.copytree(test_data_path, directory)
+    shutil.copyfile(os.path.join(test_dir_path, "resources", "test_index.js"), directory / "index.js")
+    return directory
+
+
+def _write_manifest(path, entries):
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in entries))
+    return path
+
+
+def test_read_batch_manifest_schedules_largest_bundle_first(tmp_path):
+    small = tmp_path / "small.zip"
+    small.write_bytes(b"x" * 10)
+    _build_bundle(tmp_path / "large")
+    manifest = _write_manifest(tmp_path / "bundles.jsonl", [
+        {"path": "missing.zip"}, {"path": "small.zip", "output": "s.jsonl"}, {"path": "large", "cache": "large.db"}])
+
+    jobs = read_batch_manifest(str(manifest), "out")
+    assert [os.path.basename(job.path) for job in jobs] == ["large", "small.zip", "missing.zip"]
+    assert jobs[0].output == os.path.join("out", "large.jsonl")
+    assert jobs[0].cache == str(tmp_path / "large.db")
+    assert jobs[1].output == os.path.join("out", "s.jsonl")
+    assert jobs[0].size > jobs[1].size == 10
+
+
+def test_read_batch_manifest_rejects_entries_without_path(tmp_path):
+    manifest = _write_manifest(tmp_path / "bundles.jsonl", [{"output": "a.jsonl"}])
+    with pytest.raises(ValueError, match="without a path"):
+        read_batch_manifest(str(manifest))
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_main_batch_writes_every_bundle_and_isolates_failures(tmp_path, capsys, workers):
+    bundle = _build_bundle(tmp_path / "cats")
+    archive = tmp_path / "fs2.zip"
+    with zipfile.ZipFile(archive, "w") as f:
+        for path in collect_html_file_paths(str(bundle), []) + [str(bundle / "index.js")]:
+            f.write(path, os.path.relpath(path, bundle))
+    broken = _build_bundle(tmp_path / "broken")
+    (broken / "index.js").write_text('Index.PACKAGES = {"a": []};Index.PACKAGES = {};')
+    manifest = _write_manifest(tmp_path / "bundles.jsonl", [
+        {"path": "cats", "comments_output": "cats.comments.jsonl"}, {"path": "broken"}, {"path": "fs2.zip"}])
+    out = tmp_path / "out"
+
+    with pytest.raises(SystemExit) as exit_info:
+        main(["batch", str(manifest), "--output-dir", str(out), "--workers", workers, "--stats"])
+    assert exit_info.value.code == 1
+    stats = capsys.readouterr().err
+    assert f"bundle={broken} records=0" in stats and "error=" in stats
+    assert stats.count(" ok") == 2
+
+    main(["extract", str(bundle), "--workers", "1"])
+    expected = capsys.readouterr().out.splitlines()
+    assert (out / "cats.jsonl").read_text().splitlines() == expected
+    assert (out / "fs2.jsonl").read_text().splitlines() == expected
+    assert len((out / "cats.comments.jsonl").read_text().splitlines()) == 25
+    assert sorted(os.listdir(out)) == ["cats.comments.jsonl", "cats.jsonl", "fs2.jsonl"]
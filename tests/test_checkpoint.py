@@ -0,0 +1,128 @@
+import contextlib
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from testing.corpus import write_corpus
+from src import main as main_module
+from src.checkpoint import *
+from src.main import main
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _extract_args(bundle, out):
+    return ["extract", str(bundle), "-o", str(out / "functions.jsonl"), "--comments-output",
+            str(out / "comments.jsonl"), "--workers", "1"]
+
+
+def _outputs(out):
+    return (out / "functions.jsonl").read_text(), (out / "comments.jsonl").read_text()
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    bundle = tmp_path / "bundle"
+    bundle.mkdir()
+    write_corpus(str(bundle), packages=3, types=4, members=12)
+    clean = tmp_path / "clean"
+    clean.mkdir()
+    main(_extract_args(bundle, clean))
+    return bundle, _outputs(clean)
+
+
+def test_checkpointed_run_matches_a_clean_run_and_removes_its_checkpoint(tmp_path, corpus):
+    bundle, expected = corpus
+    out = tmp_path / "out"
+    out.mkdir()
+    main(_extract_args(bundle, out) + ["--checkpoint", "--checkpoint-interval", "7"])
+    assert _outputs(out) == expected
+    assert sorted(os.listdir(out)) == ["comments.jsonl", "functions.jsonl"]
+
+
+@pytest.mark.parametrize("failing_page", [0, 3, 11])
+def test_resume_after_a_failure_matches_a_clean_run(tmp_path, corpus, monkeypatch, failing_page):
+    bundle, expected = corpus
+    out = tmp_path / "out"
+    out.mkdir()
+    extractor = main_module.get_list_node_extractor("bs4")
+    calls = []
+
+    def failing_extractor(path, source=None):
+        calls.append(path)
+        if len(calls) > failing_page:
+            raise RuntimeError("worker died")
+        return extractor(path, source)
+
+    monkeypatch.setattr(main_module, "get_list_node_extractor", lambda backend: failing_extractor)
+    with pytest.raises(RuntimeError):
+        main(_extract_args(bundle, out) + ["--checkpoint", "--checkpoint-interval", "5"])
+    checkpoint = read_checkpoint(checkpoint_path(str(out / "functions.jsonl")))
+    # Closing the outputs flushed records past the checkpoint; resuming must drop them.
+    assert os.path.getsize(out / "comments.jsonl") >= checkpoint.outputs[str(out / "comments.jsonl")].offset
+
+    monkeypatch.undo()
+    main(_extract_args(bundle, out) + ["--resume", "--checkpoint-interval", "5"])
+    assert _outputs(out) == expected
+    assert not os.path.exists(checkpoint_path(str(out / "functions.jsonl")))
+
+
+@pytest.mark.parametrize("stage", ["functions", "comments"])
+def test_resume_after_the_process_was_killed_matches_a_clean_run(tmp_path, stage):
+    bundle = tmp_path / "bundle"
+    bundle.mkdir()
+    write_corpus(str(bundle), packages=4, types=10, members=20)
+    clean, out = tmp_path / "clean", tmp_path / "out"
+    clean.mkdir()
+    out.mkdir()
+    main(_extract_args(bundle, clean))
+    path = checkpoint_path(str(out / "functions.jsonl"))
+    stage_output = str(out / f"{stage}.jsonl")
+
+    args = _extract_args(bundle, out) + ["--checkpoint", "--checkpoint-interval", "100", "--buffer-size", "4096"]
+    process = subprocess.Popen([sys.executable, "-m", "src.main"] + args, cwd=repo_root)
+    try:
+        while process.poll() is None:
+            with contextlib.suppress(FileNotFoundError, ValueError):
+                if read_checkpoint(path).outputs[stage_output].records:
+                    process.send_signal(signal.SIGKILL)
+                    break
+            time.sleep(0.001)
+    finally:
+        process.wait()
+    assert process.returncode == -signal.SIGKILL, "the run finished before it could be killed"
+
+    main(_extract_args(bundle, out) + ["--resume"])
+    assert _outputs(out) == _outputs(clean)
+
+
+def test_resume_without_a_checkpoint_exits(tmp_path):
+    with pytest.raises(SystemExit) as e:
+        main(["html", str(tmp_path), "-o", str(tmp_path / "comments.jsonl"), "--resume"])
+    assert "No checkpoint" in str(e.value.code)
+
+
+def test_resume_rejects_the_checkpoint_of_another_run(tmp_path):
+    output = str(tmp_path / "comments.jsonl")
+    write_checkpoint(checkpoint_path(output), Checkpoint("extract", str(tmp_path), {output: OutputState()}))
+    with pytest.raises(SystemExit) as e:
+        main(["html", str(tmp_path), "-o", output, "--resume"])
+    assert "Cannot resume" in str(e.value.code)
+
+
+@pytest.mark.parametrize("args", [[], ["-o", "out.jsonl", "--join"], ["--shards", "out"]])
+def test_checkpoints_need_a_jsonl_output_file(tmp_path, args):
+    with pytest.raises(SystemExit):
+        main(["extract", str(tmp_path), "--checkpoint"] + args)
+
+
+def test_read_checkpoint_rejects_other_versions(tmp_path):
+    path = tmp_path / "out.jsonl.checkpoint"
+    path.write_text(json.dumps({"version": CHECKPOINT_VERSION + 1}))
+    with pytest.raises(ValueError):
+        read_checkpoint(str(path))
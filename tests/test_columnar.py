@@ -0,0 +1,98 @@
+import importlib.util
+import io
+import os
+
+import pytest
+
+from src.columnar import *
+from src.main import main
+from src.transformer import EnrichedFunctionBlock, FunctionBlock, index_js_to_enriched_function_blocks
+
+test_dir_path = os.path.join(os.path.dirname(__file__))
+test_index_js_path = os.path.join(test_dir_path, "resources", "test_index.js")
+
+requires_pyarrow = pytest.mark.skipif(not importlib.util.find_spec("pyarrow"), reason="pyarrow not installed")
+
+
+def _blocks():
+    with open(test_index_js_path) as f:
+        blocks = index_js_to_enriched_function_blocks(f.read())
+    odd = EnrichedFunctionBlock("pé", "F", "lone \ud800 surrogate", "class", None, "", None, None,
+                                FunctionBlock("l", "t", "m", "p/F.html#l:Int", "def"))
+    return blocks + [odd]
+
+
+@pytest.mark.parametrize("compression", ["zlib", None])
+@pytest.mark.parametrize("row_group_size", [1, 4, ROW_GROUP_SIZE])
+def test_colfile_round_trips_enriched_function_blocks(tmp_path, compression, row_group_size):
+    path = tmp_path / "functions.colfile"
+    blocks = _blocks()
+    with open(path, "wb") as f, ColfileWriter(f, row_group_size, compression) as writer:
+        assert writer.write_enriched_function_blocks(blocks) == len(blocks)
+    assert list(iter_columnar_enriched_function_blocks(str(path))) == blocks
+    assert len(list(iter_row_groups(str(path)))) == -(-len(blocks) // row_group_size)
+
+
+def test_colfile_dictionary_encoding_stores_repeated_values_once(tmp_path, monkeypatch):
+    blocks = _blocks()[:-1] * 50
+
+    def write(path):
+        with open(path, "wb") as f, ColfileWriter(f, compression=None) as writer:
+            writer.write_enriched_function_blocks(blocks)
+        return path.stat().st_size
+
+    dictionary_size = write(tmp_path / "dictionary.colfile")
+    monkeypatch.setattr("src.columnar.DICTIONARY_COLUMNS", frozenset())
+    plain_size = write(tmp_path / "plain.colfile")
+    repeated_bytes = sum(len(block.package_name) + len(block.file_name) + len(block.short_description)
+                         for block in blocks)
+    assert plain_size - dictionary_size > repeated_bytes * 0.9
+    assert list(iter_columnar_enriched_function_blocks(str(tmp_path / "plain.colfile"))) == blocks
+
+
+def test_open_columnar_writer_rejects_unknown_formats():
+    with pytest.raises(ValueError):
+        open_columnar_writer(io.BytesIO(), "orc")
+
+
+def test_iter_row_groups_rejects_other_files(tmp_path):
+    path = tmp_path / "functions.jsonl"
+    path.write_text("{}\n")
+    with pytest.raises(ValueError):
+        list(iter_row_groups(str(path)))
+
+
+@requires_pyarrow
+def test_parquet_round_trips_enriched_function_blocks(tmp_path):
+    path = tmp_path / "functions.parquet"
+    blocks = _blocks()[:-1]
+    with open(path, "wb") as f, open_columnar_writer(f, "parquet", row_group_size=4) as writer:
+        writer.write_enriched_function_blocks(blocks)
+    assert list(iter_columnar_enriched_function_blocks(str(path))) == blocks
+
+
+def test_main_extract_writes_columnar_output(tmp_path):
+    bundle = tmp_path / "bundle"
+    bundle.mkdir()
+    with open(test_index_js_path) as f:
+        (bundle / "index.js").write_text(f.read())
+    out = tmp_path / "functions.col"
+    main(["extract", str(bundle), "-o", str(out), "--format", "colfile"])
+    assert list(iter_columnar_enriched_function_blocks(str(out))) == _blocks()[:-1]
+
+
+@pytest.mark.parametrize("args", [["--join", "-o", "out"], []])
+def test_main_rejects_columnar_output_to_stdout_or_with_join(tmp_path, args):
+    with pytest.raises(SystemExit):
+        main(["extract", str(tmp_path), "--format", "colfile"] + args)
+
+
+def test_incomplete_columnar_writers_cannot_be_created():
+    class RowGroupsOnly(ColumnarWriter):
+        def _write_row_group(self, columns, rows):
+            pass
+
+    with pytest.raises(TypeError):
+        ColumnarWriter()
+    with pytest.raises(TypeError):
+        RowGroupsOnly()
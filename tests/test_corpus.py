@@ -0,0 +1,23 @@
+import os
+
+from testing.corpus import *
+from src.html_parser import collect_html_file_paths, extract_list_nodes
+from src.joiner import JoinReport, build_comment_index, join_function_blocks
+from src.transformer import index_js_to_enriched_function_blocks
+
+
+def test_write_corpus_produces_pages_and_an_index_that_parse_and_join(tmp_path):
+    sizes = write_corpus(str(tmp_path), packages=2, types=3, members=12)
+    assert sizes == {"packages": 2, "types": 6, "members": 72, "pages": 6}
+
+    with open(os.path.join(str(tmp_path), "index.js"), encoding="utf-8") as f:
+        function_blocks = index_js_to_enriched_function_blocks(f.read())
+    comment_blocks = [block for path in sorted(collect_html_file_paths(str(tmp_path), []))
+                      for block in extract_list_nodes(path)]
+    assert len(function_blocks) == len(comment_blocks) == 72
+    assert any(block.is_deprecated for block in comment_blocks)
+    assert any(block.short_comment for block in comment_blocks)
+
+    report = JoinReport()
+    list(join_function_blocks(function_blocks, build_comment_index(comment_blocks), report))
+    assert report.matched == 72
@@ -0,0 +1,84 @@
+import importlib.util
+import subprocess
+import sys
+
+import pytest
+
+from src.html_backends import *
+from src.html_parser import *
+
+test_dir_path = os.path.join(os.path.dirname(__file__))
+test_data_path = os.path.join(test_dir_path, "resources", "html_parser_test_data")
+
+OPTIONAL_BACKENDS = [
+    pytest.param(backend, marks=pytest.mark.skipif(not importlib.util.find_spec(backend),
+                                                   reason=f"{backend} not installed"))
+    for backend in ("lxml", "selectolax")
+]
+
+DEPRECATED_PAGE = """
+<html><body><div id="template"><ol>
+<li class="indented0 " name="cats.Bifunctor#catsBifunctorForTuple2"><a id="catsBifunctorForTuple2:cats.Bifunctor[Tuple2]"
+    class="anchorToMember"></a> <span class="permalink"><a
+    href="../cats/Bifunctor$.html#catsBifunctorForTuple2:cats.Bifunctor[Tuple2]" title="Permalink"></a></span>
+    <span class="symbol"><span class="name deprecated" title="Deprecated: (Since version 2.4.0)">catsBifunctorForTuple2</span></span>
+    <p class="shortcomment cmt">Short &amp; sweet.</p>
+    <div class="fullcomment"><div class="comment cmt"><p>Full.</p></div>
+    <dl class="attributes block"><dd><span class="name">@deprecated</span></dd></dl></div>
+</li>
+<li class="indented0 "><a id="undocumented:Int" class="anchorToMember"></a><span class="permalink"><a
+    href="../cats/Bifunctor.html#undocumented:Int"></a></span> @deprecated</li>
+</ol></div></body></html>
+"""
+
+
+def test_get_list_node_extractor_returns_the_bs4_extractor_by_default():
+    assert get_list_node_extractor() is extract_list_nodes
+
+
+def test_get_list_node_extractor_rejects_unknown_backends():
+    with pytest.raises(ValueError):
+        get_list_node_extractor("regex")
+
+
+@pytest.mark.parametrize("backend", OPTIONAL_BACKENDS)
+def test_backend_matches_bs4_over_test_data(backend):
+    extractor = get_list_node_extractor(backend)
+    for path in sorted(collect_html_file_paths(test_data_path, [])):
+        assert extractor(path) == extract_list_nodes(path), path
+
+
+@pytest.mark.parametrize("backend", OPTIONAL_BACKENDS)
+def test_backend_matches_bs4_for_deprecated_and_commented_members(backend, tmp_path):
+    path = tmp_path / "deprecated.html"
+    path.write_text(DEPRECATED_PAGE)
+    expected = extract_list_nodes(str(path))
+    assert expected[0].is_deprecated and expected[0].short_comment == "Short & sweet."
+    assert get_list_node_extractor(backend)(str(path)) == expected
+
+
+@pytest.mark.parametrize("backend", OPTIONAL_BACKENDS)
+def test_backend_matches_bs4_for_elements_with_extra_classes(backend, tmp_path):
+    path = tmp_path / "classes.html"
+    path.write_text("""<html><body><div id="template"><ol>
+<li><a id="f:Int" class="anchorToMember extra"></a><a href="../cats/A.html#f:Int"></a>
+    <p class="cmt shortcomment">Reordered.</p><div class="comment cmt extra">Extra.</div>
+    <span class="deprecated">Single.</span></li>
+</ol></div></body></html>""")
+    expected = extract_list_nodes(str(path))
+    assert expected[0].link == "cats/A.html#f:Int" and expected[0].short_comment is None
+    assert get_list_node_extractor(backend)(str(path)) == expected
+
+
+def test_get_list_node_extractor_fails_fast_when_the_parser_is_missing(monkeypatch):
+    monkeypatch.setitem(BACKEND_MODULES, "lxml", ("not_an_installed_parser.html",))
+    with pytest.raises(ImportError):
+        get_list_node_extractor("lxml")
+
+
+def test_parsers_are_only_imported_by_preload_backend_or_parsing():
+    code = ("import sys, src.html_backends as b; before = 'bs4' in sys.modules; b.preload_backend('bs4-targeted'); "
+            "print(before, 'bs4' in sys.modules)")
+    output = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(test_dir_path), capture_output=True,
+                            text=True, check=True).stdout
+    assert output.split() == ["False", "True"]
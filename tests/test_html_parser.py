@@ -1,8 +1,16 @@
+import gc
+import sys
+
 import bs4
+import pytest
 
+from testing.member_extraction_reference import load_list_items, node_to_flattened_function_comment_block_multipass
+from testing.corpus import write_corpus
 from src.html_parser import *
+from src.html_parser import _PrefetchedMember, _read_member
 
 test_dir_path = os.path.join(os.path.dirname(__file__))
+test_data_path = os.path.join(test_dir_path, "resources", "html_parser_test_data")
 
 
 def test_collect_html_file_paths():
@@ -21,6 +29,35 @@ def test_collect_html_file_paths():
     assert set(actual) == expected
 
 
+def test_iter_html_file_paths_walks_depth_first_in_name_order():
+    test_data_path = os.path.join(test_dir_path, "resources", "html_parser_test_data", "nested_file_structure_data")
+    assert list(iter_html_file_paths(test_data_path)) == [
+        os.path.join(test_data_path, "nested_2a", "nested_3a", "test_2a_3a_a.html"),
+        os.path.join(test_data_path, "nested_2a", "nested_3b", "test_2a_3b_a.html"),
+        os.path.join(test_data_path, "nested_2a", "test_2a_a.html"),
+        os.path.join(test_data_path, "nested_2b", "test_2b_a.html"),
+        os.path.join(test_data_path, "test_top_a.html"),
+        os.path.join(test_data_path, "test_top_b.html"),
+        os.path.join(test_data_path, "test_top_c.html"),
+    ]
+
+
+def test_iter_html_file_paths_does_not_recurse(tmp_path):
+    deepest = tmp_path.joinpath(*["d"] * 200)
+    deepest.mkdir(parents=True)
+    (deepest / "page.html").write_text("<html></html>")
+    frame, depth = sys._getframe(), 0
+    while frame:
+        frame, depth = frame.f_back, depth + 1
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(depth + 50)
+    try:
+        actual = list(iter_html_file_paths(str(tmp_path)))
+    finally:
+        sys.setrecursionlimit(limit)
+    assert actual == [str(deepest / "page.html")]
+
+
 def test_select_link():
     s = """
         <li class="indented0 " name="scala.AnyRef#ne" group="Ungrouped" fullComment="yes" data-isabs="false" visbl="pub"><a
@@ -181,3 +218,134 @@ def test_extract_list_nodes():
         HtmlCommentBlock(link='cats/Bifunctor.html#wait(x$1:Long):Unit', short_comment=None, full_comment=None,
                          is_deprecated=False, deprecated_comment=None)]
     assert actual == expected
+
+
+def test_extract_list_nodes_parallel_preserves_input_order():
+    nested_path = os.path.join(test_dir_path, "resources", "html_parser_test_data", "nested_file_structure_data")
+    bifunctor_path = os.path.join(test_dir_path, "resources", "html_parser_test_data", "test_bifunctor.html")
+    paths = [bifunctor_path, os.path.join(nested_path, "test_top_a.html"), bifunctor_path]
+
+    actual = extract_list_nodes_parallel(paths, max_workers=2, chunk_size=1)
+    expected_blocks = extract_list_nodes(bifunctor_path)
+    assert actual == [(bifunctor_path, expected_blocks), (paths[1], []), (bifunctor_path, expected_blocks)]
+
+
+def test_extract_list_nodes_parallel_runs_in_process_with_one_worker():
+    bifunctor_path = os.path.join(test_dir_path, "resources", "html_parser_test_data", "test_bifunctor.html")
+    actual = extract_list_nodes_parallel([bifunctor_path], max_workers=1)
+    assert actual == [(bifunctor_path, extract_list_nodes(bifunctor_path))]
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_iter_extract_list_nodes_parallel_consumes_a_lazy_walk(max_workers):
+    test_data_path = os.path.join(test_dir_path, "resources", "html_parser_test_data")
+    paths = collect_html_file_paths(test_data_path, [])
+    expected = extract_list_nodes_parallel(paths, max_workers=1, prefetch_size=0)
+    actual = list(iter_extract_list_nodes_parallel(iter_html_file_paths(test_data_path), max_workers=max_workers,
+                                                   chunk_size=2, prefetch_size=2))
+    assert actual == expected
+
+
+def test_encode_html_comment_block_converts_to_string_json():
+    test_hcb = HtmlCommentBlock(link='cats/Bifunctor.html#ne(x$1:AnyRef):Boolean', short_comment='short')
+    actual = encode_html_comment_block(test_hcb)
+    expected = """{"link":"cats/Bifunctor.html#ne(x$1:AnyRef):Boolean","short_comment":"short","full_comment":null,"is_deprecated":false,"deprecated_comment":null}"""
+    assert actual == expected
+
+
+def test_extract_list_nodes_targeted_matches_extract_list_nodes():
+    test_data_path = os.path.join(test_dir_path, "resources", "html_parser_test_data")
+    for path in sorted(collect_html_file_paths(test_data_path, [])):
+        assert extract_list_nodes_targeted(path) == extract_list_nodes(path), path
+
+
+def test_extract_list_nodes_targeted_ignores_members_outside_template(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text("""<html><body><ol><li><a class="anchorToMember"></a><a href="../nav.html">nav</a></li></ol>
+        <div id='template'><ol><li><a class="anchorToMember"></a><a href="../cats/A.html#a:Int">a</a></li></ol></div>
+        </body></html>""")
+    assert extract_list_nodes_targeted(str(page)) == [HtmlCommentBlock(link="cats/A.html#a:Int")]
+    assert extract_list_nodes(str(page)) == [HtmlCommentBlock(link="cats/A.html#a:Int")]
+
+
+def test_single_pass_member_extraction_matches_the_multipass_reference(tmp_path, caplog):
+    write_corpus(str(tmp_path), packages=1, types=2, members=12)
+    (tmp_path / "split.html").write_text(
+        """<div id="template"><ol><li><a id="x" class="anchorToMember other"></a><a href="../a.html#x">x</a>
+        <span class="name">@<b>deprecated</b></span><p class="cmt shortcomment">not the short comment</p>
+        <div class=" shortcomment  cmt ">short</div></li></ol></div>""")
+    items = load_list_items(test_data_path) + load_list_items(str(tmp_path))
+
+    caplog.set_level(logging.WARNING)
+    expected = [node_to_flattened_function_comment_block_multipass(li) for li in items]
+    expected_warnings = [record.getMessage() for record in caplog.records]
+    caplog.clear()
+    assert [node_to_flattened_function_comment_block(li) for li in items] == expected
+    assert [record.getMessage() for record in caplog.records] == expected_warnings
+    assert len(expected_warnings) == 1
+
+
+def test_extract_list_links_matches_extract_list_nodes_and_loads_comments_on_access(tmp_path):
+    write_corpus(str(tmp_path), packages=1, types=2, members=12)
+    paths = collect_html_file_paths(test_data_path, []) + collect_html_file_paths(str(tmp_path), [])
+    for path in paths:
+        expected = extract_list_nodes(path)
+        actual = extract_list_links(path)
+        if expected is None:
+            assert actual is None
+            continue
+        assert [block.link for block in actual] == [block.link for block in expected], path
+        assert not any(block.loaded for block in actual), path
+        assert [(block.short_comment, block.full_comment, block.is_deprecated, block.deprecated_comment)
+                for block in actual] == [(block.short_comment, block.full_comment, block.is_deprecated,
+                                          block.deprecated_comment) for block in expected], path
+        assert all(block.loaded for block in actual)
+        assert [block.load() for block in actual] == expected
+
+
+def test_extract_list_links_skips_comments_and_members_outside_template(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_bytes(b"""<html><body><ol><li><a class="anchorToMember"></a><a href="../nav.html">nav</a></li></ol>
+        <div id='template'><!-- <li><a class="anchorToMember"></a><a href="../x.html">x</a></li> -->
+        <div><ol><li><a class="anchorToMember" id="b"></a><a href="../cats/A.html#a:Int">a</a>\r\n
+        <p class="shortcomment cmt">Short\r\ncomment &amp; more</p></li>
+        <li><A CLASS='anchorToMember'></A><a title='x > y' href="../cats/A.html#b:F[A=&gt;B]">b</a></li></ol></div>
+        </div><ol><li><a class="anchorToMember"></a><a href="../after.html">after</a></li></ol></body></html>""")
+    blocks = extract_list_links(str(page))
+    assert [block.link for block in blocks] == ["cats/A.html#a:Int", "cats/A.html#b:F[A=>B]"]
+    assert [block.load() for block in blocks] == extract_list_nodes(str(page))
+    assert blocks[0].short_comment == "Short\ncomment & more"
+
+
+def test_extract_list_links_falls_back_to_the_parser_for_unclosed_items(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text("""<div id="template"><ol><li><a class="anchorToMember"></a><a href="../cats/A.html#a">a</a>
+        <li><a class="anchorToMember"></a><a href="../cats/A.html#b">b</a></ol></div>""")
+    blocks = extract_list_links(str(page))
+    assert all(block.loaded for block in blocks)
+    assert [block.load() for block in blocks] == extract_list_nodes(str(page))
+
+
+def test_extract_list_links_in_parallel_returns_lazy_records_that_load_in_the_parent(tmp_path):
+    write_corpus(str(tmp_path), packages=1, types=3, members=5)
+    paths = collect_html_file_paths(str(tmp_path), [])
+    expected = extract_list_nodes_parallel(paths, max_workers=1)
+    for max_workers in (1, 2):
+        actual = list(iter_extract_list_nodes_parallel(paths, max_workers=max_workers, extractor=extract_list_links))
+        assert [path for path, _ in actual] == [path for path, _ in expected]
+        assert [[block.load() for block in blocks] for _, blocks in actual] == [blocks for _, blocks in expected]
+
+
+def test_lazy_records_reference_the_page_and_not_the_prefetched_text(tmp_path):
+    write_corpus(str(tmp_path), packages=1, types=2, members=5)
+    paths = collect_html_file_paths(str(tmp_path), [])
+    results = list(iter_extract_list_nodes_parallel(paths, max_workers=1, extractor=extract_list_links))
+    blocks = [block for _, path_blocks in results for block in path_blocks]
+    assert blocks and all(block.source is None for block in blocks)
+    assert not any(isinstance(referent, str) and len(referent) > 1000
+                   for block in blocks for referent in gc.get_referents(block))
+
+    text = _read_member(paths[0], None)
+    prefetched = extract_list_links(paths[0], _PrefetchedMember(text))
+    assert all(block.source is None for block in prefetched)
+    assert [block.load() for block in prefetched] == extract_list_nodes(paths[0])
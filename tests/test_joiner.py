@@ -0,0 +1,45 @@
+from src.joiner import *
+from src.transformer import FunctionBlock
+
+
+def _efb(link):
+    return EnrichedFunctionBlock(package_name='cats', file_name='cats.Bifunctor', short_description='', kind='trait',
+                                 case_class_link=None, class_link=None, object_link=None,
+                                 trait_link='cats/Bifunctor.html',
+                                 function_block=FunctionBlock(label='l', tail='t', member='m', link=link, kind='def'))
+
+
+def test_normalize_link_matches_html_and_index_js_forms():
+    assert normalize_link("../cats/Bifunctor.html#leftWiden[A,B,AA&gt;:A]") == "cats/Bifunctor.html#leftWiden[A,B,AA>:A]"
+    assert normalize_link("cats/Bifunctor.html#leftWiden[A,B,AA>:A]") == "cats/Bifunctor.html#leftWiden[A,B,AA>:A]"
+
+
+def test_join_function_blocks_attaches_comments_and_reports_unmatched_links():
+    comments = [
+        HtmlCommentBlock(link='cats/Bifunctor.html#leftWiden[A,B,AA>:A](fab:F[A,B]):F[AA,B]', short_comment='Widens',
+                         full_comment='Widens'),
+        HtmlCommentBlock(link='cats/Bifunctor.html#old:Int', is_deprecated=True, deprecated_comment='Deprecated'),
+        HtmlCommentBlock(link='cats/Bifunctor.html#old:Int', short_comment='duplicate'),
+        HtmlCommentBlock(link='cats/Bifunctor.html#hashCode():Int'),
+    ]
+    functions = [_efb('cats/Bifunctor.html#leftWiden[A,B,AA>:A](fab:F[A,B]):F[AA,B]'),
+                 _efb('cats/Bifunctor.html#missing:Int'),
+                 _efb('cats/Bifunctor.html#old:Int')]
+    report = JoinReport()
+    actual = list(join_function_blocks(functions, build_comment_index(comments, report), report))
+
+    assert [block.short_comment for block in actual] == ['Widens', None, None]
+    assert [block.is_deprecated for block in actual] == [False, False, True]
+    assert actual[2].deprecated_comment == 'Deprecated'
+    assert actual[0].function_block == functions[0].function_block
+    assert report.matched == 2
+    assert report.duplicate_comment_links == 1
+    assert report.unmatched_function_links == ['cats/Bifunctor.html#missing:Int']
+    assert report.unmatched_comment_links == ['cats/Bifunctor.html#hashCode():Int']
+
+
+def test_encode_commented_function_block_appends_comment_fields():
+    cfb = CommentedFunctionBlock(**{name: getattr(_efb('x'), name) for name in EnrichedFunctionBlock.__dataclass_fields__},
+                                 short_comment='s')
+    assert encode_commented_function_block(cfb).endswith(
+        '"short_comment":"s","full_comment":null,"is_deprecated":false,"deprecated_comment":null}')
@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import zipfile
+
+from src.main import *
+from testing.corpus import write_corpus
+from src.html_parser import collect_html_file_paths, extract_list_nodes
+from src.joiner import normalize_link
+from src.transformer import encode_enriched_function_block, index_js_to_enriched_function_blocks
+
+test_dir_path = os.path.join(os.path.dirname(__file__))
+test_data_path = os.path.join(test_dir_path, "resources", "html_parser_test_data")
+
+
+def _build_bundle(tmp_path):
+    bundle = tmp_path / "bundle"
+    shutil.copytree(test_data_path, bundle)
+    shutil.copyfile(os.path.join(test_dir_path, "resources", "test_index.js"), bundle / "index.js")
+    return bundle
+
+
+def test_main_html_writes_one_json_record_per_member(capsys):
+    main(["html", test_data_path, "--workers", "1"])
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 25
+    assert json.loads(lines[0])["link"] == 'cats/Bifunctor.html#bimap[A,B,C,D](fab:F[A,B])(f:A=>C,g:B=>D):F[C,D]'
+
+
+def test_main_extract_writes_function_and_comment_outputs(tmp_path, capsys):
+    bundle = _build_bundle(tmp_path)
+    functions, comments = tmp_path / "functions.jsonl", tmp_path / "comments.jsonl"
+    main(["extract", str(bundle), "-o", str(functions), "--comments-output", str(comments), "--workers", "1",
+          "--stats"])
+
+    with open(os.path.join(test_dir_path, "resources", "test_index.js")) as f:
+        expected = [encode_enriched_function_block(b) for b in index_js_to_enriched_function_blocks(f.read())]
+    assert functions.read_text().splitlines() == expected
+    assert len(comments.read_text().splitlines()) == 25
+    assert "records=31 " in capsys.readouterr().err
+
+
+def test_main_extract_reads_zipped_bundles(tmp_path, capsys):
+    bundle = _build_bundle(tmp_path)
+    archive_path = tmp_path / "bundle.zip"
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        for path in collect_html_file_paths(str(bundle), []) + [str(bundle / "index.js")]:
+            archive.write(path, os.path.relpath(path, bundle))
+    main(["extract", str(archive_path)])
+    assert len(capsys.readouterr().out.splitlines()) == 6
+
+
+def test_main_extract_join_attaches_comments_to_function_records(tmp_path, capsys, caplog):
+    bundle = tmp_path / "bundle"
+    bundle.mkdir()
+    write_corpus(str(bundle), packages=1, types=3, members=4)
+    pages = sorted(collect_html_file_paths(str(bundle), []))
+    # One member page is missing and one page has no index.js members.
+    os.remove(pages[0])
+    shutil.copyfile(os.path.join(test_data_path, "test_bifunctor.html"), bundle / "test_bifunctor.html")
+    comments = {normalize_link(block.link): block for path in sorted(collect_html_file_paths(str(bundle), []))
+                for block in extract_list_nodes(path)}
+
+    caplog.set_level(logging.INFO)
+    main(["extract", str(bundle), "--join", "--workers", "1"])
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assert len(records) == 12
+    matched = 0
+    for record in records:
+        comment = comments.pop(normalize_link(record["function_block"]["link"]), None)
+        matched += comment is not None
+        assert record["short_comment"] == (comment.short_comment if comment else None)
+        assert record["full_comment"] == (comment.full_comment if comment else None)
+        assert record["is_deprecated"] == (comment.is_deprecated if comment else False)
+        assert record["deprecated_comment"] == (comment.deprecated_comment if comment else None)
+    assert matched == 8
+    assert any(record["short_comment"] for record in records)
+    assert f"Join matched=8 unmatched_functions=4 unmatched_comments={len(comments)} " in caplog.text
+
+
+def test_main_extract_cache_reuses_the_transformed_index_js(tmp_path, capsys, caplog):
+    bundle = _build_bundle(tmp_path)
+    cache = str(tmp_path / "manifest.sqlite")
+    main(["extract", str(bundle), "--workers", "1"])
+    expected = capsys.readouterr().out
+
+    caplog.set_level(logging.INFO)
+    for _ in range(2):
+        caplog.clear()
+        main(["extract", str(bundle), "--workers", "1", "--cache", cache])
+        assert capsys.readouterr().out == expected
+    assert "Manifest cache hits=1 misses=0 removed=0" in caplog.text
+
+
+def test_main_extract_cache_decodes_local_index_js_files_in_place(tmp_path, capsys, monkeypatch):
+    from src import transformer
+
+    bundle = _build_bundle(tmp_path)
+    loaded = []
+    load_index_js = transformer.load_index_js
+    monkeypatch.setattr(transformer, "load_index_js", lambda path: loaded.append(path) or load_index_js(path))
+    main(["extract", str(bundle), "--workers", "1", "--cache", str(tmp_path / "manifest.sqlite")])
+    assert loaded == [str(bundle / "index.js")]
+    assert capsys.readouterr().out
+
+
+def test_main_extract_cache_drops_index_js_entries_of_other_paths(tmp_path, capsys):
+    from src.manifest_cache import INDEX_JS_NAMESPACE, ManifestCache
+
+    bundle = _build_bundle(tmp_path)
+    cache = str(tmp_path / "manifest.sqlite")
+    with ManifestCache(cache) as manifest:
+        manifest.put(INDEX_JS_NAMESPACE, "old/index.js", "0", [])
+    main(["extract", str(bundle), "--workers", "1", "--cache", cache])
+    with ManifestCache(cache) as manifest:
+        assert manifest.remove_missing(INDEX_JS_NAMESPACE, [str(bundle / "index.js")]) == 0
+        assert manifest.get(INDEX_JS_NAMESPACE, "old/index.js", "0") is None
+
+
+def test_main_html_with_a_parser_pool_matches_in_process_parsing(capsys):
+    main(["html", test_data_path, "--workers", "1"])
+    expected = capsys.readouterr().out
+    main(["html", test_data_path, "--workers", "2", "--chunk-size", "2"])
+    assert capsys.readouterr().out == expected
+
+
+def test_importing_main_does_not_load_parsers_or_other_commands():
+    code = ("import sys, src.main; print(' '.join(m for m in ('bs4', 'lxml', 'multiprocessing', 'src.transformer', "
+            "'src.api_diff', 'src.manifest_cache') if m in sys.modules))")
+    loaded = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(test_dir_path), capture_output=True,
+                            text=True, check=True).stdout
+    assert loaded.split() == []
@@ -0,0 +1,84 @@
+import os
+import shutil
+
+from src.manifest_cache import *
+from src.html_parser import extract_list_nodes, extract_list_nodes_parallel, collect_html_file_paths
+
+test_dir_path = os.path.join(os.path.dirname(__file__))
+test_data_path = os.path.join(test_dir_path, "resources", "html_parser_test_data")
+
+
+def _first_list_node(path, source=None):
+    return (extract_list_nodes(path, source) or [])[:1]
+
+
+def test_iter_extract_list_nodes_hits_the_cache_on_unchanged_files(tmp_path):
+    bundle = tmp_path / "bundle"
+    shutil.copytree(test_data_path, bundle)
+    paths = sorted(collect_html_file_paths(str(bundle), []))
+    expected = extract_list_nodes_parallel(paths, max_workers=1)
+
+    with ManifestCache(str(tmp_path / "manifest.sqlite")) as cache:
+        assert list(cache.iter_extract_list_nodes(paths, max_workers=1)) == expected
+        assert (cache.stats.hits, cache.stats.misses) == (0, len(paths))
+
+    with ManifestCache(str(tmp_path / "manifest.sqlite")) as cache:
+        assert list(cache.iter_extract_list_nodes(paths, max_workers=1)) == expected
+        assert (cache.stats.hits, cache.stats.misses) == (len(paths), 0)
+
+
+def test_iter_extract_list_nodes_reparses_changed_files_and_removes_deleted_ones(tmp_path):
+    bundle = tmp_path / "bundle"
+    shutil.copytree(test_data_path, bundle)
+    paths = sorted(collect_html_file_paths(str(bundle), []))
+    with ManifestCache(str(tmp_path / "manifest.sqlite")) as cache:
+        list(cache.iter_extract_list_nodes(paths, max_workers=1))
+
+    changed = str(bundle / "nested_file_structure_data" / "test_top_a.html")
+    with open(changed, "w") as f:
+        f.write("""<html><body><div id="template"><ol><li><a class="anchorToMember"></a>
+            <a href="../cats/A.html#a:Int"></a></li></ol></div></body></html>""")
+    deleted = str(bundle / "nested_file_structure_data" / "test_top_b.html")
+    os.remove(deleted)
+    paths.remove(deleted)
+
+    with ManifestCache(str(tmp_path / "manifest.sqlite")) as cache:
+        actual = list(cache.iter_extract_list_nodes(paths, max_workers=1))
+        assert actual == extract_list_nodes_parallel(paths, max_workers=1)
+        assert (cache.stats.hits, cache.stats.misses) == (len(paths) - 1, 1)
+        assert cache.remove_missing(html_namespace(), paths) == 1
+
+
+def test_iter_extract_list_nodes_decodes_cache_hits_as_they_are_yielded(tmp_path, monkeypatch):
+    paths = sorted(collect_html_file_paths(test_data_path, []))
+    with ManifestCache(str(tmp_path / "manifest.sqlite")) as cache:
+        list(cache.iter_extract_list_nodes(paths, max_workers=1))
+
+    with ManifestCache(str(tmp_path / "manifest.sqlite")) as cache:
+        read = []
+        results = cache._results
+        monkeypatch.setattr(cache, "_results", lambda namespace, path: read.append(path) or results(namespace, path))
+        actual = cache.iter_extract_list_nodes(paths, max_workers=1)
+        assert next(actual)[0] == paths[0]
+        assert read == [paths[0]]
+        list(actual)
+        assert read == paths
+
+
+def test_results_of_other_extractors_are_cached_apart(tmp_path):
+    paths = sorted(collect_html_file_paths(test_data_path, []))
+    with ManifestCache(str(tmp_path / "manifest.sqlite")) as cache:
+        list(cache.iter_extract_list_nodes(paths, max_workers=1))
+        first = list(cache.iter_extract_list_nodes(paths, max_workers=1, extractor=_first_list_node))
+        assert (cache.stats.hits, cache.stats.misses) == (0, 2 * len(paths))
+        assert first == [(path, _first_list_node(path)) for path in paths]
+        assert html_namespace(_first_list_node) != html_namespace()
+
+
+def test_index_js_to_enriched_function_blocks_round_trips_through_the_cache(tmp_path):
+    index_js_path = os.path.join(test_dir_path, "resources", "test_index.js")
+    with ManifestCache(str(tmp_path / "manifest.sqlite")) as cache:
+        cold = cache.index_js_to_enriched_function_blocks(index_js_path)
+        warm = cache.index_js_to_enriched_function_blocks(index_js_path)
+        assert warm == cold
+        assert (cache.stats.hits, cache.stats.misses) == (1, 1)
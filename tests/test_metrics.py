@@ -0,0 +1,102 @@
+import json
+import os
+import pstats
+import sys
+import threading
+
+from src import metrics
+from src.html_parser import iter_extract_list_nodes_parallel, collect_html_file_paths
+from src.main import main
+
+test_dir_path = os.path.join(os.path.dirname(__file__))
+test_data_path = os.path.join(test_dir_path, "resources", "html_parser_test_data")
+
+
+def teardown_function():
+    metrics.disable_metrics()
+
+
+def test_disabled_metrics_record_nothing():
+    with metrics.timer("stage", "file.html"):
+        pass
+    metrics.count("files")
+    assert not metrics.get_metrics().timers
+    assert not metrics.get_metrics().counters
+
+
+def test_timer_and_count_record_into_enabled_metrics():
+    collector = metrics.enable_metrics()
+    for _ in range(3):
+        with metrics.timer("stage"):
+            pass
+    metrics.count("files", 2)
+    assert collector.timers["stage"].count == 3
+    assert collector.counters == {"files": 2}
+
+
+def test_slow_files_keeps_the_slowest_items():
+    collector = metrics.Metrics(slow_files=2)
+    for seconds, item in [(0.1, "a"), (0.5, "b"), (0.2, "c"), (0.3, "d")]:
+        collector.record("html.parse", seconds, item)
+    assert [slow["item"] for slow in collector.summary()["slow_files"]] == ["b", "d"]
+
+
+def test_updates_from_several_threads_are_not_lost():
+    collector = metrics.Metrics()
+    worker = metrics.Metrics()
+    worker.count("merged")
+    worker.record("merged.stage", 0.5)
+    worker_summary = worker.summary()
+
+    def update():
+        for _ in range(20000):
+            collector.count("files")
+            collector.record("stage", 0.0)
+            collector.merge(worker_summary)
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=update) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    summary = collector.summary()
+    assert summary["counters"] == {"files": 160000, "merged": 160000}
+    assert summary["timers"]["stage"]["count"] == summary["timers"]["merged.stage"]["count"] == 160000
+
+
+def test_merge_adds_a_summary():
+    worker = metrics.Metrics()
+    worker.record("html.parse", 0.5, "a.html")
+    worker.count("html.files")
+    collector = metrics.Metrics()
+    collector.record("html.parse", 0.25, "b.html")
+    collector.merge(worker.summary())
+    summary = collector.summary()
+    assert summary["timers"]["html.parse"] == {"count": 2, "total_seconds": 0.75, "max_seconds": 0.5}
+    assert summary["counters"] == {"html.files": 1}
+    assert [slow["item"] for slow in summary["slow_files"]] == ["a.html", "b.html"]
+
+
+def test_pool_workers_report_to_the_parent():
+    paths = collect_html_file_paths(test_data_path, [])
+    collector = metrics.enable_metrics()
+    list(iter_extract_list_nodes_parallel(paths, max_workers=2))
+    assert collector.timers["html.parse"].count == len(paths)
+    assert collector.counters["html.blocks"] == 25
+    assert {slow["item"] for slow in collector.summary()["slow_files"]} == set(paths)
+
+
+def test_main_writes_metrics_and_profile(tmp_path):
+    metrics_path, profile_path = tmp_path / "metrics.json", tmp_path / "run.prof"
+    main(["html", test_data_path, "--workers", "1", "-o", str(tmp_path / "out.jsonl"), "--metrics", str(metrics_path),
+          "--profile", str(profile_path)])
+    summary = json.loads(metrics_path.read_text())
+    assert "html.parse" in summary["timers"]
+    assert summary["counters"]["html.blocks"] == 25
+    assert pstats.Stats(str(profile_path)).total_calls > 0
+    assert not metrics.get_metrics().enabled
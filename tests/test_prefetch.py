@@ -0,0 +1,44 @@
+import threading
+import time
+
+import pytest
+
+from src.prefetch import *
+
+
+def test_prefetch_yields_items_in_order():
+    assert list(prefetch(iter(range(100)), maxsize=3)) == list(range(100))
+
+
+def test_prefetch_blocks_the_producer_when_the_queue_is_full():
+    produced = []
+
+    def items():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    prefetched = prefetch(items(), maxsize=4)
+    assert next(prefetched) == 0
+    time.sleep(0.2)
+    # the consumed item, a full queue and the item waiting to be put
+    assert len(produced) <= 6
+    assert list(prefetched) == list(range(1, 100))
+
+
+def test_prefetch_reraises_producer_errors_after_earlier_items():
+    def items():
+        yield 1
+        raise ValueError("walk failed")
+
+    prefetched = prefetch(items())
+    assert next(prefetched) == 1
+    with pytest.raises(ValueError, match="walk failed"):
+        next(prefetched)
+
+
+def test_closing_prefetch_stops_the_producer_thread():
+    prefetched = prefetch(iter(range(1000)), maxsize=1)
+    next(prefetched)
+    prefetched.close()
+    assert not [thread for thread in threading.enumerate() if thread.name == "prefetch"]
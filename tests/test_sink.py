@@ -0,0 +1,149 @@
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+
+import pytest
+
+from src.main import main
+from src.sink import *
+
+test_dir_path = os.path.join(os.path.dirname(__file__))
+test_data_path = os.path.join(test_dir_path, "resources", "html_parser_test_data")
+
+requires_zstandard = pytest.mark.skipif(not importlib.util.find_spec("zstandard"), reason="zstandard not installed")
+
+
+def _lines(n):
+    return [json.dumps({"i": i, "text": "x" * (i % 7)}) for i in range(n)]
+
+
+def _read_shards(directory):
+    with open(os.path.join(directory, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    lines = []
+    for shard in manifest["shards"]:
+        path = os.path.join(directory, shard["name"])
+        with open(path, "rb") as f:
+            stored = f.read()
+        assert len(stored) == shard["stored_bytes"]
+        assert hashlib.sha256(stored).hexdigest() == shard["sha256"]
+        if manifest["compression"] == "gzip":
+            stored = gzip.decompress(stored)
+        elif manifest["compression"] == "zstd":
+            import zstandard
+            stored = zstandard.ZstdDecompressor().stream_reader(stored).read()
+        assert len(stored) == shard["bytes"]
+        assert stored.count(b"\n") == shard["records"]
+        lines.extend(stored.decode("utf-8").splitlines())
+    return manifest, lines
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", pytest.param("zstd", marks=requires_zstandard)])
+def test_sharded_sink_splits_by_record_count(tmp_path, compression):
+    lines = _lines(25)
+    with ShardedSink(str(tmp_path), max_records=10, compression=compression) as sink:
+        # Pieces that split lines and span shard boundaries.
+        text = "\n".join(lines) + "\n"
+        for start in range(0, len(text), 37):
+            sink.write(text[start:start + 37])
+    manifest, written = _read_shards(str(tmp_path))
+    assert written == lines
+    assert [shard["records"] for shard in manifest["shards"]] == [10, 10, 5]
+    assert manifest["records"] == 25
+    suffix = COMPRESSION_SUFFIXES[compression]
+    assert [shard["name"] for shard in manifest["shards"]] == [f"part-{i:05d}.jsonl{suffix}" for i in range(3)]
+    assert sorted(os.listdir(tmp_path)) == sorted([MANIFEST_NAME] + [shard["name"] for shard in manifest["shards"]])
+
+
+def test_sharded_sink_splits_by_size_at_line_ends(tmp_path):
+    lines = _lines(200)
+    with ShardedSink(str(tmp_path), max_bytes=500) as sink:
+        sink.write("\n".join(lines[:150]) + "\n")
+        sink.write("\n".join(lines[150:]) + "\n")
+    manifest, written = _read_shards(str(tmp_path))
+    assert written == lines
+    assert all(shard["bytes"] <= 500 for shard in manifest["shards"])
+    # Greedy: a shard is only cut when the next line does not fit.
+    longest = max(len(line) + 1 for line in lines)
+    assert all(shard["bytes"] > 500 - longest for shard in manifest["shards"][:-1])
+
+
+def test_sharded_sink_accepts_lines_larger_than_max_bytes(tmp_path):
+    lines = ["a" * 50, "b", "c" * 50]
+    with ShardedSink(str(tmp_path), max_bytes=10) as sink:
+        sink.write("\n".join(lines))
+    manifest, written = _read_shards(str(tmp_path))
+    assert written == lines
+    assert [shard["records"] for shard in manifest["shards"]] == [1, 1, 1]
+
+
+def test_sharded_sink_without_records_writes_an_empty_manifest(tmp_path):
+    ShardedSink(str(tmp_path)).close()
+    assert _read_shards(str(tmp_path)) == ({"compression": None, "records": 0, "shards": []}, [])
+
+
+def test_sharded_sink_uploads_shards_then_manifest(tmp_path):
+    uploaded = []
+
+    class RecordingUploader(LocalUploader):
+        def upload(self, path, key):
+            super().upload(path, key)
+            uploaded.append(key)
+
+    bucket = tmp_path / "bucket"
+    with ShardedSink(str(tmp_path / "out"), max_records=4, compression="gzip",
+                     uploader=RecordingUploader(str(bucket / "cats"))) as sink:
+        sink.write("\n".join(_lines(10)) + "\n")
+    assert uploaded == ["part-00000.jsonl.gz", "part-00001.jsonl.gz", "part-00002.jsonl.gz", MANIFEST_NAME]
+    assert _read_shards(str(bucket / "cats")) == _read_shards(str(tmp_path / "out"))
+
+
+def test_sharded_sink_surfaces_upload_errors_and_skips_the_manifest(tmp_path):
+    class FailingUploader:
+        def upload(self, path, key):
+            raise OSError("bucket unavailable")
+
+    sink = ShardedSink(str(tmp_path), max_records=1, uploader=FailingUploader())
+    with pytest.raises(OSError, match="bucket unavailable"):
+        for line in _lines(1000):
+            sink.write(line + "\n")
+        sink.close()
+    assert not os.path.exists(tmp_path / MANIFEST_NAME)
+
+
+def test_sharded_sink_abort_discards_the_unfinished_shard(tmp_path):
+    with pytest.raises(RuntimeError):
+        with ShardedSink(str(tmp_path), max_records=3) as sink:
+            sink.write("\n".join(_lines(5)) + "\n")
+            raise RuntimeError()
+    assert os.listdir(tmp_path) == ["part-00000.jsonl"]
+
+
+@pytest.mark.parametrize("url,uploader", [("s3://bucket/cats/2.13", S3Uploader), ("file:///tmp/bucket", LocalUploader),
+                                          ("/tmp/bucket", LocalUploader)])
+def test_open_uploader_by_url(url, uploader, monkeypatch):
+    monkeypatch.setattr(S3Uploader, "__init__", lambda self, bucket, prefix, endpoint_url: None)
+    assert isinstance(open_uploader(url), uploader)
+
+
+def test_sharded_sink_rejects_unknown_compression(tmp_path):
+    with pytest.raises(ValueError):
+        ShardedSink(str(tmp_path), compression="lz4")
+
+
+def test_main_html_writes_shards(tmp_path):
+    out, bucket = tmp_path / "shards", tmp_path / "bucket"
+    main(["html", test_data_path, "--workers", "1", "--shards", str(out), "--shard-records", "10", "--compression",
+          "gzip", "--upload", f"file://{bucket}"])
+    manifest, lines = _read_shards(str(out))
+    assert [shard["records"] for shard in manifest["shards"]] == [10, 10, 5]
+    assert json.loads(lines[0])["link"] == 'cats/Bifunctor.html#bimap[A,B,C,D](fab:F[A,B])(f:A=>C,g:B=>D):F[C,D]'
+    assert sorted(os.listdir(bucket)) == sorted(os.listdir(out))
+
+
+@pytest.mark.parametrize("args", [["--shards", "out", "-o", "out.jsonl"], ["--compression", "gzip"]])
+def test_main_rejects_inconsistent_shard_options(tmp_path, args):
+    with pytest.raises(SystemExit):
+        main(["html", str(tmp_path)] + args)
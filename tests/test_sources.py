@@ -0,0 +1,66 @@
+import os
+import pickle
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from src.sources import *
+from src.html_parser import extract_list_nodes, extract_list_nodes_parallel
+from src.transformer import index_js_to_enriched_function_blocks, stream_index_js_to_enriched_function_blocks
+
+test_dir_path = os.path.join(os.path.dirname(__file__))
+test_data_path = os.path.join(test_dir_path, "resources", "html_parser_test_data")
+test_index_js_path = os.path.join(test_dir_path, "resources", "test_index.js")
+
+
+def _zip_test_data(tmp_path, prefix=""):
+    archive_path = str(tmp_path / "bundle.zip")
+    with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for path in collect_html_file_paths(test_data_path, []):
+            archive.write(path, prefix + os.path.relpath(path, test_data_path).replace(os.sep, "/"))
+        archive.write(test_index_js_path, prefix + "index.js")
+    return archive_path
+
+
+def test_zip_source_lists_html_members_and_finds_index_js(tmp_path):
+    with ZipSource(_zip_test_data(tmp_path, prefix="docs/")) as source:
+        assert sorted(source.list_html_files()) == sorted(
+            "docs/" + os.path.relpath(path, test_data_path).replace(os.sep, "/")
+            for path in collect_html_file_paths(test_data_path, []))
+        assert source.index_js_name() == "docs/index.js"
+        with source.open(source.index_js_name()) as f:
+            actual = list(stream_index_js_to_enriched_function_blocks(f))
+    with open(test_index_js_path) as f:
+        assert actual == index_js_to_enriched_function_blocks(f.read())
+
+
+def test_zip_source_members_parse_like_extracted_files(tmp_path):
+    with ZipSource(_zip_test_data(tmp_path)) as source:
+        actual = extract_list_nodes("test_bifunctor.html", source)
+    assert actual == extract_list_nodes(os.path.join(test_data_path, "test_bifunctor.html"))
+
+
+def test_zip_source_reads_members_from_concurrent_threads(tmp_path):
+    with ZipSource(_zip_test_data(tmp_path)) as source:
+        names = source.list_html_files() * 4
+        expected = [source.open_binary(name).read() for name in names]
+
+        def read(name):
+            with source.open_binary(name) as f:
+                return f.read()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            assert list(executor.map(read, names)) == expected
+
+
+def test_zip_source_is_shared_with_process_pool_workers(tmp_path):
+    with ZipSource(_zip_test_data(tmp_path)) as source:
+        assert pickle.loads(pickle.dumps(source)).path == source.path
+        names = sorted(source.list_html_files())
+        actual = extract_list_nodes_parallel(names, max_workers=2, source=source)
+        assert actual == extract_list_nodes_parallel(names, max_workers=1, source=source)
+
+
+def test_open_source_returns_a_directory_source_for_directories():
+    source = open_source(test_data_path)
+    assert isinstance(source, DirectorySource)
+    assert sorted(source.list_html_files()) == sorted(collect_html_file_paths(test_data_path, []))
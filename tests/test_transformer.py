@@ -1,7 +1,11 @@
 from src.transformer import *
 import pytest
+import io
+import json
 import os
 
+from testing.corpus import generate_index, render_index_js
+
 
 def test_trim_index_js_removes_left_and_right_characters():
     """The string 'Index.PACKAGES = ' should be removed from the left side of the index.js string."""
@@ -177,3 +181,192 @@ def test_encode_enriched_function_block_converts_to_string_json():
     actual = encode_enriched_function_block(test_efb)
     expected = """{"package_name":"cats.data","file_name":"cats.data.Binested","short_description":"Compose a two-slot type constructor F[_, _] with two single-slot type constructors G[_] and H[_], resulting in a two-slot type constructor with respect to the inner types.","kind":"case class","case_class_link":"cats/data/Binested.html","class_link":null,"object_link":"cats/data/Binested$.html","trait_link":null,"function_block":{"label":"productElementNames","tail":"(): Iterator[String]","member":"scala.Product.productElementNames","link":"cats/data/Binested.html#productElementNames:Iterator[String]","kind":"def"}}"""
     assert actual == expected
+
+
+def test_stream_index_js_to_enriched_function_blocks_matches_eager_transform():
+    """Streaming with a tiny chunk size forces values to straddle reads and must produce the eager output."""
+    with open(os.path.join(os.path.dirname(__file__), "resources", "test_index.js")) as f:
+        expected = index_js_to_enriched_function_blocks(f.read())
+    with open(os.path.join(os.path.dirname(__file__), "resources", "test_index.js")) as f:
+        actual = list(stream_index_js_to_enriched_function_blocks(f, chunk_size=7))
+    assert actual == expected
+
+
+def test_iter_index_js_scala_types_yields_packages_in_file_order():
+    raw = io.StringIO("""Index.PACKAGES = {"a": [{"name": "a.A"}, {"name": "a.B"}], "b": [], "c": [{"name": "c.C"}]};\n""")
+    actual = list(iter_index_js_scala_types(raw, chunk_size=3))
+    assert actual == [("a", {"name": "a.A"}), ("a", {"name": "a.B"}), ("c", {"name": "c.C"})]
+
+
+def test_stream_raises_a_critical_system_exit_when_multiple_index_packages_strings_are_present():
+    raw = io.StringIO("""Index.PACKAGES = {"cats.data": [{"name": "Index.PACKAGES = valid"}]};""")
+    with pytest.raises(SystemExit) as pytest_wrapped_e:
+        list(iter_index_js_scala_types(raw))
+    assert pytest_wrapped_e.value.code == 1
+
+
+@pytest.mark.parametrize("library", ["json", "orjson", "msgspec"])
+def test_encode_enriched_function_block_fast_is_byte_identical(library):
+    pytest.importorskip(library)
+    dumps = get_json_dumps(library)
+    with open(os.path.join(os.path.dirname(__file__), "resources", "test_index.js")) as f:
+        blocks = index_js_to_enriched_function_blocks(f.read())
+    blocks[0].function_block.tail = 'non-ascii δ \x7f \U0001F600 and control \x00\n "quoted" \\'
+    for block in blocks:
+        assert encode_enriched_function_block_fast(block, dumps) == encode_enriched_function_block(block)
+
+
+@pytest.mark.parametrize("library", ["json", "orjson", "msgspec"])
+@pytest.mark.parametrize("value", [1e16, 1e-7, 0.1, -0.0, 1.5e300, float('nan'), float('inf'), float('-inf')])
+def test_fast_dumps_matches_json_for_floats(library, value):
+    pytest.importorskip(library)
+    record = {'function_block': {'label': 'l', 'extra': [value, {'nested': value}]}, 'short_comment': value}
+    assert get_json_dumps(library)(record) == json.dumps(record, separators=(',', ':'))
+
+
+def test_write_enriched_function_blocks_writes_jsonl_in_batches():
+    with open(os.path.join(os.path.dirname(__file__), "resources", "test_index.js")) as f:
+        blocks = index_js_to_enriched_function_blocks(f.read())
+    out = io.StringIO()
+    assert write_enriched_function_blocks(blocks, out, batch_size=4) == len(blocks)
+    assert out.getvalue() == "".join(encode_enriched_function_block(block) + "\n" for block in blocks)
+
+
+def test_function_blocks_are_slotted():
+    fb = FunctionBlock(label='l', tail='t', member='m', link='k', kind='def')
+    assert not hasattr(fb, '__dict__')
+    assert not hasattr(EnrichedFunctionBlock('p', 'f', 's', 'trait', None, None, None, 't', fb), '__dict__')
+
+
+def test_enriched_function_block_batch_returns_equal_blocks_and_shares_parents():
+    with open(os.path.join(os.path.dirname(__file__), "resources", "test_index.js")) as f:
+        expected = index_js_to_enriched_function_blocks(f.read())
+    with open(os.path.join(os.path.dirname(__file__), "resources", "test_index.js")) as f:
+        batch = index_js_to_enriched_function_block_batch(f)
+    assert len(batch) == len(expected)
+    assert list(batch) == expected
+    assert batch[-1] == expected[-1]
+    assert len(batch.parents) == 2
+
+
+INDEX_JS_VARIANTS = [
+    '',
+    'Index.PACKAGES = {"cats.data": [{"name": "A;"}]};',
+    '\n  Index.PACKAGES = {"a": 1.5, "b": "caf\u00e9 \\u00e9"};;\n\n',
+    '{"no": "prefix"};',
+    'var x = 1; Index.PACKAGES = {"a": []}',
+    'Index.PACKAGES = {"a": 1}\u00a0',
+    'Index.PACKAGES = {"a": NaN, "b": 123456789012345678901234567890, "c": "\\ud800"};',
+]
+
+
+@pytest.mark.parametrize("index_js", INDEX_JS_VARIANTS)
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_load_index_js_matches_trim_index_js(index_js, use_orjson, tmp_path, monkeypatch):
+    if not use_orjson:
+        monkeypatch.setattr("src.transformer.orjson", None)
+    path = tmp_path / "index.js"
+    path.write_bytes(index_js.encode("utf-8"))
+    try:
+        expected = json.loads(trim_index_js(index_js))
+    except json.JSONDecodeError:
+        with pytest.raises(json.JSONDecodeError):
+            load_index_js(str(path))
+        return
+    actual = load_index_js(str(path))
+    assert json.dumps(actual) == json.dumps(expected)
+
+
+def test_load_index_js_exits_on_a_duplicate_prefix(tmp_path):
+    path = tmp_path / "index.js"
+    path.write_text("""Index.PACKAGES = {"cats.data": "Index.PACKAGES = valid"};""")
+    with pytest.raises(SystemExit) as exit_info:
+        load_index_js(str(path))
+    assert exit_info.value.code == 1
+
+
+DUPLICATE_PREFIX_INDEX_JS = """Index.PACKAGES = {"cats.data": "Index.PACKAGES = valid"};"""
+
+
+def _load_duplicate_prefix_file(tmp_path):
+    path = tmp_path / "index.js"
+    path.write_text(DUPLICATE_PREFIX_INDEX_JS)
+    return load_index_js(str(path))
+
+
+@pytest.mark.parametrize("load", [
+    lambda tmp_path: trim_index_js(DUPLICATE_PREFIX_INDEX_JS),
+    _load_duplicate_prefix_file,
+    lambda tmp_path: list(iter_index_js_scala_types(io.StringIO(DUPLICATE_PREFIX_INDEX_JS)))],
+    ids=["trim_index_js", "load_index_js", "stream"])
+def test_duplicate_prefix_is_logged_and_not_printed(load, tmp_path, capsys, caplog):
+    with pytest.raises(SystemExit) as exit_info:
+        load(tmp_path)
+    assert exit_info.value.code == 1
+    assert capsys.readouterr().out == ""
+    assert "Found 'Index.PACKAGES = ' string in index.js body." in caplog.text
+
+
+def test_index_js_file_to_enriched_function_blocks_matches_the_str_version():
+    path = os.path.join(os.path.dirname(__file__), "resources", "test_index.js")
+    with open(path) as f:
+        expected = index_js_to_enriched_function_blocks(f.read())
+    assert index_js_file_to_enriched_function_blocks(path) == expected
+
+
+def _synthetic_scala_types():
+    return [(package, scala_type) for package, scala_types in generate_index(3, 7, 4).items()
+            for scala_type in scala_types]
+
+
+def test_transform_scala_types_in_a_pool_keeps_input_order():
+    scala_types = _synthetic_scala_types()
+    expected = [block for package, scala_type in scala_types
+                for block in extract_enriched_function_blocks(package, scala_type)]
+    actual = list(transform_scala_types(iter(scala_types), max_workers=2, chunk_size=4, threshold=5))
+    assert actual == expected
+
+
+def test_transform_scala_types_stays_serial_below_the_threshold(monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("process pool started")
+
+    monkeypatch.setattr("concurrent.futures.ProcessPoolExecutor", no_pool)
+    scala_types = _synthetic_scala_types()
+    expected = [block for package, scala_type in scala_types
+                for block in extract_enriched_function_blocks(package, scala_type)]
+    assert list(transform_scala_types(scala_types, max_workers=2, threshold=len(scala_types) + 1)) == expected
+
+
+def test_index_js_to_enriched_function_blocks_with_workers_matches_serial():
+    index_js = render_index_js(generate_index(packages=5, types=PARALLEL_TRANSFORM_THRESHOLD // 5 + 1, members=2))
+    expected = index_js_to_enriched_function_blocks(index_js)
+    assert index_js_to_enriched_function_blocks(index_js, max_workers=2) == expected
+    assert list(stream_index_js_to_enriched_function_blocks(io.StringIO(index_js), max_workers=2)) == expected
+
+
+def test_extract_enriched_function_blocks_counts_skipped_blocks(caplog):
+    function_block = {'label': 'l', 'tail': 't', 'member': 'm', 'link': 'p/T.html#l', 'kind': 'def'}
+    test_scala_type = {
+        'name': 'p.T',
+        'kind': 'class',
+        'class': 'p/T.html',
+        'members_class': [function_block, {'member': 'p.T.broken', 'error': 'Could not resolve type'},
+                          {'member': 'p.T.odd'}],
+        'unrecognized_key': [function_block],
+    }
+    report = TransformReport()
+    actual = extract_enriched_function_blocks("p", test_scala_type, report)
+    assert [block.function_block for block in actual] == [build_function_block(function_block)]
+    assert (report.error_blocks, report.unknown_blocks, report.unknown_lists) == (1, 1, 1)
+    assert "unrecognized_key" in caplog.text
+
+
+def test_transform_scala_types_in_a_pool_merges_reports():
+    scala_types = _synthetic_scala_types()
+    for _, scala_type in scala_types:
+        scala_type[f"members_{scala_type['kind']}"][0] = {'member': 'x', 'error': 'e'}
+    report = TransformReport()
+    blocks = list(transform_scala_types(iter(scala_types), max_workers=2, chunk_size=4, threshold=5, report=report))
+    assert report.error_blocks == len(scala_types)
+    assert len(blocks) == len(scala_types) * 3